@@ -18,12 +18,92 @@ class Settings(BaseSettings):
     zapi_instance_id: str = ""
     zapi_token: str = ""
     zapi_client_token: str = ""  # Security Token (opcional mas recomendado)
+    # Endereço da API (trocar só para testes, ex: servidor falso do teste de carga)
+    zapi_base_url: str = "https://api.z-api.io"
+    # Conexões mantidas abertas com a Z-API (envios simultâneos de workers/threads)
+    zapi_max_conexoes: int = 20
     
     # App
     company_name: str = "Minha Empresa"
     orcamento_validade_dias: int = 10
     log_level: str = "INFO"
     
+    # Textos das mensagens: locale (app/templates/<locale>.py) e arquivo
+    # JSON opcional com textos específicos da empresa (chave -> template)
+    locale: str = "pt_BR"
+    templates_override_path: str = ""
+    
+    # Segredo para endpoints /admin/* (header X-Admin-Secret). Vazio desabilita.
+    admin_secret: str = ""
+    
+    # Armazenamento da conversa no Firestore
+    # "dict": dados_temporarios como mapa (legível no console)
+    # "blob": dados_temporarios compactado em um único campo binário
+    conversa_formato_armazenamento: str = "dict"
+    
+    # Catálogo em memória: tempo até recarregar produtos/SKUs do Firestore
+    catalogo_cache_ttl_segundos: int = 300
+    # Páginas renderizadas (categorias/produtos) mantidas em cache
+    page_cache_capacidade: int = 256
+    # Reserva o estoque dos itens do orçamento até a validade (orcamento_validade_dias)
+    reservar_estoque: bool = True
+    # Itens por página nas listas de categorias/produtos ("mais"/"anterior")
+    itens_por_pagina: int = 8
+    # Tamanho máximo de cada mensagem enviada: respostas maiores são divididas
+    # em várias mensagens em fronteiras de linha (o WhatsApp aceita até 4096)
+    mensagem_limite_caracteres: int = 1600
+    
+    # Rastreamento: fração das mensagens com spans gravados (0 desliga, 1 = todas),
+    # arquivo JSONL (OTLP/JSON) onde os traces são gravados e tamanho máximo dele
+    # (MB) antes de ser renomeado para <arquivo>.1 (0 = sem limite)
+    rastreamento_amostragem: float = 0.0
+    rastreamento_arquivo: str = "traces.jsonl"
+    rastreamento_arquivo_max_mb: float = 50.0
+    
+    # Perfilamento sob demanda: fração das requisições perfiladas (0 desliga;
+    # com o header X-Admin-Secret a requisição é sempre perfilada), intervalo
+    # entre amostras da pilha e quantos perfis ficam guardados por worker
+    perfilamento_amostragem: float = 0.0
+    perfilamento_intervalo_ms: float = 1.0
+    perfilamento_capacidade: int = 50
+    
+    # Prontidão (/ready): intervalo entre verificações do Firestore e da Z-API
+    # em segundo plano e tempo máximo de cada verificação
+    prontidao_intervalo_segundos: float = 15.0
+    prontidao_timeout_segundos: float = 5.0
+    
+    # Campanhas: limite de envio padrão (mensagens/s, conforme o plano da Z-API),
+    # envios simultâneos, conversas lidas por página (checkpoint a cada página)
+    # e validade do lease do worker que envia cada campanha
+    campanha_mensagens_por_segundo: float = 10.0
+    campanha_concorrencia: int = 5
+    campanha_lote: int = 100
+    campanha_lease_segundos: float = 60.0
+    
+    # Disjuntores (circuit breakers) da Z-API e do Firestore: o circuito abre
+    # quando, nos últimos DISJUNTOR_JANELA_SEGUNDOS, houve pelo menos
+    # DISJUNTOR_MINIMO_CHAMADAS chamadas e a fração de falhas chegou a
+    # DISJUNTOR_TAXA_ERRO; aberto, recusa as chamadas na hora e, depois de
+    # DISJUNTOR_ABERTO_SEGUNDOS, deixa passar uma chamada de teste
+    disjuntor_taxa_erro: float = 0.5
+    disjuntor_minimo_chamadas: int = 10
+    disjuntor_janela_segundos: int = 30
+    disjuntor_aberto_segundos: float = 15.0
+    
+    # Outbox: respostas que não puderam ser enviadas (Z-API fora ou circuito
+    # aberto) esperando novo envio; máximo por worker, tentativas por resposta
+    # e intervalo entre as verificações da fila
+    outbox_capacidade: int = 10000
+    outbox_tentativas: int = 8
+    outbox_intervalo_segundos: float = 1.0
+    
+    # Entregas (callbacks de status da Z-API): por quanto tempo uma mensagem
+    # enviada espera a confirmação de entrega/leitura, máximo de mensagens
+    # acompanhadas por worker e intervalo da consolidação por hora no Firestore
+    entregas_retencao_horas: float = 24.0
+    entregas_capacidade: int = 200000
+    entregas_rollup_segundos: float = 60.0
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
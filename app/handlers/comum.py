@@ -0,0 +1,92 @@
+"""
+Funções compartilhadas entre os handlers de fluxo.
+"""
+from typing import Callable, List
+
+from app.models.conversation import ConversationState
+from app.templates.renderer import t
+
+# Marca, no texto de uma resposta, o início de uma nova mensagem do WhatsApp.
+# Respostas continuam sendo str (os handlers concatenam trechos livremente);
+# a divisão em mensagens acontece só no envio (partes_da_resposta).
+QUEBRA_MENSAGEM = "\x0c"
+
+
+def texto_da_resposta(resposta: str) -> str:
+    """Texto completo da resposta, sem as marcas de quebra."""
+    return resposta.replace(QUEBRA_MENSAGEM, "")
+
+
+def partes_da_resposta(resposta: str, limite: int) -> List[str]:
+    """
+    Divide a resposta nas mensagens a enviar: nas marcas QUEBRA_MENSAGEM e,
+    em cada trecho maior que `limite` caracteres, em fronteiras de linha
+    (de preferência entre parágrafos; uma linha maior que o limite é
+    quebrada entre palavras).
+    """
+    partes = []
+    for trecho in resposta.split(QUEBRA_MENSAGEM):
+        trecho = trecho.strip("\n")
+        while len(trecho) > limite:
+            corte = trecho.rfind("\n\n", 0, limite + 1)
+            if corte <= 0:
+                corte = trecho.rfind("\n", 0, limite + 1)
+            if corte > 0:
+                partes.append(trecho[:corte].rstrip())
+                trecho = trecho[corte:].lstrip("\n")
+                continue
+            corte = trecho.rfind(" ", 0, limite + 1)
+            if corte <= 0:
+                corte = limite
+            partes.append(trecho[:corte].rstrip())
+            trecho = trecho[corte:].lstrip(" ")
+        if trecho.strip():
+            partes.append(trecho.rstrip())
+    return partes or [""]
+
+
+def nome_valido(nome: str) -> bool:
+    """Nome com ao menos 2 caracteres e sem números."""
+    return len(nome) >= 2 and not any(c.isdigit() for c in nome)
+
+
+def pedir_confirmacao_nome(state: ConversationState, texto_sem_nome: str) -> str:
+    """Pergunta se o nome salvo é do cliente, ou pede o nome se não houver."""
+    if state.nome:
+        return t("confirmar_nome", nome=state.nome)
+    return texto_sem_nome
+
+
+def confirmar_nome(
+    state: ConversationState,
+    message: str,
+    ao_confirmar: Callable[[ConversationState], str]
+) -> str:
+    """
+    Processa a resposta a pedir_confirmacao_nome.
+    
+    Args:
+        state: Estado da conversa
+        message: Mensagem recebida
+        ao_confirmar: Próximo passo do fluxo, chamado com o nome confirmado
+    """
+    opcao = message.strip()
+    
+    if state.nome:
+        if opcao == "1":
+            return ao_confirmar(state)
+        elif opcao == "2":
+            state.nome = None
+            return t("informar_outro_nome")
+        else:
+            # Assume que digitou o nome
+            if nome_valido(opcao):
+                state.nome = opcao.title()
+                return ao_confirmar(state)
+            return t("confirmar_nome_opcao_invalida", nome=state.nome)
+    else:
+        # Captura nome
+        if nome_valido(opcao):
+            state.nome = opcao.title()
+            return ao_confirmar(state)
+        return t("nome_invalido_curto")
@@ -0,0 +1,184 @@
+"""
+Motor do fluxo conversacional orientado a tabela.
+
+As rotas (fluxo, etapa) -> handler, os validadores e as transições por
+opção digitada são declarados em um módulo de tabela (por padrão
+app.handlers.flow_table) e compilados uma única vez em um dicionário de
+despacho O(1). A tabela pode ser recarregada em tempo de execução sem
+redeploy (FlowEngine.recarregar); se a nova tabela for inválida a anterior
+continua em uso.
+
+Referências a handlers são strings "alvo.metodo", resolvidas contra os
+alvos registrados no motor (ex: "orcamento._handle_categoria").
+Assinaturas esperadas:
+    handler(state, message) -> str       rotas
+    validador(state, message) -> str|None  retorna mensagem de erro ou None
+    renderizador(state) -> str           transições e fallbacks
+"""
+import importlib
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, Callable, Tuple, List
+
+from app.models.conversation import ConversationState, Etapa, Fluxo
+from app.services.rastreamento import span
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Transicao:
+    """Mudança de estado disparada por uma opção digitada."""
+    renderizador: str
+    fluxo: Optional[Fluxo] = None
+    etapa: Optional[Etapa] = None
+
+
+@dataclass(frozen=True)
+class Rota:
+    """
+    Tratamento de uma etapa.
+    
+    fluxo=None faz a rota valer para qualquer fluxo. Se a mensagem
+    corresponder a uma das opções, a transição é aplicada; caso contrário
+    a mensagem vai para o handler.
+    """
+    etapa: Etapa
+    handler: str
+    fluxo: Optional[Fluxo] = None
+    validador: Optional[str] = None
+    opcoes: Dict[str, Transicao] = field(default_factory=dict)
+
+
+@dataclass
+class _RotaCompilada:
+    """Rota com referências já resolvidas para callables."""
+    handler: Callable[[ConversationState, str], str]
+    validador: Optional[Callable[[ConversationState, str], Optional[str]]]
+    opcoes: Dict[str, Tuple[Optional[Fluxo], Optional[Etapa], Callable[[ConversationState], str]]]
+
+
+@dataclass
+class _TabelaCompilada:
+    rotas: Dict[Tuple[Optional[Fluxo], Etapa], _RotaCompilada]
+    fallbacks: Dict[Fluxo, Callable[[ConversationState], str]]
+    padrao: Callable[[ConversationState], str]
+
+
+class FlowEngine:
+    """Despacha mensagens conforme a tabela de fluxo compilada."""
+    
+    def __init__(self, alvos: Dict[str, Any], modulo_tabela: str = "app.handlers.flow_table"):
+        """
+        Args:
+            alvos: Objetos/módulos que implementam os handlers, por nome
+            modulo_tabela: Módulo com ROTAS, FALLBACKS e PADRAO
+        """
+        self._alvos = alvos
+        self._modulo_tabela = modulo_tabela
+        # (fluxo, etapa) -> [chamadas, tempo total (s), tempo máximo (s)]
+        self._tempos: Dict[Tuple[str, str], List[float]] = {}
+        modulo = importlib.import_module(modulo_tabela)
+        self._tabela = self._compilar(modulo)
+    
+    # ==================== COMPILAÇÃO ====================
+    
+    def _resolver(self, referencia: str) -> Callable:
+        """Converte "alvo.metodo" no callable correspondente."""
+        nome_alvo, _, nome_metodo = referencia.partition(".")
+        alvo = self._alvos.get(nome_alvo)
+        if alvo is None:
+            raise ValueError(f"Alvo desconhecido na tabela de fluxo: {referencia}")
+        fn = getattr(alvo, nome_metodo, None)
+        if not callable(fn):
+            raise ValueError(f"Handler inexistente na tabela de fluxo: {referencia}")
+        return fn
+    
+    def _compilar(self, modulo) -> _TabelaCompilada:
+        """Valida a tabela e resolve todas as referências."""
+        rotas = {}
+        for rota in modulo.ROTAS:
+            chave = (rota.fluxo, rota.etapa)
+            if chave in rotas:
+                raise ValueError(f"Rota duplicada na tabela de fluxo: {chave}")
+            rotas[chave] = _RotaCompilada(
+                handler=self._resolver(rota.handler),
+                validador=self._resolver(rota.validador) if rota.validador else None,
+                opcoes={
+                    opcao: (t.fluxo, t.etapa, self._resolver(t.renderizador))
+                    for opcao, t in rota.opcoes.items()
+                }
+            )
+        
+        fallbacks = {fluxo: self._resolver(ref) for fluxo, ref in modulo.FALLBACKS.items()}
+        return _TabelaCompilada(rotas=rotas, fallbacks=fallbacks, padrao=self._resolver(modulo.PADRAO))
+    
+    def recarregar(self) -> int:
+        """
+        Recarrega e recompila o módulo da tabela.
+        
+        Returns:
+            Número de rotas da nova tabela
+            
+        Raises:
+            Exception: se a tabela nova for inválida (a atual é mantida)
+        """
+        modulo = importlib.reload(importlib.import_module(self._modulo_tabela))
+        tabela = self._compilar(modulo)
+        self._tabela = tabela
+        logger.info(f"🔄 Tabela de fluxo recarregada: {len(tabela.rotas)} rotas")
+        return len(tabela.rotas)
+    
+    # ==================== DESPACHO ====================
+    
+    def dispatch(self, state: ConversationState, message: str) -> str:
+        """Processa a mensagem conforme o (fluxo, etapa) atual do estado."""
+        tabela = self._tabela
+        chave_tempo = (state.fluxo.value, state.etapa.value)
+        inicio = time.perf_counter()
+        try:
+            with span("flow.dispatch", fluxo=chave_tempo[0], etapa=chave_tempo[1]):
+                rota = tabela.rotas.get((state.fluxo, state.etapa)) or tabela.rotas.get((None, state.etapa))
+                if rota is None:
+                    fallback = tabela.fallbacks.get(state.fluxo, tabela.padrao)
+                    return fallback(state)
+                return self._executar(rota, state, message)
+        finally:
+            duracao = time.perf_counter() - inicio
+            tempos = self._tempos.get(chave_tempo)
+            if tempos is None:
+                self._tempos[chave_tempo] = [1, duracao, duracao]
+            else:
+                tempos[0] += 1
+                tempos[1] += duracao
+                if duracao > tempos[2]:
+                    tempos[2] = duracao
+    
+    def _executar(self, rota: _RotaCompilada, state: ConversationState, message: str) -> str:
+        if rota.validador is not None:
+            erro = rota.validador(state, message)
+            if erro is not None:
+                return erro
+        
+        transicao = rota.opcoes.get(message.strip())
+        if transicao is not None:
+            fluxo, etapa, renderizador = transicao
+            if fluxo is not None:
+                state.fluxo = fluxo
+            if etapa is not None:
+                state.etapa = etapa
+            return renderizador(state)
+        
+        return rota.handler(state, message)
+    
+    def tempos(self) -> Dict[str, Dict[str, float]]:
+        """Tempo de processamento acumulado por (fluxo, etapa), em ms."""
+        return {
+            f"{fluxo}/{etapa}": {
+                "chamadas": int(n),
+                "media_ms": total / n * 1000,
+                "max_ms": maximo * 1000
+            }
+            for (fluxo, etapa), (n, total, maximo) in self._tempos.items()
+        }
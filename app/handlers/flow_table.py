@@ -0,0 +1,60 @@
+"""
+Tabela declarativa do fluxo conversacional.
+
+Compilada pelo FlowEngine (app/handlers/flow_engine.py). Alterações aqui
+podem ser aplicadas sem redeploy via POST /admin/flow/reload.
+
+Alvos disponíveis: principal (MessageHandler), orcamento, compras, posvenda.
+"""
+from app.handlers.flow_engine import Rota, Transicao
+from app.models.conversation import Etapa, Fluxo
+
+
+ROTAS = [
+    # === INÍCIO E NOME (qualquer fluxo) ===
+    Rota(Etapa.INICIO, "principal._handle_inicio"),
+    Rota(Etapa.AGUARDANDO_NOME, "principal._handle_nome", validador="principal._validar_nome"),
+    
+    # === MENU PRINCIPAL ===
+    Rota(Etapa.MENU_PRINCIPAL, "principal._menu_opcao_invalida", opcoes={
+        "1": Transicao("orcamento.start", Fluxo.ORCAMENTO, Etapa.ORCAMENTO_CATEGORIA),
+        "2": Transicao("compras.start", Fluxo.COMPRAS, Etapa.COMPRAS_CONFIRMAR_NOME),
+        "3": Transicao("posvenda.start", Fluxo.POS_VENDA, Etapa.POS_VENDA_CONFIRMAR_NOME),
+        "4": Transicao("principal._encaminhar_atendente"),
+    }),
+    
+    # === FLUXO ORÇAMENTO ===
+    Rota(Etapa.ORCAMENTO_CATEGORIA, "orcamento._handle_categoria", fluxo=Fluxo.ORCAMENTO),
+    Rota(Etapa.ORCAMENTO_PRODUTO, "orcamento._handle_produto", fluxo=Fluxo.ORCAMENTO),
+    Rota(Etapa.ORCAMENTO_ATRIBUTOS, "orcamento._handle_atributos", fluxo=Fluxo.ORCAMENTO),
+    Rota(Etapa.ORCAMENTO_VARIACAO, "orcamento._handle_variacao", fluxo=Fluxo.ORCAMENTO),
+    Rota(
+        Etapa.ORCAMENTO_QUANTIDADE, "orcamento._handle_quantidade", fluxo=Fluxo.ORCAMENTO,
+        validador="orcamento._validar_quantidade"
+    ),
+    Rota(Etapa.ORCAMENTO_CONTINUAR, "orcamento._continuar_opcao_invalida", fluxo=Fluxo.ORCAMENTO, opcoes={
+        "1": Transicao("orcamento._show_categorias"),
+        "2": Transicao("orcamento._finalizar_orcamento"),
+        "3": Transicao("orcamento._encaminhar_atendente_com_orcamento"),
+    }),
+    
+    # === FLUXO COMPRAS ===
+    Rota(Etapa.COMPRAS_CONFIRMAR_NOME, "compras._handle_confirmar_nome", fluxo=Fluxo.COMPRAS),
+    
+    # === FLUXO PÓS-VENDA ===
+    Rota(Etapa.POS_VENDA_CONFIRMAR_NOME, "posvenda._handle_confirmar_nome", fluxo=Fluxo.POS_VENDA),
+    Rota(Etapa.POS_VENDA_NUMERO_PEDIDO, "posvenda._handle_numero_pedido", fluxo=Fluxo.POS_VENDA),
+    
+    # === ENCAMINHADO ATENDENTE ===
+    Rota(Etapa.ENCAMINHADO_ATENDENTE, "principal._handle_encaminhado_atendente"),
+]
+
+# Etapa sem rota dentro de um fluxo: renderizador chamado com (state)
+FALLBACKS = {
+    Fluxo.ORCAMENTO: "orcamento._show_categorias",
+    Fluxo.COMPRAS: "compras._encaminhar_atendente",
+    Fluxo.POS_VENDA: "posvenda._pedir_numero_pedido",
+}
+
+# Sem rota e sem fallback do fluxo
+PADRAO = "principal._show_menu_principal"
@@ -2,12 +2,20 @@
 Handler principal de mensagens - orquestra todos os fluxos.
 """
 import logging
-from typing import Optional
+import time
+from typing import Optional, Tuple, List
 
 from app.config import get_settings
 from app.models.conversation import ConversationState, Etapa, Fluxo
+from app.services.contexto_requisicao import ContextoRequisicao, contexto_requisicao
 from app.services.firebase_service import firebase_service
+from app.services.metricas import metricas
+from app.services.rastreamento import span
+from app.services.reserva_service import reserva_service
+from app.handlers.comum import nome_valido, texto_da_resposta, partes_da_resposta
+from app.handlers.flow_engine import FlowEngine
 from app.handlers.orcamento_handler import OrcamentoHandler
+from app.templates.renderer import t
 from app.handlers.compras_handler import ComprasHandler
 from app.handlers.posvenda_handler import PosVendaHandler
 
@@ -22,6 +30,12 @@ class MessageHandler:
         self.orcamento_handler = OrcamentoHandler()
         self.compras_handler = ComprasHandler()
         self.posvenda_handler = PosVendaHandler()
+        self.flow = FlowEngine({
+            "principal": self,
+            "orcamento": self.orcamento_handler,
+            "compras": self.compras_handler,
+            "posvenda": self.posvenda_handler,
+        })
     
     def process_message(self, phone: str, message: str) -> str:
         """
@@ -30,27 +44,68 @@ class MessageHandler:
         Args:
             phone: Número do telefone (formato whatsapp:+55...)
             message: Mensagem recebida
-            
+        
         Returns:
-            Mensagem de resposta
+            Mensagem de resposta (texto completo, mesmo que o envio seja em partes)
+        """
+        return texto_da_resposta(self._processar_medido(phone, message))
+    
+    def process_message_partes(self, phone: str, message: str) -> List[str]:
         """
+        Processa mensagem recebida e retorna a resposta dividida nas mensagens
+        a enviar, em ordem (quebras dos handlers e MENSAGEM_LIMITE_CARACTERES).
+        """
+        return partes_da_resposta(self._processar_medido(phone, message), self.settings.mensagem_limite_caracteres)
+    
+    def _processar_medido(self, phone: str, message: str) -> str:
+        """Processa a mensagem com span, contexto da requisição e métricas."""
         message = message.strip()
         
+        inicio = time.perf_counter()
+        with span("process_message") as trecho, contexto_requisicao() as contexto:
+            response, fluxo, etapa = self._processar(phone, message, contexto)
+            trecho.definir(fluxo=fluxo, etapa=etapa, **contexto.resumo())
+        metricas.mensagem_duracao.observar(time.perf_counter() - inicio, fluxo, etapa)
+        metricas.firestore_leituras.observar(contexto.leituras, fluxo, etapa)
+        metricas.firestore_escritas.observar(contexto.escritas, fluxo, etapa)
+        metricas.firestore_consultas.observar(contexto.consultas, fluxo, etapa)
+        
+        logger.debug(
+            f"📖 [{phone}] Firestore na mensagem ({fluxo}/{etapa}): {contexto.leituras} leituras, "
+            f"{contexto.escritas} escritas, {contexto.consultas} consultas "
+            f"(reaproveitadas: {contexto.reaproveitadas})"
+        )
+        return response
+    
+    def _processar(self, phone: str, message: str, contexto: ContextoRequisicao) -> Tuple[str, str, str]:
+        """
+        Processa a mensagem dentro do contexto da requisição.
+        
+        Returns:
+            (resposta, fluxo, etapa) - fluxo e etapa em que a mensagem chegou
+        """
+        inicio = time.perf_counter()
         # Busca ou cria estado da conversa
         state = firebase_service.get_or_create_conversation(phone)
+        # SKUs/produtos já mostrados ao cliente não precisam ser relidos
+        contexto.semear_do_estado(state)
+        fluxo_entrada, etapa_entrada = state.fluxo.value, state.etapa.value
         
         logger.info(f"[{phone}] Etapa: {state.etapa.value}, Fluxo: {state.fluxo.value}, Msg: {message}")
         
         # Comandos globais
         if message.lower() in ["menu", "início", "inicio", "voltar", "0"]:
+            self._liberar_reservas(state)
             state.reset()
             response = self._show_menu_principal(state)
         elif message.lower() in ["sair", "cancelar"]:
+            self._liberar_reservas(state)
             state.reset()
-            response = "Orçamento cancelado. ❌\n\n" + self._show_menu_principal(state)
+            response = t("operacao_cancelada", menu=self._show_menu_principal(state))
         else:
             # Processa baseado na etapa atual
             response = self._route_message(state, message)
+        duracao_ms = round((time.perf_counter() - inicio) * 1000, 1)
         
         # Salva estado atualizado
         firebase_service.save_conversation_state(state)
@@ -60,118 +115,60 @@ class MessageHandler:
             phone=phone,
             tipo="mensagem",
             mensagem_recebida=message,
-            mensagem_enviada=response,
+            mensagem_enviada=texto_da_resposta(response),
             etapa=state.etapa.value,
-            fluxo=state.fluxo.value
+            fluxo=state.fluxo.value,
+            duracao_ms=duracao_ms
         )
         
-        return response
+        return response, fluxo_entrada, etapa_entrada
     
     def _route_message(self, state: ConversationState, message: str) -> str:
-        """Roteia mensagem para o handler apropriado."""
-        
-        # === INÍCIO E NOME ===
-        if state.etapa == Etapa.INICIO:
-            return self._handle_inicio(state)
-        
-        if state.etapa == Etapa.AGUARDANDO_NOME:
-            return self._handle_nome(state, message)
-        
-        # === MENU PRINCIPAL ===
-        if state.etapa == Etapa.MENU_PRINCIPAL:
-            return self._handle_menu_principal(state, message)
-        
-        # === FLUXO ORÇAMENTO ===
-        if state.fluxo == Fluxo.ORCAMENTO:
-            return self.orcamento_handler.handle(state, message)
-        
-        # === FLUXO COMPRAS ===
-        if state.fluxo == Fluxo.COMPRAS:
-            return self.compras_handler.handle(state, message)
-        
-        # === FLUXO PÓS-VENDA ===
-        if state.fluxo == Fluxo.POS_VENDA:
-            return self.posvenda_handler.handle(state, message)
-        
-        # === ENCAMINHADO ATENDENTE ===
-        if state.etapa == Etapa.ENCAMINHADO_ATENDENTE:
-            return self._handle_encaminhado_atendente(state, message)
-        
-        # Fallback
-        return self._show_menu_principal(state)
+        """Roteia mensagem conforme a tabela de fluxo (app/handlers/flow_table.py)."""
+        return self.flow.dispatch(state, message)
     
-    def _handle_inicio(self, state: ConversationState) -> str:
+    def _handle_inicio(self, state: ConversationState, message: str) -> str:
         """Saudação inicial."""
         state.etapa = Etapa.AGUARDANDO_NOME
-        return (
-            f"👋 Olá! Seja bem-vindo(a) à {self.settings.company_name}. "
-            f"Sou o assistente virtual e estou aqui para te ajudar 😊\n\n"
-            f"Para começar, qual é o seu nome?"
-        )
+        return t("boas_vindas", empresa=self.settings.company_name)
+    
+    def _validar_nome(self, state: ConversationState, message: str) -> Optional[str]:
+        """Valida nome (mínimo 2 caracteres, sem números)."""
+        if not nome_valido(message.strip()):
+            return t("nome_invalido")
+        return None
     
     def _handle_nome(self, state: ConversationState, message: str) -> str:
         """Captura nome do cliente."""
-        # Valida nome (mínimo 2 caracteres, sem números)
-        nome = message.strip()
-        if len(nome) < 2 or any(char.isdigit() for char in nome):
-            return (
-                "Por favor, me informe seu nome corretamente. 😊\n\n"
-                "Qual é o seu nome?"
-            )
-        
-        state.nome = nome.title()
+        state.nome = message.strip().title()
         state.etapa = Etapa.MENU_PRINCIPAL
         
-        return (
-            f"Prazer em te conhecer, {state.nome}! 😄\n\n"
-            f"{self._get_menu_principal_text()}"
+        return t("nome_registrado", nome=state.nome, menu=self._get_menu_principal_text())
+    
+    def _menu_opcao_invalida(self, state: ConversationState, message: str) -> str:
+        """Resposta para opção fora do menu principal (opções na tabela de fluxo)."""
+        # Clientes que já sabem os códigos podem pedir direto: "2x CAM-PRE-M, 1 MOU-PRE-01"
+        return self.orcamento_handler.pedido_rapido(state, message) or t(
+            "menu_opcao_invalida", menu=self._get_menu_principal_text()
         )
     
-    def _handle_menu_principal(self, state: ConversationState, message: str) -> str:
-        """Processa escolha do menu principal."""
-        opcao = message.strip()
-        
-        if opcao == "1":
-            state.fluxo = Fluxo.ORCAMENTO
-            state.etapa = Etapa.ORCAMENTO_CATEGORIA
-            return self.orcamento_handler.start(state)
-        
-        elif opcao == "2":
-            state.fluxo = Fluxo.COMPRAS
-            state.etapa = Etapa.COMPRAS_CONFIRMAR_NOME
-            return self.compras_handler.start(state)
-        
-        elif opcao == "3":
-            state.fluxo = Fluxo.POS_VENDA
-            state.etapa = Etapa.POS_VENDA_CONFIRMAR_NOME
-            return self.posvenda_handler.start(state)
-        
-        elif opcao == "4":
-            return self._encaminhar_atendente(state)
-        
-        else:
-            return (
-                "Opção inválida. Por favor, escolha uma das opções abaixo:\n\n"
-                f"{self._get_menu_principal_text()}"
-            )
+    def _liberar_reservas(self, state: ConversationState):
+        """Libera as reservas dos itens do orçamento em andamento (antes do reset)."""
+        itens = state.dados_temporarios.orcamento_atual.itens
+        reserva_service.liberar_telefone(state.phone, [item.sku_id for item in itens if item.sku_id])
     
     def _show_menu_principal(self, state: ConversationState) -> str:
         """Exibe menu principal."""
         state.etapa = Etapa.MENU_PRINCIPAL
         state.fluxo = Fluxo.NENHUM
         
-        saudacao = f"Olá, {state.nome}! " if state.nome else ""
-        return f"{saudacao}Como posso te ajudar?\n\n{self._get_menu_principal_text()}"
+        if state.nome:
+            return t("menu_principal_com_nome", nome=state.nome, menu=self._get_menu_principal_text())
+        return t("menu_principal", menu=self._get_menu_principal_text())
     
     def _get_menu_principal_text(self) -> str:
         """Retorna texto do menu principal."""
-        return (
-            "Escolha uma das opções abaixo 👇\n\n"
-            "1️⃣ Orçamento\n"
-            "2️⃣ Compras\n"
-            "3️⃣ Pós-venda\n"
-            "4️⃣ Falar com atendente"
-        )
+        return t("menu_opcoes")
     
     def _encaminhar_atendente(self, state: ConversationState) -> str:
         """Encaminha para atendente humano."""
@@ -179,20 +176,11 @@ class MessageHandler:
         state.fluxo = Fluxo.ATENDENTE
         state.encaminhado_atendente = True
         
-        return (
-            "Sem problemas 😊\n"
-            "Vou te encaminhar agora para um atendente humano.\n\n"
-            "⏳ Aguarde um momento, por favor.\n\n"
-            "_Digite *menu* a qualquer momento para voltar ao início._"
-        )
+        return t("encaminhado_atendente")
     
     def _handle_encaminhado_atendente(self, state: ConversationState, message: str) -> str:
         """Mensagem quando já está encaminhado para atendente."""
-        return (
-            "Você já foi encaminhado para um atendente. ⏳\n"
-            "Por favor, aguarde que em breve você será atendido.\n\n"
-            "_Digite *menu* para voltar ao menu principal._"
-        )
+        return t("aguardando_atendente")
 
 
 # Instância global
@@ -2,17 +2,71 @@
 Handler do fluxo de Orçamento.
 """
 import logging
-from typing import Optional, List, Dict, Any
+import re
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple
 
 from app.config import get_settings
 from app.models.conversation import (
     ConversationState, Etapa, Fluxo, 
     ItemOrcamento, OrcamentoTemporario
 )
+from app.handlers.comum import QUEBRA_MENSAGEM
+from app.services.busca_service import busca_service
+from app.services.catalogo_service import catalogo_service
+from app.services.contexto_requisicao import contexto_atual
 from app.services.firebase_service import firebase_service
+from app.services.page_cache import page_cache, PaginaRenderizada
+from app.services.reserva_service import reserva_service
+from app.templates.renderer import t, templates
 
 logger = logging.getLogger(__name__)
 
+# Item de pedido rápido: "2x CAM-PRE-M", "2 CAM-PRE-M", "CAM-PRE-M x2" ou só o código
+_RE_ITEM_PEDIDO = re.compile(r"""
+    ^(?:(?P<qtd>\d{1,4})(?:\s*(?:x|un|und|unid)\.?\s+|x|\s+))?
+    (?P<codigo>[a-z0-9][a-z0-9._/-]*)
+    (?:\s*[x*]\s*(?P<qtd_depois>\d{1,4}))?$
+""", re.IGNORECASE | re.VERBOSE)
+_RE_SEPARADOR_PEDIDO = re.compile(r"[,;\n]+|\s+e\s+")
+
+# Com mais itens que isso, o resumo do orçamento vai numa mensagem e o
+# subtotal com as opções em outra (que fica por último na tela do cliente)
+RESUMO_ITENS_NA_MENSAGEM = 10
+
+
+def _parece_codigo(codigo: str) -> bool:
+    """Códigos de SKU têm separador (CAM-PRE-M) ou misturam letras e números (NB15)."""
+    if any(sep in codigo for sep in "-_./"):
+        return True
+    return any(c.isdigit() for c in codigo) and any(c.isalpha() for c in codigo)
+
+
+def interpretar_pedido_rapido(texto: str) -> Optional[Dict[str, int]]:
+    """
+    Interpreta um pedido por código, ex: "2x CAM-PRE-M, 1 MOU-PRE-01".
+    
+    Returns:
+        Dicionário código (maiúsculo) -> quantidade, ou None se o texto
+        não é um pedido rápido
+    """
+    pedido: Dict[str, int] = {}
+    for trecho in _RE_SEPARADOR_PEDIDO.split(texto.strip()):
+        trecho = trecho.strip()
+        if not trecho:
+            continue
+        match = _RE_ITEM_PEDIDO.match(trecho)
+        if not match or not _parece_codigo(match["codigo"]):
+            return None
+        if match["qtd"] and match["qtd_depois"]:
+            return None
+        quantidade = int(match["qtd"] or match["qtd_depois"] or 1)
+        if quantidade <= 0:
+            return None
+        codigo = match["codigo"].upper()
+        pedido[codigo] = pedido.get(codigo, 0) + quantidade
+    return pedido or None
+
 
 class OrcamentoHandler:
     """Handler para o fluxo de criação de orçamento."""
@@ -25,88 +79,164 @@ class OrcamentoHandler:
         state.dados_temporarios.orcamento_atual = OrcamentoTemporario()
         return self._show_categorias(state)
     
-    def handle(self, state: ConversationState, message: str) -> str:
-        """Processa mensagem dentro do fluxo de orçamento."""
-        
-        if state.etapa == Etapa.ORCAMENTO_CATEGORIA:
-            return self._handle_categoria(state, message)
-        
-        elif state.etapa == Etapa.ORCAMENTO_PRODUTO:
-            return self._handle_produto(state, message)
+    def _show_categorias(self, state: ConversationState, pagina: int = 0) -> str:
+        """Mostra uma página da lista de categorias disponíveis."""
+        chave = page_cache.chave("categorias", pagina=str(pagina))
+        pagina_render = page_cache.get(chave)
         
-        elif state.etapa == Etapa.ORCAMENTO_QUANTIDADE:
-            return self._handle_quantidade(state, message)
-        
-        elif state.etapa == Etapa.ORCAMENTO_ATRIBUTOS:
-            return self._handle_atributos(state, message)
-        
-        elif state.etapa == Etapa.ORCAMENTO_CONFIRMAR:
-            return self._handle_confirmar(state, message)
-        
-        elif state.etapa == Etapa.ORCAMENTO_CONTINUAR:
-            return self._handle_continuar(state, message)
-        
-        return self._show_categorias(state)
-    
-    def _show_categorias(self, state: ConversationState) -> str:
-        """Mostra lista de categorias disponíveis."""
-        categorias = firebase_service.get_categorias()
-        
-        if not categorias:
-            state.etapa = Etapa.MENU_PRINCIPAL
-            state.fluxo = Fluxo.NENHUM
-            return (
-                "Ops! Não encontrei categorias disponíveis no momento. 😕\n\n"
-                "Por favor, tente novamente mais tarde ou fale com um atendente.\n\n"
-                "Digite *menu* para voltar ao menu principal."
+        if pagina_render is None:
+            categorias = firebase_service.get_categorias()
+            
+            if not categorias:
+                state.etapa = Etapa.MENU_PRINCIPAL
+                state.fluxo = Fluxo.NENHUM
+                return t("sem_categorias")
+            
+            # Categorias vêm de uma lista já carregada: pagina em memória
+            por_pagina = self.settings.itens_por_pagina
+            inicio = pagina * por_pagina
+            itens = categorias[inicio:inicio + por_pagina]
+            tem_proxima = inicio + por_pagina < len(categorias)
+            
+            partes = [t("categorias_titulo")]
+            partes.extend(t("opcao_lista", n=i, texto=cat) for i, cat in enumerate(itens, 1))
+            partes.append(self._navegacao(pagina > 0, tem_proxima))
+            partes.append(t("categorias_rodape"))
+            
+            pagina_render = PaginaRenderizada(
+                texto="".join(partes),
+                opcoes={str(i+1): cat for i, cat in enumerate(itens)},
+                proximo_cursor=str(pagina + 1) if tem_proxima else None
             )
-        
-        # Salva mapeamento de opções
-        state.dados_temporarios.opcoes_produtos = {
-            str(i+1): cat for i, cat in enumerate(categorias)
-        }
-        
+            page_cache.put(chave, pagina_render)
+        
+        # Salva mapeamento de opções e posição na lista
+        dados = state.dados_temporarios
+        dados.opcoes_produtos = dict(pagina_render.opcoes)
+        dados.pagina_atual = pagina
+        dados.cursores_pagina = []
+        dados.proximo_cursor = pagina_render.proximo_cursor
         state.etapa = Etapa.ORCAMENTO_CATEGORIA
         
-        texto = "📦 *Categorias disponíveis:*\n\n"
-        for i, cat in enumerate(categorias, 1):
-            texto += f"{i}️⃣ {cat}\n"
-        
-        texto += "\n👉 Digite o *número* da categoria desejada:"
-        
-        return texto
+        return pagina_render.texto
+    
+    def _navegacao(self, tem_anterior: bool, tem_proxima: bool) -> str:
+        """Linhas de navegação entre páginas (vazio se a lista cabe em uma)."""
+        partes = []
+        if tem_proxima:
+            partes.append(t("paginacao_mais"))
+        if tem_anterior:
+            partes.append(t("paginacao_anterior"))
+        return "".join(partes)
     
     def _handle_categoria(self, state: ConversationState, message: str) -> str:
-        """Processa seleção de categoria."""
+        """Processa seleção de categoria (ou navegação entre páginas)."""
         opcao = message.strip()
-        opcoes = state.dados_temporarios.opcoes_produtos
+        dados = state.dados_temporarios
+        
+        comando = opcao.lower()
+        if comando == "mais":
+            if dados.proximo_cursor is None:
+                return t("paginacao_ultima") + self._show_categorias(state, dados.pagina_atual)
+            return self._show_categorias(state, dados.pagina_atual + 1)
+        if comando == "anterior":
+            if dados.pagina_atual == 0:
+                return t("paginacao_primeira") + self._show_categorias(state)
+            return self._show_categorias(state, dados.pagina_atual - 1)
+        
+        opcoes = dados.opcoes_produtos
         
         if opcao not in opcoes:
-            return (
-                "Opção inválida. Por favor, escolha um número da lista.\n\n"
-                + self._show_categorias(state)
-            )
+            if not opcao.isdigit():
+                return self.pedido_rapido(state, opcao) or self._buscar_produtos(state, opcao)
+            return t("categoria_invalida", categorias=self._show_categorias(state, dados.pagina_atual))
         
         categoria = opcoes[opcao]
-        state.dados_temporarios.categoria_selecionada = categoria
+        dados.categoria_selecionada = categoria
         
         return self._show_produtos(state, categoria)
     
-    def _show_produtos(self, state: ConversationState, categoria: str) -> str:
-        """Mostra produtos da categoria selecionada."""
-        produtos = firebase_service.get_produtos_por_categoria(categoria)
-        
-        if not produtos:
-            return (
-                f"Não encontrei produtos na categoria *{categoria}*. 😕\n\n"
-                "Vamos escolher outra categoria?\n\n"
-                + self._show_categorias(state)
-            )
+    def _buscar_produtos(self, state: ConversationState, consulta: str) -> str:
+        """Busca por texto livre e mostra os SKUs encontrados para seleção."""
+        skus = busca_service.buscar(consulta, self.settings.itens_por_pagina)
+        
+        if not skus:
+            return t("busca_sem_resultados", consulta=consulta, categorias=self._show_categorias(state))
+        
+        catalogo = catalogo_service.get_catalogo()
+        state.dados_temporarios.opcoes_skus = {
+            str(i+1): catalogo.sku_to_dict(sku) for i, sku in enumerate(skus)
+        }
+        state.etapa = Etapa.ORCAMENTO_ATRIBUTOS
+        
+        partes = [t("busca_titulo", consulta=consulta)]
+        for i, sku in enumerate(skus, 1):
+            produto = catalogo.produto(sku.produto_id)
+            atributos = " - " + " / ".join(v for _, v in sku.atributos) if sku.atributos else ""
+            partes.append(t(
+                "busca_item", n=i, nome=produto.nome if produto else sku.codigo,
+                atributos=atributos, preco=catalogo.preco(sku)
+            ))
+        partes.append(t("busca_rodape"))
+        
+        return "".join(partes)
+    
+    def _show_produtos(self, state: ConversationState, categoria: str, pagina: int = 0) -> str:
+        """
+        Mostra uma página de produtos da categoria selecionada.
+        
+        Os cursores de início das páginas já vistas ficam no estado da
+        conversa, então "anterior" volta sem reler as páginas do começo.
+        """
+        dados = state.dados_temporarios
+        cursores = dados.cursores_pagina if pagina > 0 else [None]
+        cursor = cursores[pagina]
+        
+        chave = page_cache.chave("produtos", categoria, cursor or "")
+        pagina_render = page_cache.get(chave)
+        
+        if pagina_render is None:
+            pagina_render, erro = self._renderizar_produtos(categoria, cursor, pagina > 0)
+            if pagina_render is None:
+                return t(erro, categoria=categoria, categorias=self._show_categorias(state))
+            page_cache.put(chave, pagina_render)
+        
+        # Salva mapeamento e posição na lista
+        dados.opcoes_produtos = dict(pagina_render.opcoes)
+        dados.pagina_atual = pagina
+        dados.cursores_pagina = cursores
+        dados.proximo_cursor = pagina_render.proximo_cursor
+        state.etapa = Etapa.ORCAMENTO_PRODUTO
         
-        # Busca preços dos SKUs para cada produto
+        return pagina_render.texto
+    
+    def _renderizar_produtos(
+        self,
+        categoria: str,
+        cursor: Optional[str],
+        tem_anterior: bool
+    ) -> Tuple[Optional[PaginaRenderizada], Optional[str]]:
+        """
+        Monta uma página de produtos da categoria.
+        
+        Busca só os produtos da página (a partir do cursor) e os SKUs deles
+        em lote.
+        
+        Returns:
+            Tupla (página, None) ou (None, chave do template de erro)
+        """
+        produtos, proximo_cursor = firebase_service.get_produtos_pagina(
+            categoria, self.settings.itens_por_pagina, cursor
+        )
+        
+        if not produtos and not tem_anterior:
+            return None, "categoria_sem_produtos"
+        
+        # Preços dos SKUs de todos os produtos da página
+        skus_por_produto = firebase_service.get_skus_por_produtos([p["_id"] for p in produtos])
         produtos_com_preco = []
         for prod in produtos:
-            skus = firebase_service.get_skus_por_produto(prod["_id"])
+            skus = skus_por_produto.get(prod["_id"])
             if skus:
                 preco_min = min(sku.get("preco", 0) for sku in skus)
                 preco_max = max(sku.get("preco", 0) for sku in skus)
@@ -115,43 +245,51 @@ class OrcamentoHandler:
                 prod["skus"] = skus
                 produtos_com_preco.append(prod)
         
-        if not produtos_com_preco:
-            return (
-                f"Não encontrei produtos disponíveis na categoria *{categoria}*. 😕\n\n"
-                + self._show_categorias(state)
-            )
-        
-        # Salva mapeamento
-        state.dados_temporarios.opcoes_produtos = {
-            str(i+1): prod for i, prod in enumerate(produtos_com_preco)
-        }
-        
-        state.etapa = Etapa.ORCAMENTO_PRODUTO
+        # Página sem produtos com preço só é erro quando a lista inteira é essa página
+        if not produtos_com_preco and not tem_anterior and proximo_cursor is None:
+            return None, "categoria_sem_disponiveis"
         
-        texto = f"🛍️ *Produtos em {categoria}:*\n\n"
+        partes = [t("produtos_titulo", categoria=categoria)]
         for i, prod in enumerate(produtos_com_preco, 1):
-            nome = prod.get("nome", "Produto")
             if prod["preco_min"] == prod["preco_max"]:
-                preco_str = f"R$ {prod['preco_min']:.2f}"
+                preco_str = templates.moeda(prod["preco_min"])
             else:
-                preco_str = f"R$ {prod['preco_min']:.2f} - R$ {prod['preco_max']:.2f}"
-            texto += f"{i}️⃣ *{nome}*\n   💰 {preco_str}\n\n"
-        
-        texto += "👉 Digite o *número* do produto desejado:\n"
-        texto += "_Ou digite *voltar* para ver outras categorias._"
-        
-        return texto
+                preco_str = t("faixa_preco", minimo=prod["preco_min"], maximo=prod["preco_max"])
+            partes.append(t("produto_item", n=i, nome=prod.get("nome", "Produto"), preco=preco_str))
+        navegacao = self._navegacao(tem_anterior, proximo_cursor is not None)
+        if navegacao:
+            partes.append(navegacao + "\n")
+        partes.append(t("produtos_rodape"))
+        
+        return PaginaRenderizada(
+            texto="".join(partes),
+            opcoes={str(i+1): prod for i, prod in enumerate(produtos_com_preco)},
+            proximo_cursor=proximo_cursor
+        ), None
     
     def _handle_produto(self, state: ConversationState, message: str) -> str:
         """Processa seleção de produto."""
-        if message.lower() == "voltar":
+        comando = message.strip().lower()
+        if comando == "voltar":
             return self._show_categorias(state)
         
+        dados = state.dados_temporarios
+        categoria = dados.categoria_selecionada
+        if comando == "mais":
+            if dados.proximo_cursor is None:
+                return t("paginacao_ultima") + self._show_produtos(state, categoria, dados.pagina_atual)
+            dados.cursores_pagina = dados.cursores_pagina[:dados.pagina_atual + 1] + [dados.proximo_cursor]
+            return self._show_produtos(state, categoria, dados.pagina_atual + 1)
+        if comando == "anterior":
+            if dados.pagina_atual == 0:
+                return t("paginacao_primeira") + self._show_produtos(state, categoria)
+            return self._show_produtos(state, categoria, dados.pagina_atual - 1)
+        
         opcao = message.strip()
-        opcoes = state.dados_temporarios.opcoes_produtos
+        opcoes = dados.opcoes_produtos
         
         if opcao not in opcoes:
-            return "Opção inválida. Por favor, escolha um número da lista de produtos."
+            return t("produto_invalido")
         
         produto = opcoes[opcao]
         state.dados_temporarios.produto_selecionado = produto["_id"]
@@ -165,21 +303,97 @@ class OrcamentoHandler:
             state.dados_temporarios.sku_selecionado = skus[0]["_id"]
             state.etapa = Etapa.ORCAMENTO_QUANTIDADE
             
-            preco = skus[0].get("preco", 0)
-            return (
-                f"✅ *{produto['nome']}*\n"
-                f"💰 Preço: R$ {preco:.2f}\n\n"
-                f"Quantas unidades você deseja?"
-            )
+            return t("produto_sku_unico", nome=produto["nome"], preco=skus[0].get("preco", 0))
         
         elif atributos and len(skus) > 1:
-            # Múltiplos SKUs com atributos
-            return self._show_skus_com_atributos(state, produto, skus)
+            # Múltiplos SKUs com atributos: escolhe um atributo por vez
+            return self._iniciar_variacoes(state, produto, skus)
         
         else:
             # Múltiplos SKUs sem atributos definidos
             return self._show_skus_simples(state, produto, skus)
     
+    def _iniciar_variacoes(self, state: ConversationState, produto: Dict, skus: List[Dict]) -> str:
+        """Começa a escolha da variação atributo por atributo (ex: Cor, depois Tamanho)."""
+        facetas = catalogo_service.get_catalogo().facetas(produto["_id"])
+        if facetas is None or not facetas.atributos:
+            # Produto ainda fora do catálogo em memória: lista todas as variações
+            return self._show_skus_com_atributos(state, produto, skus)
+        
+        dados = state.dados_temporarios
+        dados.atributos_pendentes = list(facetas.atributos)
+        dados.atributos_selecionados = {}
+        return self._perguntar_atributo(state)
+    
+    def _perguntar_atributo(self, state: ConversationState) -> str:
+        """
+        Pergunta o próximo atributo pendente, só com os valores que existem
+        para o que já foi escolhido. Atributos com um único valor possível
+        são selecionados sem perguntar; com tudo escolhido, resolve o SKU.
+        """
+        dados = state.dados_temporarios
+        catalogo = catalogo_service.get_catalogo()
+        facetas = catalogo.facetas(dados.produto_selecionado)
+        if facetas is None:
+            return t("produto_nao_encontrado", categorias=self._show_categorias(state))
+        
+        selecionados = dados.atributos_selecionados
+        selecao = tuple(selecionados.get(a, "") for a in facetas.atributos[:len(selecionados)])
+        
+        while dados.atributos_pendentes:
+            valores = facetas.valores(selecao)
+            if not valores:
+                return t("produto_nao_encontrado", categorias=self._show_categorias(state))
+            if len(valores) > 1:
+                break
+            selecionados[dados.atributos_pendentes.pop(0)] = valores[0][0]
+            selecao += (valores[0][0],)
+        else:
+            sku = facetas.resolver(selecao)
+            if sku is None:
+                return t("produto_nao_encontrado", categorias=self._show_categorias(state))
+            return self._selecionar_sku(state, catalogo.sku_to_dict(sku))
+        
+        dados.opcoes_skus = {str(i): valor for i, (valor, _) in enumerate(valores, 1)}
+        state.etapa = Etapa.ORCAMENTO_VARIACAO
+        
+        produto = catalogo.produto(dados.produto_selecionado)
+        partes = [t(
+            "variacao_atributo_titulo", nome=produto.nome,
+            selecao=" - " + " / ".join(selecionados.values()) if selecionados else "",
+            atributo=dados.atributos_pendentes[0]
+        )]
+        for i, (valor, skus) in enumerate(valores, 1):
+            precos = [catalogo.preco(s) for s in skus]
+            estoque = sum(self._livre(s.id, catalogo.estoque(s)) for s in skus)
+            if min(precos) == max(precos):
+                preco_str = templates.moeda(precos[0])
+            else:
+                preco_str = t("faixa_preco", minimo=min(precos), maximo=max(precos))
+            chave = "variacao_valor_estoque" if estoque > 0 else "variacao_valor_sob_consulta"
+            partes.append(t(chave, n=i, valor=valor, preco=preco_str, estoque=estoque))
+        partes.append(t("variacoes_rodape"))
+        
+        return "".join(partes)
+    
+    @staticmethod
+    def _livre(sku_id: str, estoque: int, reservado: int = 0) -> int:
+        """Unidades mostradas ao cliente: o estoque menos as reservas (0 = sob consulta)."""
+        if estoque <= 0:
+            return 0
+        return max(reserva_service.disponivel(sku_id, estoque, reservado), 0)
+    
+    def _handle_variacao(self, state: ConversationState, message: str) -> str:
+        """Processa o valor escolhido para o atributo pendente."""
+        opcao = message.strip()
+        dados = state.dados_temporarios
+        
+        if opcao not in dados.opcoes_skus or not dados.atributos_pendentes:
+            return t("opcao_invalida_lista")
+        
+        dados.atributos_selecionados[dados.atributos_pendentes.pop(0)] = dados.opcoes_skus[opcao]
+        return self._perguntar_atributo(state)
+    
     def _show_skus_com_atributos(
         self, 
         state: ConversationState, 
@@ -192,25 +406,16 @@ class OrcamentoHandler:
         }
         state.etapa = Etapa.ORCAMENTO_ATRIBUTOS
         
-        texto = f"🔍 *{produto['nome']}*\n\n"
-        texto += "Escolha a variação desejada:\n\n"
-        
+        partes = [t("variacoes_titulo", nome=produto["nome"])]
         for i, sku in enumerate(skus, 1):
             atributos = sku.get("atributos", {})
             attr_str = " / ".join([f"{k}: {v}" for k, v in atributos.items()])
-            preco = sku.get("preco", 0)
-            estoque = sku.get("estoque", 0)
-            
-            texto += f"{i}️⃣ {attr_str}\n"
-            texto += f"   💰 R$ {preco:.2f}"
-            if estoque > 0:
-                texto += f" | 📦 {estoque} em estoque\n\n"
-            else:
-                texto += f" | ⚠️ Sob consulta\n\n"
+            estoque = self._livre(sku["_id"], sku.get("estoque", 0), sku.get("reservado", 0))
+            chave = "variacao_item_estoque" if estoque > 0 else "variacao_item_sob_consulta"
+            partes.append(t(chave, n=i, atributos=attr_str, preco=sku.get("preco", 0), estoque=estoque))
+        partes.append(t("variacoes_rodape"))
         
-        texto += "👉 Digite o *número* da opção desejada:"
-        
-        return texto
+        return "".join(partes)
     
     def _show_skus_simples(
         self, 
@@ -224,17 +429,14 @@ class OrcamentoHandler:
         }
         state.etapa = Etapa.ORCAMENTO_ATRIBUTOS
         
-        texto = f"🔍 *{produto['nome']}*\n\n"
-        texto += "Opções disponíveis:\n\n"
-        
-        for i, sku in enumerate(skus, 1):
-            sku_code = sku.get("sku", "")
-            preco = sku.get("preco", 0)
-            texto += f"{i}️⃣ {sku_code} - R$ {preco:.2f}\n"
-        
-        texto += "\n👉 Digite o *número* da opção desejada:"
+        partes = [t("opcoes_sku_titulo", nome=produto["nome"])]
+        partes.extend(
+            t("opcao_sku_item", n=i, codigo=sku.get("sku", ""), preco=sku.get("preco", 0))
+            for i, sku in enumerate(skus, 1)
+        )
+        partes.append(t("opcoes_sku_rodape"))
         
-        return texto
+        return "".join(partes)
     
     def _handle_atributos(self, state: ConversationState, message: str) -> str:
         """Processa seleção de SKU/atributos."""
@@ -242,9 +444,13 @@ class OrcamentoHandler:
         opcoes = state.dados_temporarios.opcoes_skus
         
         if opcao not in opcoes:
-            return "Opção inválida. Por favor, escolha um número da lista."
+            return t("opcao_invalida_lista")
         
-        sku = opcoes[opcao]
+        return self._selecionar_sku(state, opcoes[opcao])
+    
+    def _selecionar_sku(self, state: ConversationState, sku: Dict) -> str:
+        """Registra o SKU escolhido e pergunta a quantidade."""
+        state.dados_temporarios.produto_selecionado = sku.get("produto_id")
         state.dados_temporarios.sku_selecionado = sku["_id"]
         state.etapa = Etapa.ORCAMENTO_QUANTIDADE
         
@@ -255,29 +461,28 @@ class OrcamentoHandler:
         else:
             attr_str = ""
         
-        preco = sku.get("preco", 0)
-        
-        return (
-            f"✅ Selecionado: *{sku.get('sku', '')}*{attr_str}\n"
-            f"💰 Preço unitário: R$ {preco:.2f}\n\n"
-            f"Quantas unidades você deseja?"
-        )
+        return t("sku_selecionado", codigo=sku.get("sku", ""), atributos=attr_str, preco=sku.get("preco", 0))
     
-    def _handle_quantidade(self, state: ConversationState, message: str) -> str:
-        """Processa quantidade desejada."""
+    def _validar_quantidade(self, state: ConversationState, message: str) -> Optional[str]:
+        """Valida quantidade (número inteiro maior que zero)."""
         try:
             quantidade = int(message.strip())
             if quantidade <= 0:
                 raise ValueError("Quantidade deve ser positiva")
         except ValueError:
-            return "Por favor, informe uma quantidade válida (número inteiro maior que zero)."
+            return t("quantidade_invalida")
+        return None
+    
+    def _handle_quantidade(self, state: ConversationState, message: str) -> str:
+        """Processa quantidade desejada (já validada)."""
+        quantidade = int(message.strip())
         
         # Verifica estoque
         sku_id = state.dados_temporarios.sku_selecionado
         sku = firebase_service.get_sku_by_id(sku_id)
         
         if not sku:
-            return "Ops! Não encontrei o produto. Vamos tentar novamente?\n\n" + self._show_categorias(state)
+            return t("produto_nao_encontrado", categorias=self._show_categorias(state))
         
         estoque_disponivel = sku.get("estoque", 0)
         
@@ -286,26 +491,119 @@ class OrcamentoHandler:
         if estoque_total > 0:
             estoque_disponivel = estoque_total
         
-        if estoque_disponivel > 0 and quantidade > estoque_disponivel:
-            return (
-                f"⚠️ Quantidade indisponível.\n"
-                f"Temos apenas *{estoque_disponivel}* unidades em estoque.\n\n"
-                f"Qual quantidade você deseja?"
-            )
+        livre = self._reservar_estoque(state, sku, quantidade, estoque_disponivel)
+        if livre is not None:
+            return t("quantidade_indisponivel", estoque=livre)
         
         state.dados_temporarios.quantidade_selecionada = quantidade
         
         # Adiciona ao orçamento
-        return self._adicionar_item_orcamento(state, sku, quantidade)
+        return self._adicionar_item_orcamento(state, sku, quantidade, estoque_disponivel)
+    
+    def _reservar_estoque(
+        self,
+        state: ConversationState,
+        sku: Dict,
+        quantidade: int,
+        estoque: int
+    ) -> Optional[int]:
+        """
+        Reserva a quantidade se houver unidades livres (estoque 0 = sem controle).
+        
+        Returns:
+            None se reservou; senão, as unidades livres
+        """
+        if estoque <= 0:
+            return None
+        # Desconta unidades reservadas em orçamentos de outros clientes
+        livre = reserva_service.disponivel(sku["_id"], estoque, sku.get("reservado", 0))
+        if quantidade > livre or not reserva_service.reservar(state.phone, sku["_id"], quantidade, estoque):
+            return max(livre, 0)
+        return None
+    
+    def pedido_rapido(self, state: ConversationState, message: str) -> Optional[str]:
+        """
+        Adiciona ao orçamento, de uma vez, os itens de um pedido por código.
+        
+        Returns:
+            Resposta, ou None se a mensagem não é um pedido rápido (inclusive
+            quando nenhum código existe: pode ser uma busca, ex: "ps5")
+        """
+        pedido = interpretar_pedido_rapido(message)
+        if pedido is None:
+            return None
+        
+        skus = self._resolver_codigos(list(pedido))
+        if not skus:
+            return None
+        estoques = firebase_service.get_estoque_skus([c for c in pedido if c in skus])
+        
+        avisos = []
+        adicionados = 0
+        for codigo, quantidade in pedido.items():
+            sku = skus.get(codigo)
+            if sku is None:
+                avisos.append(t("pedido_rapido_nao_encontrado", codigo=codigo))
+                continue
+            
+            estoque = estoques.get(codigo) or sku.get("estoque", 0)
+            livre = self._reservar_estoque(state, sku, quantidade, estoque)
+            if livre is not None:
+                avisos.append(t("pedido_rapido_sem_estoque", codigo=codigo, estoque=livre, quantidade=quantidade))
+                continue
+            
+            self._incluir_item(state, sku, quantidade, estoque)
+            adicionados += 1
+        
+        texto_avisos = t("pedido_rapido_avisos") + "".join(avisos) + "\n" + QUEBRA_MENSAGEM if avisos else ""
+        if not adicionados:
+            return texto_avisos + t("pedido_rapido_nenhum")
+        
+        state.fluxo = Fluxo.ORCAMENTO
+        state.etapa = Etapa.ORCAMENTO_CONTINUAR
+        return texto_avisos + self._mostrar_resumo_parcial(state)
+    
+    def _resolver_codigos(self, codigos: List[str]) -> Dict[str, Dict]:
+        """
+        SKUs ativos pelos códigos: primeiro no índice em memória do catálogo,
+        depois (códigos ainda fora do catálogo) com uma consulta em lote.
+        """
+        catalogo = catalogo_service.get_catalogo()
+        contexto = contexto_atual()
+        encontrados = {}
+        faltando = []
+        for codigo in codigos:
+            sku = catalogo.sku_por_codigo(codigo)
+            if sku is None or not sku.ativo:
+                faltando.append(codigo)
+                continue
+            encontrados[codigo] = catalogo.sku_to_dict(sku)
+            produto = catalogo.produto(sku.produto_id)
+            if contexto is not None and produto is not None:
+                # Evita reler o produto ao montar o item
+                contexto.semear("produtos", produto.id, catalogo.produto_to_dict(produto))
+        
+        if faltando:
+            encontrados.update(firebase_service.get_skus_por_codigos(faltando))
+        return encontrados
     
     def _adicionar_item_orcamento(
         self, 
         state: ConversationState, 
         sku: Dict, 
-        quantidade: int
+        quantidade: int,
+        estoque: int
     ) -> str:
-        """Adiciona item ao orçamento temporário."""
-        produto_id = state.dados_temporarios.produto_selecionado
+        """Adiciona item ao orçamento temporário e mostra o resumo."""
+        self._incluir_item(state, sku, quantidade, estoque)
+        state.etapa = Etapa.ORCAMENTO_CONTINUAR
+        
+        # Monta resumo
+        return self._mostrar_resumo_parcial(state)
+    
+    def _incluir_item(self, state: ConversationState, sku: Dict, quantidade: int, estoque: int):
+        """Inclui o SKU no orçamento temporário (estoque 0 = sem controle de estoque)."""
+        produto_id = sku.get("produto_id") or state.dados_temporarios.produto_selecionado
         produto = firebase_service.get_produto_by_id(produto_id)
         
         preco = sku.get("preco", 0)
@@ -324,80 +622,60 @@ class OrcamentoHandler:
         item = ItemOrcamento(
             item_id=item_id,
             sku=sku.get("sku", ""),
+            sku_id=sku["_id"],
             produto_id=produto_id,
             nome_produto=nome_produto,
             descricao=descricao,
             quantidade=quantidade,
             preco_unitario=preco,
             total=total,
-            atributos=atributos
+            atributos=atributos,
+            controla_estoque=estoque > 0
         )
         
         # Adiciona ao orçamento
         state.dados_temporarios.orcamento_atual.itens.append(item)
         state.dados_temporarios.orcamento_atual.subtotal += total
-        
-        state.etapa = Etapa.ORCAMENTO_CONTINUAR
-        
-        # Monta resumo
-        return self._mostrar_resumo_parcial(state)
     
     def _mostrar_resumo_parcial(self, state: ConversationState) -> str:
         """Mostra resumo parcial do orçamento."""
         orcamento = state.dados_temporarios.orcamento_atual
         
-        texto = "✅ *Item adicionado ao orçamento!*\n\n"
-        texto += "📋 *Resumo do seu orçamento:*\n"
-        texto += "─" * 20 + "\n\n"
-        
-        for item in orcamento.itens:
-            texto += f"• {item.descricao}\n"
-            texto += f"  {item.quantidade}x R$ {item.preco_unitario:.2f} = *R$ {item.total:.2f}*\n\n"
-        
-        texto += "─" * 20 + "\n"
-        texto += f"💰 *Subtotal: R$ {orcamento.subtotal:.2f}*\n\n"
-        
-        texto += "O que deseja fazer agora?\n\n"
-        texto += "1️⃣ Adicionar mais produtos\n"
-        texto += "2️⃣ Finalizar orçamento\n"
-        texto += "3️⃣ Falar com atendente"
+        partes = [t("resumo_titulo")]
+        partes.extend(
+            t(
+                "resumo_item", descricao=item.descricao, quantidade=item.quantidade,
+                preco=item.preco_unitario, total=item.total
+            )
+            for item in orcamento.itens
+        )
+        if len(orcamento.itens) > RESUMO_ITENS_NA_MENSAGEM:
+            partes.append(QUEBRA_MENSAGEM)
+        partes.append(t("resumo_rodape", subtotal=orcamento.subtotal))
         
-        return texto
+        return "".join(partes)
     
-    def _handle_continuar(self, state: ConversationState, message: str) -> str:
-        """Processa decisão após adicionar item."""
-        opcao = message.strip()
-        
-        if opcao == "1":
-            # Adicionar mais produtos
-            return self._show_categorias(state)
-        
-        elif opcao == "2":
-            # Finalizar orçamento
-            return self._finalizar_orcamento(state)
-        
-        elif opcao == "3":
-            # Falar com atendente
-            return self._encaminhar_atendente_com_orcamento(state)
-        
-        else:
-            return (
-                "Opção inválida. Por favor, escolha:\n\n"
-                "1️⃣ Adicionar mais produtos\n"
-                "2️⃣ Finalizar orçamento\n"
-                "3️⃣ Falar com atendente"
-            )
+    def _continuar_opcao_invalida(self, state: ConversationState, message: str) -> str:
+        """Resposta para opção inválida após adicionar item (opções na tabela de fluxo)."""
+        return self.pedido_rapido(state, message) or t("continuar_opcao_invalida")
     
     def _finalizar_orcamento(self, state: ConversationState) -> str:
         """Finaliza e salva o orçamento."""
         orcamento_temp = state.dados_temporarios.orcamento_atual
         
         if not orcamento_temp.itens:
-            return (
-                "Seu orçamento está vazio! 😅\n\n"
-                "Vamos adicionar alguns produtos?\n\n"
-                + self._show_categorias(state)
-            )
+            return t("orcamento_vazio", categorias=self._show_categorias(state))
+        
+        # Confere preço e estoque atuais de todos os itens de uma vez
+        snapshot_em = datetime.utcnow().isoformat()
+        avisos = self._revalidar_itens(state)
+        if avisos is None:
+            # Sem os SKUs atuais não dá para conferir: mantém o orçamento e pede nova tentativa
+            return t("revalidacao_erro")
+        revalidacao = t("revalidacao_titulo") + "".join(avisos) + "\n" + QUEBRA_MENSAGEM if avisos else ""
+        
+        if not orcamento_temp.itens:
+            return revalidacao + t("orcamento_vazio", categorias=self._show_categorias(state))
         
         # Prepara itens para salvar
         itens_para_salvar = []
@@ -405,6 +683,7 @@ class OrcamentoHandler:
             itens_para_salvar.append({
                 "item_id": item.item_id,
                 "sku": item.sku,
+                "sku_id": item.sku_id,
                 "produto_id": item.produto_id,
                 "descricao": item.descricao,
                 "quantidade": item.quantidade,
@@ -420,31 +699,27 @@ class OrcamentoHandler:
             cliente_nome=state.nome or "Cliente",
             cliente_telefone=state.phone,
             itens=itens_para_salvar,
-            subtotal=orcamento_temp.subtotal
+            subtotal=orcamento_temp.subtotal,
+            snapshot_em=snapshot_em
         )
         
         if not orcamento:
-            return (
-                "Ops! Ocorreu um erro ao salvar seu orçamento. 😕\n"
-                "Por favor, tente novamente ou fale com um atendente.\n\n"
-                "1️⃣ Tentar novamente\n"
-                "2️⃣ Falar com atendente"
-            )
+            return t("orcamento_erro_salvar")
         
-        numero = orcamento["numero_formatado"]
-        validade = orcamento["validade"]
-        total = orcamento["valores"]["total"]
+        reserva_service.vincular_orcamento(
+            state.phone, orcamento["numero_formatado"],
+            [item.sku_id for item in orcamento_temp.itens if item.sku_id]
+        )
         
         # Limpa dados temporários
         state.dados_temporarios = state.dados_temporarios.__class__()
         
-        texto = "🎉 *Orçamento gerado com sucesso!*\n\n"
-        texto += f"📄 *Número:* {numero}\n"
-        texto += f"💰 *Valor Total:* R$ {total:.2f}\n"
-        texto += f"📅 *Válido até:* {validade}\n\n"
-        texto += "─" * 20 + "\n\n"
-        texto += "Agora vou te encaminhar para um de nossos atendentes finalizar seu pedido! 😊\n\n"
-        texto += "⏳ Aguarde um momento, por favor."
+        texto = revalidacao + t(
+            "orcamento_gerado",
+            numero=orcamento["numero_formatado"],
+            total=orcamento["valores"]["total"],
+            validade=orcamento["validade"]
+        )
         
         # Encaminha para atendente
         state.etapa = Etapa.ENCAMINHADO_ATENDENTE
@@ -453,6 +728,64 @@ class OrcamentoHandler:
         
         return texto
     
+    def _revalidar_itens(self, state: ConversationState) -> Optional[List[str]]:
+        """
+        Atualiza preços e confere estoque dos itens do orçamento.
+        
+        Lê todos os SKUs com um get_all e o estoque com consultas em lote,
+        em vez de duas leituras por item. Itens inativos saem do orçamento.
+        
+        Returns:
+            Avisos para o cliente sobre os itens que mudaram, ou None se os
+            SKUs não puderam ser lidos (orçamento e reservas ficam intactos)
+        """
+        orcamento = state.dados_temporarios.orcamento_atual
+        
+        # Itens de conversas antigas não têm sku_id: localiza pelo código
+        for item in orcamento.itens:
+            if not item.sku_id:
+                sku = firebase_service.get_sku_by_codigo(item.sku)
+                item.sku_id = sku["_id"] if sku else None
+        
+        skus = firebase_service.get_skus_por_ids([item.sku_id for item in orcamento.itens if item.sku_id])
+        if skus is None:
+            return None
+        estoques = firebase_service.get_estoque_skus([item.sku for item in orcamento.itens])
+        
+        avisos = []
+        mantidos = []
+        for item in orcamento.itens:
+            sku = skus.get(item.sku_id)
+            if not sku or not sku.get("ativo", True):
+                avisos.append(t("revalidacao_indisponivel", descricao=item.descricao))
+                if item.sku_id:
+                    reserva_service.liberar(state.phone, item.sku_id)
+                continue
+            
+            preco = sku.get("preco", 0)
+            if preco != item.preco_unitario:
+                avisos.append(t(
+                    "revalidacao_preco", descricao=item.descricao,
+                    anterior=item.preco_unitario, atual=preco
+                ))
+                item.preco_unitario = preco
+                item.total = preco * item.quantidade
+            
+            estoque = estoques.get(item.sku) or sku.get("estoque", 0)
+            # Estoque 0 é "sem controle", a não ser que o SKU tivesse estoque
+            # controlado ao entrar no orçamento: aí 0 é esgotado
+            controla_estoque = item.controla_estoque or estoque > 0
+            if controla_estoque and estoque < item.quantidade:
+                avisos.append(t(
+                    "revalidacao_estoque" if estoque > 0 else "revalidacao_esgotado",
+                    descricao=item.descricao, estoque=estoque, quantidade=item.quantidade
+                ))
+            mantidos.append(item)
+        
+        orcamento.itens = mantidos
+        orcamento.subtotal = sum(item.total for item in mantidos)
+        return avisos
+    
     def _encaminhar_atendente_com_orcamento(self, state: ConversationState) -> str:
         """Encaminha para atendente mantendo o orçamento."""
         state.etapa = Etapa.ENCAMINHADO_ATENDENTE
@@ -461,15 +794,6 @@ class OrcamentoHandler:
         
         orcamento = state.dados_temporarios.orcamento_atual
         
-        texto = "Perfeito! 😊\n\n"
-        
         if orcamento.itens:
-            texto += f"Seu orçamento parcial (R$ {orcamento.subtotal:.2f}) foi salvo.\n\n"
-        
-        texto += (
-            "Vou te encaminhar agora para um atendente humano.\n\n"
-            "⏳ Aguarde um momento, por favor.\n\n"
-            "_Digite *menu* a qualquer momento para voltar ao início._"
-        )
-        
-        return texto
+            return t("orcamento_encaminhado_parcial", subtotal=orcamento.subtotal)
+        return t("orcamento_encaminhado")
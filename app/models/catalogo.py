@@ -0,0 +1,275 @@
+"""
+Modelos compactos do catálogo (produtos e SKUs) para cache em memória.
+
+Os documentos do Firestore chegam como dicionários, com cada string
+duplicada em cada documento ("Cor", "Tamanho", "Preto", ...). Aqui os
+objetos são imutáveis com __slots__, as strings repetidas são internadas,
+combinações de atributos idênticas compartilham a mesma tupla e preço e
+estoque ficam em colunas array indexadas pela posição do SKU.
+
+Os handlers continuam recebendo dicionários (produto_to_dict / sku_to_dict),
+no mesmo formato retornado pelo FirebaseService.
+"""
+import sys
+import zlib
+from array import array
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Any, Tuple, Iterable
+
+
+@dataclass(frozen=True, slots=True)
+class Produto:
+    """Produto do catálogo."""
+    id: str
+    nome: str
+    descricao: str
+    categoria: str
+    atributos: Tuple[str, ...]
+    ativo: bool = True
+
+
+@dataclass(frozen=True, slots=True)
+class Sku:
+    """
+    SKU do catálogo.
+    
+    Preço e estoque não ficam no objeto: são lidos das colunas do
+    Catalogo na posição `indice`, o que permite atualizá-los sem recriar
+    o SKU.
+    """
+    id: str
+    produto_id: str
+    codigo: str
+    atributos: Tuple[Tuple[str, str], ...]
+    indice: int
+    ativo: bool = True
+
+
+class Facetas:
+    """
+    Árvore de variações de um produto.
+    
+    Guarda a ordem dos atributos (a do produto, seguida de atributos que só
+    aparecem nos SKUs) e, para cada seleção parcial de valores nessa ordem,
+    os valores possíveis do próximo atributo com os SKUs abaixo de cada um.
+    Só existem combinações presentes em algum SKU ativo. A seleção completa
+    resolve o SKU por uma consulta em dicionário.
+    """
+    
+    __slots__ = ("atributos", "_proximos", "_por_selecao")
+    
+    def __init__(self, atributos_produto: Iterable[str], skus: Iterable[Sku]):
+        skus = [s for s in skus if s.ativo]
+        ordem = list(dict.fromkeys(
+            a for a in atributos_produto if any(dict(s.atributos).get(a) for s in skus)
+        ))
+        for sku in skus:
+            ordem.extend(k for k, _ in sku.atributos if k not in ordem)
+        self.atributos: Tuple[str, ...] = tuple(ordem)
+        
+        proximos: Dict[Tuple[str, ...], Dict[str, List[Sku]]] = {}
+        self._por_selecao: Dict[Tuple[str, ...], Sku] = {}
+        for sku in skus:
+            valores = dict(sku.atributos)
+            selecao = tuple(valores.get(a, "") for a in self.atributos)
+            for nivel in range(len(selecao)):
+                proximos.setdefault(selecao[:nivel], {}).setdefault(selecao[nivel], []).append(sku)
+            self._por_selecao.setdefault(selecao, sku)
+        
+        self._proximos: Dict[Tuple[str, ...], Tuple[Tuple[str, Tuple[Sku, ...]], ...]] = {
+            prefixo: tuple((valor, tuple(skus_valor)) for valor, skus_valor in por_valor.items())
+            for prefixo, por_valor in proximos.items()
+        }
+    
+    def valores(self, selecao: Tuple[str, ...]) -> Tuple[Tuple[str, Tuple[Sku, ...]], ...]:
+        """Valores possíveis do próximo atributo após a seleção parcial, com seus SKUs."""
+        return self._proximos.get(selecao, ())
+    
+    def resolver(self, selecao: Tuple[str, ...]) -> Optional[Sku]:
+        """SKU da seleção completa (um valor para cada atributo, na ordem)."""
+        return self._por_selecao.get(selecao)
+
+
+class Catalogo:
+    """Catálogo em memória com índices por id, código, produto e categoria."""
+    
+    __slots__ = (
+        "versao", "_produtos", "_skus", "_skus_lista", "_por_codigo",
+        "_skus_por_produto", "_produtos_por_categoria",
+        "_precos", "_estoques", "_tuplas_atributos", "_facetas"
+    )
+    
+    def __init__(self):
+        self.versao = 0
+        self._produtos: Dict[str, Produto] = {}
+        self._skus: Dict[str, Sku] = {}
+        self._skus_lista: List[Sku] = []
+        self._por_codigo: Dict[str, Sku] = {}
+        self._skus_por_produto: Dict[str, List[Sku]] = {}
+        self._produtos_por_categoria: Dict[str, List[Produto]] = {}
+        self._precos = array("d")
+        self._estoques = array("i")
+        # Combinações de atributos já vistas -> tupla compartilhada
+        self._tuplas_atributos: Dict[Tuple[Tuple[str, str], ...], Tuple[Tuple[str, str], ...]] = {}
+        # Árvores de variações, montadas na primeira consulta de cada produto
+        self._facetas: Dict[str, Facetas] = {}
+    
+    @classmethod
+    def from_dicts(
+        cls,
+        produtos: Iterable[Dict[str, Any]],
+        skus: Iterable[Dict[str, Any]]
+    ) -> "Catalogo":
+        """Monta o catálogo a partir dos documentos de produtos e SKUs."""
+        catalogo = cls()
+        for p in produtos:
+            catalogo.adicionar_produto(p)
+        for s in skus:
+            catalogo.adicionar_sku(s)
+        catalogo.versao = catalogo._calcular_versao()
+        return catalogo
+    
+    # ==================== CARGA ====================
+    
+    def adicionar_produto(self, data: Dict[str, Any]) -> Produto:
+        """Adiciona (ou substitui) um produto a partir do documento."""
+        intern = sys.intern
+        produto = Produto(
+            id=intern(data["_id"]),
+            nome=data.get("nome", ""),
+            descricao=data.get("descricao", ""),
+            categoria=intern(data.get("categoria", "")),
+            atributos=tuple(intern(a) for a in data.get("atributos", [])),
+            ativo=data.get("ativo", True)
+        )
+        anterior = self._produtos.get(produto.id)
+        if anterior is not None:
+            self._produtos_por_categoria[anterior.categoria].remove(anterior)
+        self._produtos[produto.id] = produto
+        self._facetas.pop(produto.id, None)
+        self._produtos_por_categoria.setdefault(produto.categoria, []).append(produto)
+        return produto
+    
+    def adicionar_sku(self, data: Dict[str, Any]) -> Sku:
+        """Adiciona (ou atualiza preço/estoque de) um SKU a partir do documento."""
+        existente = self._skus.get(data["_id"])
+        if existente is not None:
+            self._precos[existente.indice] = float(data.get("preco", 0))
+            self._estoques[existente.indice] = int(data.get("estoque", 0))
+            return existente
+        
+        intern = sys.intern
+        atributos = tuple(
+            (intern(k), intern(str(v))) for k, v in data.get("atributos", {}).items()
+        )
+        atributos = self._tuplas_atributos.setdefault(atributos, atributos)
+        
+        sku = Sku(
+            id=intern(data["_id"]),
+            produto_id=intern(data.get("produto_id", "")),
+            codigo=data.get("sku", ""),
+            atributos=atributos,
+            indice=len(self._skus_lista),
+            ativo=data.get("ativo", True)
+        )
+        self._skus[sku.id] = sku
+        self._skus_lista.append(sku)
+        self._por_codigo[sku.codigo] = sku
+        self._skus_por_produto.setdefault(sku.produto_id, []).append(sku)
+        self._facetas.pop(sku.produto_id, None)
+        self._precos.append(float(data.get("preco", 0)))
+        self._estoques.append(int(data.get("estoque", 0)))
+        return sku
+    
+    def _calcular_versao(self) -> int:
+        """Impressão digital do conteúdo: muda quando produtos, preços ou estoques mudam."""
+        crc = 0
+        for p in self._produtos.values():
+            crc = zlib.crc32(repr((p.id, p.nome, p.descricao, p.categoria, p.atributos, p.ativo)).encode(), crc)
+        for s in self._skus_lista:
+            crc = zlib.crc32(repr((s.id, s.produto_id, s.codigo, s.atributos, s.ativo)).encode(), crc)
+        crc = zlib.crc32(self._precos.tobytes(), crc)
+        crc = zlib.crc32(self._estoques.tobytes(), crc)
+        return crc
+    
+    # ==================== CONSULTAS ====================
+    
+    def __len__(self) -> int:
+        return len(self._skus_lista)
+    
+    def produto(self, produto_id: str) -> Optional[Produto]:
+        return self._produtos.get(produto_id)
+    
+    def sku(self, sku_id: str) -> Optional[Sku]:
+        return self._skus.get(sku_id)
+    
+    def sku_por_codigo(self, codigo: str) -> Optional[Sku]:
+        return self._por_codigo.get(codigo)
+    
+    def skus_do_produto(self, produto_id: str) -> List[Sku]:
+        return self._skus_por_produto.get(produto_id, [])
+    
+    def facetas(self, produto_id: str) -> Optional[Facetas]:
+        """Árvore de variações do produto (None se o produto não existe)."""
+        facetas = self._facetas.get(produto_id)
+        if facetas is None:
+            produto = self._produtos.get(produto_id)
+            if produto is None:
+                return None
+            facetas = self._facetas[produto_id] = Facetas(produto.atributos, self.skus_do_produto(produto_id))
+        return facetas
+    
+    def produtos_da_categoria(self, categoria: str) -> List[Produto]:
+        return self._produtos_por_categoria.get(categoria, [])
+    
+    def produtos(self) -> Iterable[Produto]:
+        return self._produtos.values()
+    
+    def skus(self) -> List[Sku]:
+        return self._skus_lista
+    
+    def categorias(self) -> List[str]:
+        """Categorias com ao menos um produto ativo, em ordem alfabética."""
+        return sorted(
+            cat for cat, produtos in self._produtos_por_categoria.items()
+            if any(p.ativo for p in produtos)
+        )
+    
+    def preco(self, sku: Sku) -> float:
+        return self._precos[sku.indice]
+    
+    def estoque(self, sku: Sku) -> int:
+        return self._estoques[sku.indice]
+    
+    def atualizar_estoque(self, sku_id: str, quantidade: int) -> bool:
+        """Atualiza o estoque em memória de um SKU."""
+        sku = self._skus.get(sku_id)
+        if sku is None:
+            return False
+        self._estoques[sku.indice] = quantidade
+        return True
+    
+    # ==================== CONVERSÃO ====================
+    
+    def produto_to_dict(self, produto: Produto) -> Dict[str, Any]:
+        """Documento do produto no formato do Firestore."""
+        return {
+            "_id": produto.id,
+            "nome": produto.nome,
+            "descricao": produto.descricao,
+            "categoria": produto.categoria,
+            "ativo": produto.ativo,
+            "atributos": list(produto.atributos)
+        }
+    
+    def sku_to_dict(self, sku: Sku) -> Dict[str, Any]:
+        """Documento do SKU no formato do Firestore."""
+        return {
+            "_id": sku.id,
+            "produto_id": sku.produto_id,
+            "sku": sku.codigo,
+            "preco": self._precos[sku.indice],
+            "estoque": self._estoques[sku.indice],
+            "ativo": sku.ativo,
+            "atributos": dict(sku.atributos)
+        }
@@ -1,11 +1,15 @@
 """
 Modelos para gerenciamento de estado da conversa.
 """
+import json
+import zlib
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
 
+from app.models.migrations import SCHEMA_VERSION_ATUAL, migrar, precisa_migrar
+
 
 class Etapa(str, Enum):
     """Etapas possíveis da conversa."""
@@ -18,6 +22,7 @@ class Etapa(str, Enum):
     ORCAMENTO_PRODUTO = "orcamento_produto"
     ORCAMENTO_QUANTIDADE = "orcamento_quantidade"
     ORCAMENTO_ATRIBUTOS = "orcamento_atributos"
+    ORCAMENTO_VARIACAO = "orcamento_variacao"
     ORCAMENTO_CONFIRMAR = "orcamento_confirmar"
     ORCAMENTO_CONTINUAR = "orcamento_continuar"
     
@@ -41,10 +46,17 @@ class Fluxo(str, Enum):
     ATENDENTE = "atendente"
 
 
+# Versões do formato binário de dados_temporarios (ver DadosTemporarios.to_blob)
+BLOB_FORMATO_V1 = 1
+BLOB_FORMATO_ATUAL = BLOB_FORMATO_V1
+BLOB_ZLIB_NIVEL = 1
+
+
 class ItemOrcamento(BaseModel):
     """Item de um orçamento em construção."""
     item_id: int
     sku: str
+    sku_id: Optional[str] = None
     produto_id: str
     nome_produto: str
     descricao: str
@@ -52,6 +64,8 @@ class ItemOrcamento(BaseModel):
     preco_unitario: float
     total: float
     atributos: Dict[str, str] = {}
+    # SKU tinha estoque controlado (estoque > 0) quando entrou no orçamento
+    controla_estoque: bool = False
 
 
 class OrcamentoTemporario(BaseModel):
@@ -70,8 +84,39 @@ class DadosTemporarios(BaseModel):
     atributos_selecionados: Dict[str, str] = {}
     opcoes_produtos: Dict[str, Any] = {}
     opcoes_skus: Dict[str, Any] = {}
+    # Paginação da lista atual: cursor de início de cada página já vista
+    # (ID do último item da página anterior) e cursor da próxima página
+    pagina_atual: int = 0
+    cursores_pagina: List[Optional[str]] = []
+    proximo_cursor: Optional[str] = None
     numero_pedido: Optional[str] = None
     orcamento_atual: OrcamentoTemporario = OrcamentoTemporario()
+    
+    def to_blob(self) -> bytes:
+        """
+        Serializa em formato binário compacto.
+        
+        Layout: 1 byte com a versão do formato + JSON comprimido (zlib).
+        O Firestore passa a codificar um único campo bytes em vez do mapa
+        aninhado inteiro, que é a parte cara da (de)serialização.
+        """
+        payload = zlib.compress(self.model_dump_json().encode("utf-8"), BLOB_ZLIB_NIVEL)
+        return bytes((BLOB_FORMATO_ATUAL,)) + payload
+    
+    @classmethod
+    def from_blob(cls, blob: bytes) -> "DadosTemporarios":
+        """Reconstrói a partir do formato gerado por to_blob."""
+        return cls.model_validate(cls.blob_to_dict(blob))
+    
+    @staticmethod
+    def blob_to_dict(blob: bytes) -> Dict[str, Any]:
+        """Decodifica o blob para dicionário bruto, sem validação."""
+        if not blob:
+            return {}
+        versao = blob[0]
+        if versao == BLOB_FORMATO_V1:
+            return json.loads(zlib.decompress(blob[1:]))
+        raise ValueError(f"Formato de dados_temporarios desconhecido: {versao}")
 
 
 class ConversationState(BaseModel):
@@ -84,26 +129,50 @@ class ConversationState(BaseModel):
     encaminhado_atendente: bool = False
     ultima_atualizacao: datetime = Field(default_factory=datetime.utcnow)
     
-    def to_dict(self) -> Dict[str, Any]:
-        """Converte para dicionário para salvar no Firestore."""
-        return {
+    def to_dict(self, compacto: bool = False) -> Dict[str, Any]:
+        """
+        Converte para dicionário para salvar no Firestore.
+        
+        Args:
+            compacto: Se True, grava dados_temporarios como blob binário
+                      (campo dados_temporarios_blob) em vez de mapa.
+        """
+        data = {
+            "schema_version": SCHEMA_VERSION_ATUAL,
             "phone": self.phone,
             "nome": self.nome,
             "etapa": self.etapa.value,
             "fluxo": self.fluxo.value,
-            "dados_temporarios": self.dados_temporarios.model_dump(),
             "encaminhado_atendente": self.encaminhado_atendente,
             "ultima_atualizacao": self.ultima_atualizacao.isoformat()
         }
+        if compacto:
+            data["dados_temporarios_blob"] = self.dados_temporarios.to_blob()
+        else:
+            data["dados_temporarios"] = self.dados_temporarios.model_dump()
+        return data
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "ConversationState":
-        """Cria instância a partir de dicionário do Firestore."""
+        """
+        Cria instância a partir de dicionário do Firestore.
+        
+        Documentos em versão de schema antiga são migrados antes da
+        validação; a versão atual é gravada no próximo save.
+        """
+        if precisa_migrar(data):
+            if "dados_temporarios_blob" in data:
+                data["dados_temporarios"] = DadosTemporarios.blob_to_dict(data.pop("dados_temporarios_blob"))
+            data = migrar(data)
+        data.pop("schema_version", None)
+        
         if "etapa" in data:
             data["etapa"] = Etapa(data["etapa"])
         if "fluxo" in data:
             data["fluxo"] = Fluxo(data["fluxo"])
-        if "dados_temporarios" in data:
+        if "dados_temporarios_blob" in data:
+            data["dados_temporarios"] = DadosTemporarios.from_blob(data.pop("dados_temporarios_blob"))
+        elif "dados_temporarios" in data:
             data["dados_temporarios"] = DadosTemporarios(**data["dados_temporarios"])
         if "ultima_atualizacao" in data and isinstance(data["ultima_atualizacao"], str):
             data["ultima_atualizacao"] = datetime.fromisoformat(data["ultima_atualizacao"])
@@ -0,0 +1,83 @@
+"""
+Migrações de schema dos documentos de conversa (collection "conversas").
+
+Cada migração recebe o dicionário bruto do Firestore na versão N e devolve
+o dicionário na versão N+1. As migrações são aplicadas sob demanda quando
+o estado é carregado (ConversationState.from_dict) e o documento é
+regravado já na versão atual no próximo save. Documentos parados podem ser
+migrados em lote com FirebaseService.backfill_conversas.
+
+Para alterar valores de Etapa ou o formato de DadosTemporarios:
+    1. incremente SCHEMA_VERSION_ATUAL;
+    2. registre a função de migração da versão anterior com @migracao.
+"""
+import logging
+from typing import Callable, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# Versão gravada em todo documento salvo. Documentos sem o campo são v0.
+SCHEMA_VERSION_ATUAL = 1
+
+Migracao = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+_migracoes: Dict[int, Migracao] = {}
+
+
+def migracao(versao_origem: int) -> Callable[[Migracao], Migracao]:
+    """Registra a função que migra um documento de versao_origem para versao_origem + 1."""
+    def registrar(fn: Migracao) -> Migracao:
+        if versao_origem in _migracoes:
+            raise ValueError(f"Migração v{versao_origem} já registrada")
+        _migracoes[versao_origem] = fn
+        return fn
+    return registrar
+
+
+def versao_documento(data: Dict[str, Any]) -> int:
+    """Versão de schema de um documento bruto."""
+    return data.get("schema_version", 0)
+
+
+def precisa_migrar(data: Dict[str, Any]) -> bool:
+    """Indica se o documento está em versão anterior à atual."""
+    return versao_documento(data) < SCHEMA_VERSION_ATUAL
+
+
+def migrar(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Aplica em sequência as migrações pendentes do documento.
+    
+    Args:
+        data: Documento bruto do Firestore (dados_temporarios como mapa)
+        
+    Returns:
+        Documento na versão SCHEMA_VERSION_ATUAL
+    """
+    versao = versao_documento(data)
+    
+    if versao > SCHEMA_VERSION_ATUAL:
+        # Documento gravado por uma versão mais nova da aplicação (deploy em andamento)
+        logger.warning(
+            f"Conversa {data.get('phone')} com schema v{versao} "
+            f"(aplicação suporta até v{SCHEMA_VERSION_ATUAL})"
+        )
+        return data
+    
+    while versao < SCHEMA_VERSION_ATUAL:
+        fn = _migracoes.get(versao)
+        if fn is None:
+            raise RuntimeError(f"Migração de conversa v{versao} -> v{versao + 1} não registrada")
+        data = fn(data)
+        versao += 1
+        data["schema_version"] = versao
+    
+    return data
+
+
+# ==================== MIGRAÇÕES ====================
+
+@migracao(0)
+def _v0_para_v1(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Documentos anteriores ao versionamento: formato igual, só passa a ter schema_version."""
+    return data
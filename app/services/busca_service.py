@@ -0,0 +1,291 @@
+"""
+Busca de produtos por texto livre sobre o catálogo em memória.
+
+Cada SKU é um documento com os termos do nome e da descrição do produto,
+dos valores dos atributos e do código. Os termos são normalizados (sem
+acento, minúsculos) e ficam num índice invertido termo -> IDs de SKU.
+Para tolerar erros de digitação, o vocabulário também é indexado por
+trigramas: um termo da busca que não existe no índice é expandido para
+os termos parecidos (e para os que começam com ele).
+
+A busca retorna primeiro os SKUs que contêm todos os termos exatos, depois
+os que contêm todos com aproximação e por fim os que contêm a maioria. Cada
+etapa é uma interseção de conjuntos, começando pelo menor, e só roda se a
+anterior não preencheu o limite.
+
+O índice acompanha o catálogo de forma incremental: quando a versão do
+catálogo muda, só os produtos cujo texto mudou são reindexados (preço e
+estoque não entram no índice).
+"""
+import heapq
+import logging
+import re
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter
+from itertools import combinations
+from typing import Optional, List, Dict, Set, Tuple, Sequence
+
+from app.models.catalogo import Catalogo, Produto, Sku
+from app.services.catalogo_service import catalogo_service
+
+logger = logging.getLogger(__name__)
+
+# Palavras ignoradas na busca e na indexação
+STOPWORDS = frozenset({"a", "o", "as", "os", "de", "da", "do", "das", "dos", "e", "com", "para", "em"})
+
+# Similaridade mínima de trigramas (Jaccard) para aceitar um termo aproximado
+SIMILARIDADE_MINIMA = 0.4
+# Termos aproximados considerados por termo da busca
+MAX_EXPANSOES = 8
+# Termos menores que isso só casam exatamente
+TAMANHO_MINIMO_APROXIMADO = 3
+# Termos considerados por busca
+MAX_TERMOS_BUSCA = 6
+# Uniões de termos aproximados mantidas em cache
+MAX_UNIOES_CACHE = 1024
+
+_VAZIO: frozenset = frozenset()
+
+_RE_TERMO = re.compile(r"[a-z0-9]+")
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas e sem acentos ("Camisão Preto" -> "camisao preto")."""
+    decomposto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def termos(texto: str) -> List[str]:
+    """Termos normalizados do texto, sem stopwords."""
+    return [termo for termo in _RE_TERMO.findall(normalizar(texto)) if termo not in STOPWORDS]
+
+
+def trigramas(termo: str) -> Set[str]:
+    """Trigramas do termo, com marcação de início e fim."""
+    marcado = f"  {termo} "
+    return {marcado[i:i + 3] for i in range(len(marcado) - 2)}
+
+
+class IndiceBusca:
+    """Índice invertido de SKUs, com vocabulário indexado por trigramas."""
+    
+    def __init__(self):
+        self.versao_catalogo: Optional[int] = None
+        # Documentos: posição -> sku_id (None = removido)
+        self._docs: List[Optional[str]] = []
+        self._livres: List[int] = []
+        self._doc_por_sku: Dict[str, int] = {}
+        self._termos_do_doc: Dict[int, Tuple[str, ...]] = {}
+        # Produto -> (impressão digital do texto, docs dos seus SKUs)
+        self._produtos: Dict[str, Tuple[tuple, List[int]]] = {}
+        # Termo -> docs; trigrama -> termos; vocabulário ordenado para prefixos
+        self._postings: Dict[str, Set[int]] = {}
+        self._por_trigrama: Dict[str, Set[str]] = {}
+        self._vocabulario: List[str] = []
+        self._expansoes: Dict[str, Tuple[str, ...]] = {}
+        self._unioes: Dict[str, Set[int]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._doc_por_sku)
+    
+    # ==================== ATUALIZAÇÃO ====================
+    
+    def sincronizar(self, catalogo: Catalogo) -> int:
+        """
+        Atualiza o índice para o catálogo, reindexando só produtos alterados.
+        
+        Returns:
+            Quantidade de produtos reindexados ou removidos
+        """
+        alterados = 0
+        vistos = set()
+        for produto in catalogo.produtos():
+            vistos.add(produto.id)
+            skus = [s for s in catalogo.skus_do_produto(produto.id) if s.ativo] if produto.ativo else []
+            digital = self._impressao_digital(produto, skus)
+            atual = self._produtos.get(produto.id)
+            if atual is not None and atual[0] == digital:
+                continue
+            self._remover_produto(produto.id)
+            self._produtos[produto.id] = (digital, [self._adicionar_doc(produto, s) for s in skus])
+            alterados += 1
+        
+        for produto_id in [p for p in self._produtos if p not in vistos]:
+            self._remover_produto(produto_id)
+            del self._produtos[produto_id]
+            alterados += 1
+        
+        if alterados:
+            self._expansoes.clear()
+            self._unioes.clear()
+        self.versao_catalogo = catalogo.versao
+        return alterados
+    
+    @staticmethod
+    def _impressao_digital(produto: Produto, skus: List[Sku]) -> tuple:
+        """Tudo o que entra no texto indexado do produto (comparado por igualdade)."""
+        return (produto.nome, produto.descricao, tuple((s.id, s.codigo, s.atributos) for s in skus))
+    
+    def _adicionar_doc(self, produto: Produto, sku: Sku) -> int:
+        texto = " ".join((produto.nome, produto.descricao, sku.codigo, *(v for _, v in sku.atributos)))
+        termos_doc = tuple(set(termos(texto)))
+        
+        doc = self._livres.pop() if self._livres else len(self._docs)
+        if doc == len(self._docs):
+            self._docs.append(sku.id)
+        else:
+            self._docs[doc] = sku.id
+        self._doc_por_sku[sku.id] = doc
+        self._termos_do_doc[doc] = termos_doc
+        
+        for termo in termos_doc:
+            postings = self._postings.get(termo)
+            if postings is None:
+                postings = self._postings[termo] = set()
+                insort(self._vocabulario, termo)
+                for tri in trigramas(termo):
+                    self._por_trigrama.setdefault(tri, set()).add(termo)
+            postings.add(doc)
+        return doc
+    
+    def _remover_produto(self, produto_id: str):
+        atual = self._produtos.get(produto_id)
+        if atual is None:
+            return
+        for doc in atual[1]:
+            for termo in self._termos_do_doc.pop(doc):
+                self._postings[termo].discard(doc)
+            del self._doc_por_sku[self._docs[doc]]
+            self._docs[doc] = None
+            self._livres.append(doc)
+        # Termos sem documentos ficam no vocabulário: casam com um conjunto vazio
+    
+    # ==================== CONSULTA ====================
+    
+    def _expandir(self, termo: str) -> Tuple[str, ...]:
+        """Termos do vocabulário aceitos para um termo da busca, além dele mesmo."""
+        expansao = self._expansoes.get(termo)
+        if expansao is not None:
+            return expansao
+        
+        aceitos = []
+        if len(termo) >= TAMANHO_MINIMO_APROXIMADO:
+            # Termos que começam com o digitado ("cami" -> "camiseta")
+            i = bisect_left(self._vocabulario, termo)
+            while i < len(self._vocabulario) and self._vocabulario[i].startswith(termo) \
+                    and len(aceitos) < MAX_EXPANSOES:
+                if self._vocabulario[i] != termo:
+                    aceitos.append(self._vocabulario[i])
+                i += 1
+            
+            # Termos com trigramas parecidos ("camizeta" -> "camiseta")
+            tris = trigramas(termo)
+            comuns = Counter()
+            for tri in tris:
+                comuns.update(self._por_trigrama.get(tri, ()))
+            similares = []
+            for candidato, n in comuns.items():
+                similaridade = n / (len(tris) + len(candidato) + 1 - n)
+                if similaridade >= SIMILARIDADE_MINIMA and candidato != termo:
+                    similares.append((similaridade, candidato))
+            aceitos.extend(c for _, c in heapq.nlargest(MAX_EXPANSOES, similares) if c not in aceitos)
+        
+        expansao = tuple(aceitos)
+        self._expansoes[termo] = expansao
+        return expansao
+    
+    def _docs_aproximados(self, termo: str) -> Set[int]:
+        """Docs do termo e dos termos aproximados (união guardada em cache)."""
+        uniao = self._unioes.get(termo)
+        if uniao is None:
+            exatos = self._postings.get(termo, _VAZIO)
+            expansao = self._expandir(termo)
+            uniao = exatos.union(*(self._postings[e] for e in expansao)) if expansao else exatos
+            if len(self._unioes) >= MAX_UNIOES_CACHE:
+                self._unioes.clear()
+            self._unioes[termo] = uniao
+        return uniao
+    
+    @staticmethod
+    def _completar(resultado: List[int], vistos: Set[int], conjuntos: Sequence[Set[int]], limite: int):
+        """Acrescenta ao resultado docs presentes em todos os conjuntos."""
+        if len(resultado) >= limite or not all(conjuntos):
+            return
+        ordenados = sorted(conjuntos, key=len)
+        candidatos = ordenados[0].intersection(*ordenados[1:]) if len(ordenados) > 1 else ordenados[0]
+        for doc in candidatos:
+            if doc not in vistos:
+                vistos.add(doc)
+                resultado.append(doc)
+                if len(resultado) >= limite:
+                    return
+    
+    def buscar(self, consulta: str, limite: int = 8) -> List[str]:
+        """
+        Busca SKUs pelo texto.
+        
+        Returns:
+            IDs dos SKUs encontrados, mais relevantes primeiro
+        """
+        termos_busca = list(dict.fromkeys(termos(consulta)))[:MAX_TERMOS_BUSCA]
+        if not termos_busca:
+            return []
+        
+        resultado: List[int] = []
+        vistos: Set[int] = set()
+        self._completar(resultado, vistos, [self._postings.get(t, _VAZIO) for t in termos_busca], limite)
+        
+        if len(resultado) < limite:
+            aproximados = [self._docs_aproximados(t) for t in termos_busca]
+            self._completar(resultado, vistos, aproximados, limite)
+            
+            # Nenhum SKU suficiente com todos os termos: vale o que tiver mais deles
+            minimo = (len(aproximados) + 1) // 2
+            for tamanho in range(len(aproximados) - 1, minimo - 1, -1):
+                for grupo in combinations(aproximados, tamanho):
+                    self._completar(resultado, vistos, grupo, limite)
+        
+        return [self._docs[doc] for doc in resultado]
+
+
+class BuscaService:
+    """Índice de busca do catálogo atual, sincronizado quando o catálogo muda."""
+    
+    _instance = None
+    _indice: Optional[IndiceBusca] = None
+    
+    def __new__(cls):
+        """Singleton pattern."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+    
+    def get_indice(self) -> IndiceBusca:
+        """Retorna o índice, sincronizando com o catálogo se a versão mudou."""
+        catalogo = catalogo_service.get_catalogo()
+        if self._indice is None:
+            self._indice = IndiceBusca()
+        if self._indice.versao_catalogo != catalogo.versao:
+            inicio = time.perf_counter()
+            alterados = self._indice.sincronizar(catalogo)
+            logger.info(
+                f"🔎 Índice de busca sincronizado: {alterados} produtos reindexados, "
+                f"{len(self._indice)} SKUs ({(time.perf_counter() - inicio) * 1000:.0f} ms)"
+            )
+        return self._indice
+    
+    def buscar(self, consulta: str, limite: int = 8) -> List[Sku]:
+        """Busca SKUs ativos do catálogo atual pelo texto."""
+        catalogo = catalogo_service.get_catalogo()
+        skus = []
+        for sku_id in self.get_indice().buscar(consulta, limite):
+            sku = catalogo.sku(sku_id)
+            if sku is not None:
+                skus.append(sku)
+        return skus
+
+
+# Instância global do serviço
+busca_service = BuscaService()
@@ -0,0 +1,321 @@
+"""
+Campanhas: envio de uma mensagem a um segmento das conversas.
+
+Uma campanha tem um texto (com campos como nos templates: {nome},
+{primeiro_nome}, {telefone}) e um segmento: campos de `conversas` que devem
+ser iguais a um valor (ex: {"optin_promocoes": true}) e, opcionalmente, a
+data mínima da última atualização (ativos_desde). O envio:
+
+- percorre o segmento em páginas ordenadas por telefone, com cursor, sem
+  carregar a lista inteira;
+- envia cada página com até CAMPANHA_CONCORRENCIA envios simultâneos e no
+  máximo `mensagens_por_segundo` (limite de envio da Z-API), pausando
+  enquanto o circuito da Z-API estiver aberto;
+- grava um checkpoint (cursor e contadores) no documento da campanha ao fim
+  de cada página. Depois de um reinício, o envio continua do checkpoint: no
+  pior caso a página em andamento é reenviada.
+
+Só um worker envia cada campanha: ele a assume com um lease renovado a cada
+checkpoint, e qualquer worker retoma campanhas em envio cujo lease venceu.
+Pausar ou cancelar altera o status no documento; o dono percebe no próximo
+checkpoint e para. Um erro do Firestore ao ler a página ou gravar o
+checkpoint é tentado de novo com espera crescente (TENTATIVAS_FIRESTORE
+vezes); se persistir, o worker para sem contar progresso e a campanha é
+retomada do último checkpoint quando o lease vencer.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List
+
+from app.config import get_settings
+from app.services.disjuntor import disjuntor_zapi, ABERTO
+from app.services.firebase_service import firebase_service, CAMPANHA_DE_OUTRO_WORKER
+from app.services.metricas import metricas
+from app.services.zapi_service import zapi_service
+from app.templates.renderer import templates
+
+logger = logging.getLogger(__name__)
+
+STATUS_ENVIANDO = "enviando"
+STATUS_PAUSADA = "pausada"
+STATUS_CANCELADA = "cancelada"
+STATUS_CONCLUIDA = "concluida"
+
+# Campos lidos de cada conversa do segmento
+CAMPOS_DESTINATARIO = ["phone", "nome", "ultima_atualizacao"]
+
+# Intervalo entre verificações do circuito da Z-API enquanto ele está aberto
+ESPERA_CIRCUITO_SEGUNDOS = 1.0
+
+# Tentativas de cada leitura de página e checkpoint; a espera dobra a cada
+# erro a partir de 1 s (31 s no total, menos que o lease)
+TENTATIVAS_FIRESTORE = 6
+
+# Valores de exemplo usados para validar o texto na criação
+_EXEMPLO = {"nome": "Maria Silva", "primeiro_nome": "Maria", "telefone": "5511999999999"}
+
+
+class _LimitadorTaxa:
+    """Espaça as chamadas para no máximo `por_segundo` por segundo."""
+    
+    def __init__(self, por_segundo: float):
+        self.intervalo = 1 / por_segundo
+        self._proximo = 0.0
+    
+    async def aguardar(self):
+        agora = time.monotonic()
+        espera = self._proximo - agora
+        self._proximo = max(agora, self._proximo) + self.intervalo
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+
+class CampanhaService:
+    """Criação, envio e controle das campanhas."""
+    
+    _instance = None
+    _initialized = False
+    
+    def __new__(cls):
+        """Singleton pattern."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+    
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        self.settings = get_settings()
+        self._dono = f"{socket.gethostname()}-{os.getpid()}"
+        self._tarefas: Dict[str, asyncio.Task] = {}
+        self._vigia: Optional[asyncio.Task] = None
+    
+    # ==================== CICLO DE VIDA ====================
+    
+    def iniciar(self):
+        """Inicia a verificação periódica de campanhas a retomar (lifespan)."""
+        if self._vigia is None or self._vigia.done():
+            self._vigia = asyncio.create_task(self._vigiar())
+    
+    async def parar(self):
+        """Interrompe os envios deste worker; o checkpoint fica para quem retomar."""
+        tarefas = [t for t in (self._vigia, *self._tarefas.values()) if t is not None]
+        for tarefa in tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+        self._vigia = None
+        self._tarefas.clear()
+    
+    async def _vigiar(self):
+        """Retoma campanhas em envio sem dono ativo (reinício ou worker que caiu)."""
+        while True:
+            try:
+                campanhas = await asyncio.to_thread(firebase_service.listar_campanhas, STATUS_ENVIANDO)
+                for campanha in campanhas:
+                    self._executar_em_segundo_plano(campanha["_id"])
+            except Exception as e:
+                logger.error(f"❌ Erro ao verificar campanhas pendentes: {e}", exc_info=True)
+            await asyncio.sleep(self.settings.campanha_lease_segundos)
+    
+    def _executar_em_segundo_plano(self, campanha_id: str):
+        tarefa = self._tarefas.get(campanha_id)
+        if tarefa is None or tarefa.done():
+            self._tarefas[campanha_id] = asyncio.create_task(self._executar(campanha_id))
+    
+    # ==================== CONTROLE ====================
+    
+    def criar(self, nome: str, texto: str, filtros: Optional[Dict[str, Any]] = None,
+              ativos_desde: Optional[str] = None, mensagens_por_segundo: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Cria a campanha e inicia o envio neste worker.
+        
+        Raises:
+            ValueError: texto com campo desconhecido, taxa inválida ou erro ao gravar
+        """
+        try:
+            templates.renderizador(texto)(**_EXEMPLO)
+        except (KeyError, ValueError) as e:
+            raise ValueError(f"Texto inválido (campos disponíveis: {', '.join(_EXEMPLO)}): {e}")
+        taxa = mensagens_por_segundo or self.settings.campanha_mensagens_por_segundo
+        if taxa <= 0:
+            raise ValueError("mensagens_por_segundo deve ser maior que 0")
+        
+        filtros = filtros or {}
+        campanha = {
+            "nome": nome,
+            "texto": texto,
+            "filtros": filtros,
+            "ativos_desde": ativos_desde,
+            "mensagens_por_segundo": taxa,
+            "status": STATUS_ENVIANDO,
+            # Conversas que batem com os filtros; ativos_desde é aplicado na
+            # leitura das páginas (contar com ele exigiria um índice composto
+            # por combinação de filtros), então é o máximo de destinatários
+            "total_maximo": firebase_service.contar_conversas(filtros),
+            "cursor": None,
+            "lidos": 0,
+            "enviados": 0,
+            "falhas": 0,
+            "ignorados": 0,
+            "criada_em": datetime.utcnow().isoformat(),
+            "atualizada_em": None,
+            "concluida_em": None,
+            "dono": None,
+            "lease_ate": ""
+        }
+        campanha_id = firebase_service.criar_campanha(campanha)
+        if campanha_id is None:
+            raise ValueError("Não foi possível gravar a campanha")
+        logger.info(f"📣 Campanha {campanha_id} criada: {nome} (até {campanha['total_maximo']} conversas)")
+        self._executar_em_segundo_plano(campanha_id)
+        return self.progresso(dict(campanha, _id=campanha_id))
+    
+    def alterar_status(self, campanha_id: str, status: str) -> Optional[Dict[str, Any]]:
+        """
+        Pausa, retoma ou cancela a campanha.
+        
+        Returns:
+            Campanha atualizada, ou None se não existe
+        
+        Raises:
+            ValueError: campanha já concluída ou cancelada
+        """
+        campanha = firebase_service.get_campanha(campanha_id)
+        if campanha is None:
+            return None
+        if campanha["status"] in (STATUS_CONCLUIDA, STATUS_CANCELADA):
+            raise ValueError(f"Campanha já {campanha['status']}")
+        firebase_service.atualizar_campanha(campanha_id, {"status": status})
+        campanha["status"] = status
+        logger.info(f"📣 Campanha {campanha_id}: {status}")
+        if status == STATUS_ENVIANDO:
+            self._executar_em_segundo_plano(campanha_id)
+        return self.progresso(campanha)
+    
+    def obter(self, campanha_id: str) -> Optional[Dict[str, Any]]:
+        campanha = firebase_service.get_campanha(campanha_id)
+        return self.progresso(campanha) if campanha else None
+    
+    def listar(self) -> List[Dict[str, Any]]:
+        return [self.progresso(c) for c in firebase_service.listar_campanhas()]
+    
+    @staticmethod
+    def progresso(campanha: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Dados públicos da campanha com o percentual processado: conversas
+        lidas (inclusive as ignoradas por ativos_desde) sobre total_maximo.
+        """
+        dados = {k: v for k, v in campanha.items() if k not in ("dono", "lease_ate")}
+        total = campanha.get("total_maximo")
+        dados["percentual"] = round(min(campanha["lidos"] / total * 100, 100), 1) if total else None
+        return dados
+    
+    # ==================== ENVIO ====================
+    
+    def _lease(self, mensagens_por_segundo: float) -> str:
+        """Validade do lease: cobre pelo menos duas páginas no ritmo da campanha."""
+        segundos = max(self.settings.campanha_lease_segundos, 2 * self.settings.campanha_lote / mensagens_por_segundo)
+        return (datetime.utcnow() + timedelta(seconds=segundos)).isoformat()
+    
+    async def _tentar(self, descricao: str, func, *args):
+        """Chama `func` numa thread até ela não devolver None (erro); None se todas as tentativas falharem."""
+        for tentativa in range(TENTATIVAS_FIRESTORE):
+            resultado = await asyncio.to_thread(func, *args)
+            if resultado is not None:
+                return resultado
+            if tentativa + 1 < TENTATIVAS_FIRESTORE:
+                espera = 2 ** tentativa
+                logger.warning(f"⚠️ {descricao} falhou; nova tentativa em {espera} s")
+                await asyncio.sleep(espera)
+        logger.error(f"❌ {descricao} falhou {TENTATIVAS_FIRESTORE} vezes; envio retomado quando o lease vencer")
+        return None
+    
+    async def _executar(self, campanha_id: str):
+        try:
+            await self._enviar_campanha(campanha_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Erro no envio da campanha {campanha_id}: {e}", exc_info=True)
+    
+    async def _enviar_campanha(self, campanha_id: str):
+        campanha = await asyncio.to_thread(firebase_service.get_campanha, campanha_id)
+        if campanha is None:
+            return
+        status = await self._tentar(
+            f"Assumir a campanha {campanha_id}", firebase_service.assumir_campanha,
+            campanha_id, self._dono, self._lease(campanha["mensagens_por_segundo"])
+        )
+        if status != STATUS_ENVIANDO:
+            return
+        logger.info(f"📣 Enviando campanha {campanha_id} a partir de {campanha['cursor'] or 'o início'}")
+        
+        renderizar = templates.renderizador(campanha["texto"])
+        limitador = _LimitadorTaxa(campanha["mensagens_por_segundo"])
+        semaforo = asyncio.Semaphore(self.settings.campanha_concorrencia)
+        ativos_desde = campanha.get("ativos_desde")
+        progresso = {k: campanha[k] for k in ("cursor", "lidos", "enviados", "falhas", "ignorados")}
+        
+        async def enviar(conversa: Dict[str, Any]) -> bool:
+            nome = conversa.get("nome") or ""
+            texto = renderizar(nome=nome, primeiro_nome=nome.split(" ")[0], telefone=conversa["_id"])
+            async with semaforo:
+                # Z-API fora: espera o circuito em vez de gastar o segmento em falhas
+                while disjuntor_zapi.estado == ABERTO:
+                    await asyncio.sleep(ESPERA_CIRCUITO_SEGUNDOS)
+                await limitador.aguardar()
+                message_id = await asyncio.to_thread(zapi_service.send_message, conversa["_id"], texto)
+            metricas.campanha_envios.inc("enviada" if message_id else "falha")
+            return bool(message_id)
+        
+        while True:
+            resultado = await self._tentar(
+                f"Leitura da página da campanha {campanha_id}", firebase_service.listar_conversas_pagina,
+                campanha["filtros"], progresso["cursor"], self.settings.campanha_lote, CAMPOS_DESTINATARIO
+            )
+            if resultado is None:
+                return
+            pagina, proximo = resultado
+            destinatarios = [c for c in pagina if not ativos_desde or c.get("ultima_atualizacao", "") >= ativos_desde]
+            resultados = await asyncio.gather(*(enviar(c) for c in destinatarios))
+            
+            progresso["lidos"] += len(pagina)
+            progresso["enviados"] += sum(resultados)
+            progresso["falhas"] += len(resultados) - sum(resultados)
+            progresso["ignorados"] += len(pagina) - len(destinatarios)
+            if pagina:
+                progresso["cursor"] = pagina[-1]["_id"]
+            progresso["atualizada_em"] = datetime.utcnow().isoformat()
+            
+            if proximo is None:
+                await asyncio.to_thread(firebase_service.atualizar_campanha, campanha_id, {
+                    **progresso, "status": STATUS_CONCLUIDA, "concluida_em": progresso["atualizada_em"]
+                })
+                logger.info(f"✅ Campanha {campanha_id} concluída: {progresso['enviados']} enviadas, "
+                            f"{progresso['falhas']} falhas, {progresso['ignorados']} fora do segmento")
+                return
+            
+            status = await self._tentar(
+                f"Checkpoint da campanha {campanha_id}", firebase_service.assumir_campanha,
+                campanha_id, self._dono, self._lease(campanha["mensagens_por_segundo"]), progresso
+            )
+            if status is None:
+                # Página enviada sem checkpoint: quem retomar a reenvia
+                return
+            if status == CAMPANHA_DE_OUTRO_WORKER:
+                logger.warning(f"⚠️ Campanha {campanha_id} assumida por outro worker; parando")
+                return
+            if status != STATUS_ENVIANDO:
+                # Pausada ou cancelada: grava o progresso da última página e para
+                await asyncio.to_thread(firebase_service.atualizar_campanha, campanha_id, progresso)
+                logger.info(f"⏸️ Campanha {campanha_id} {status} em {progresso['cursor']}")
+                return
+
+
+# Instância global do serviço
+campanha_service = CampanhaService()
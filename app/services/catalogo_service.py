@@ -0,0 +1,105 @@
+"""
+Serviço de catálogo em memória.
+
+Mantém por worker uma cópia compacta (app.models.catalogo) dos produtos e
+SKUs ativos. A primeira carga é feita na partida da aplicação (lifespan) ou,
+sem ela, na primeira consulta. Depois disso a mensagem do cliente nunca
+espera uma recarga: quando o TTL configurado expira, o catálogo atual
+continua em uso e uma thread o recarrega do Firestore.
+
+Com o Firestore indisponível (leitura vazia ou circuito aberto) o último
+catálogo continua em uso, e também responde às consultas de produtos e SKUs
+do FirebaseService enquanto o circuito estiver aberto.
+"""
+import logging
+import threading
+import time
+from typing import Optional
+
+from app.config import get_settings
+from app.models.catalogo import Catalogo
+from app.services.disjuntor import disjuntor_firestore, ABERTO
+from app.services.firebase_service import firebase_service
+from app.services.rastreamento import rastreado
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogoService:
+    """Cache do catálogo completo em memória."""
+    
+    _instance = None
+    _catalogo: Optional[Catalogo] = None
+    _carregado_em: float = 0.0
+    _recarregando = False
+    _lock = threading.Lock()
+    
+    def __new__(cls):
+        """Singleton pattern."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+    
+    def get_catalogo(self) -> Catalogo:
+        """Retorna o catálogo; se o TTL expirou, agenda a recarga em segundo plano."""
+        if self._catalogo is None:
+            return self.recarregar()
+        ttl = get_settings().catalogo_cache_ttl_segundos
+        # Circuito aberto: a leitura falharia; segue com o catálogo atual
+        if time.monotonic() - self._carregado_em > ttl and disjuntor_firestore.estado != ABERTO:
+            self._recarregar_em_segundo_plano()
+        return self._catalogo
+    
+    def versao(self) -> int:
+        """Versão do catálogo atual, sem ler o Firestore na requisição (0 antes da primeira carga)."""
+        if self._catalogo is None:
+            return 0
+        return self.get_catalogo().versao
+    
+    def _recarregar_em_segundo_plano(self):
+        with self._lock:
+            if self._recarregando:
+                return
+            self._recarregando = True
+        threading.Thread(target=self._recarregar_thread, name="catalogo", daemon=True).start()
+    
+    def _recarregar_thread(self):
+        try:
+            self.recarregar()
+        except Exception as e:
+            logger.error(f"Erro ao recarregar o catálogo: {e}", exc_info=True)
+        finally:
+            self._recarregando = False
+    
+    @rastreado("catalogo.recarregar")
+    def recarregar(self) -> Catalogo:
+        """Recarrega produtos e SKUs do Firestore."""
+        inicio = time.perf_counter()
+        produtos, skus = firebase_service.listar_catalogo()
+        catalogo = Catalogo.from_dicts(produtos, skus)
+        
+        if not len(catalogo) and self._catalogo is not None:
+            # Falha na leitura: mantém o último catálogo conhecido e tenta de
+            # novo quando o circuito puder fechar, sem esperar o TTL inteiro
+            logger.warning("Catálogo vazio ao recarregar, mantendo versão anterior")
+            ttl = get_settings().catalogo_cache_ttl_segundos
+            espera = min(disjuntor_firestore.aberto_segundos, ttl)
+            self._carregado_em = time.monotonic() - ttl + espera
+            return self._catalogo
+        
+        self._catalogo = catalogo
+        self._carregado_em = time.monotonic()
+        firebase_service.definir_catalogo_conhecido(catalogo)
+        logger.info(
+            f"Catálogo carregado: {len(catalogo)} SKUs, versão {catalogo.versao:08x} "
+            f"({(time.perf_counter() - inicio) * 1000:.0f} ms)"
+        )
+        return catalogo
+    
+    def invalidar(self):
+        """Faz a próxima consulta agendar a recarga."""
+        self._carregado_em = 0.0
+
+
+# Instância global do serviço
+catalogo_service = CatalogoService()
@@ -0,0 +1,124 @@
+"""
+Contexto de uma mensagem: memoiza documentos lidos enquanto ela é processada
+e contabiliza as operações no Firestore.
+
+Durante uma mensagem o mesmo SKU ou produto costuma ser buscado mais de uma
+vez (por ID, por código, de novo ao montar o item do orçamento), e boa parte
+deles já veio no estado da conversa (opcoes_skus / opcoes_produtos). Dentro
+de `contexto_requisicao()` as buscas decoradas com `@memoizado` vão ao banco
+uma vez por documento, e o contexto conta quantas foram reaproveitadas.
+
+O FirebaseService informa o custo de cada chamada com `contabilizar()`:
+documentos lidos e gravados (o que o Firestore cobra) e consultas feitas.
+O modo MOCK contabiliza o que o Firestore cobraria, para que o custo de uma
+conversa possa ser conferido sem banco (benchmarks/custo_firestore.py).
+
+Fora de um contexto as buscas funcionam normalmente, sem memoização nem
+contabilização.
+"""
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Dict, Any, Tuple, Iterator, Callable
+
+from app.models.conversation import ConversationState
+
+
+class ContextoRequisicao:
+    """Documentos já obtidos na mensagem atual e contadores de operações."""
+    
+    __slots__ = ("documentos", "leituras", "escritas", "consultas", "reaproveitadas")
+    
+    def __init__(self):
+        self.documentos: Dict[Tuple[str, str], Any] = {}
+        self.leituras = 0
+        self.escritas = 0
+        self.consultas = 0
+        self.reaproveitadas = 0
+    
+    def semear(self, colecao: str, chave: str, documento: Any):
+        """Registra um documento já conhecido (não conta como leitura)."""
+        self.documentos.setdefault((colecao, chave), documento)
+    
+    def semear_do_estado(self, state: ConversationState):
+        """Semeia SKUs e produtos guardados nas opções da conversa."""
+        dados = state.dados_temporarios
+        for sku in dados.opcoes_skus.values():
+            if isinstance(sku, dict) and "_id" in sku:
+                self._semear_sku(sku)
+        for produto in dados.opcoes_produtos.values():
+            if isinstance(produto, dict) and "_id" in produto:
+                self.semear("produtos", produto["_id"], produto)
+                for sku in produto.get("skus", []):
+                    self._semear_sku(sku)
+    
+    def _semear_sku(self, sku: Dict[str, Any]):
+        self.semear("skus", sku["_id"], sku)
+        if sku.get("sku"):
+            self.semear("skus_codigo", sku["sku"], sku)
+    
+    def resumo(self) -> Dict[str, int]:
+        return {
+            "leituras": self.leituras,
+            "escritas": self.escritas,
+            "consultas": self.consultas,
+            "reaproveitadas": self.reaproveitadas
+        }
+
+
+_contexto: ContextVar[Optional[ContextoRequisicao]] = ContextVar("contexto_requisicao", default=None)
+
+
+@contextmanager
+def contexto_requisicao() -> Iterator[ContextoRequisicao]:
+    """Abre o contexto da mensagem (ou reaproveita o que já está aberto)."""
+    atual = _contexto.get()
+    if atual is not None:
+        yield atual
+        return
+    
+    contexto = ContextoRequisicao()
+    token = _contexto.set(contexto)
+    try:
+        yield contexto
+    finally:
+        _contexto.reset(token)
+
+
+def contexto_atual() -> Optional[ContextoRequisicao]:
+    return _contexto.get()
+
+
+def contabilizar(leituras: int = 0, escritas: int = 0, consultas: int = 0):
+    """Soma operações do Firestore ao contexto atual (sem contexto, ignora)."""
+    contexto = _contexto.get()
+    if contexto is not None:
+        contexto.leituras += leituras
+        contexto.escritas += escritas
+        contexto.consultas += consultas
+
+
+def memoizado(colecao: str) -> Callable:
+    """
+    Memoiza no contexto da mensagem uma busca de documento por chave.
+    
+    O documento retornado é compartilhado dentro da mensagem e não deve
+    ser alterado por quem o recebe.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(self, chave: str):
+            contexto = _contexto.get()
+            if contexto is None:
+                return func(self, chave)
+            
+            documentos = contexto.documentos
+            if (colecao, chave) in documentos:
+                contexto.reaproveitadas += 1
+                return documentos[(colecao, chave)]
+            
+            documento = func(self, chave)
+            documentos[(colecao, chave)] = documento
+            return documento
+        return wrapper
+    return decorator
@@ -0,0 +1,173 @@
+"""
+Disjuntores (circuit breakers) das dependências externas: Z-API e Firestore.
+
+Cada disjuntor acompanha o resultado das chamadas numa janela deslizante de
+DISJUNTOR_JANELA_SEGUNDOS (um balde por segundo) e tem três estados:
+
+- fechado: as chamadas passam. Se na janela houve pelo menos
+  DISJUNTOR_MINIMO_CHAMADAS chamadas e a fração de falhas chegou a
+  DISJUNTOR_TAXA_ERRO, abre;
+- aberto: `permitir()` devolve False na hora, sem tocar na rede, durante
+  DISJUNTOR_ABERTO_SEGUNDOS;
+- meio-aberto: passa uma chamada de teste por vez. Sucesso fecha (com a
+  janela zerada); falha abre de novo.
+
+Quem chama decide o que fazer com a recusa: a Z-API devolve "não enviada"
+e a resposta vai para a outbox; o Firestore falha antes da consulta e o
+catálogo é servido da última versão carregada.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Optional, Dict, Any
+
+from app.config import get_settings
+from app.services.metricas import metricas
+
+logger = logging.getLogger(__name__)
+
+FECHADO = "fechado"
+MEIO_ABERTO = "meio_aberto"
+ABERTO = "aberto"
+
+# Valor exportado no medidor chatbot_disjuntor_estado
+_VALOR_ESTADO = {FECHADO: 0, MEIO_ABERTO: 1, ABERTO: 2}
+
+
+class CircuitoAberto(Exception):
+    """Chamada recusada pelo disjuntor sem acessar a dependência."""
+    
+    def __init__(self, dependencia: str):
+        super().__init__(f"circuito {dependencia} aberto")
+        self.dependencia = dependencia
+
+
+class Disjuntor:
+    """Disjuntor de uma dependência, seguro para uso entre threads."""
+    
+    def __init__(
+        self,
+        nome: str,
+        taxa_erro: float,
+        minimo_chamadas: int,
+        janela_segundos: int,
+        aberto_segundos: float
+    ):
+        self.nome = nome
+        self.taxa_erro = taxa_erro
+        self.minimo_chamadas = minimo_chamadas
+        self.janela_segundos = janela_segundos
+        self.aberto_segundos = aberto_segundos
+        self._estado = FECHADO
+        # Baldes [segundo, chamadas, falhas], do mais antigo para o mais novo
+        self._janela: deque = deque()
+        self._aberto_ate = 0.0
+        self._teste_desde: Optional[float] = None
+        self._lock = threading.Lock()
+        metricas.disjuntor_estado.definir(0, nome)
+    
+    @property
+    def estado(self) -> str:
+        with self._lock:
+            self._expirar(time.monotonic())
+            return self._estado
+    
+    def permitir(self) -> bool:
+        """
+        Indica se a chamada pode ir à dependência. No meio-aberto, a primeira
+        chamada vira o teste e as outras são recusadas até o resultado dele.
+        
+        Quem recebe True deve informar o resultado com `registrar()`.
+        """
+        agora = time.monotonic()
+        with self._lock:
+            self._expirar(agora)
+            if self._estado == FECHADO:
+                return True
+            # Teste sem resultado por um período inteiro (chamada perdida): libera outro
+            if self._estado == MEIO_ABERTO and (
+                self._teste_desde is None or agora - self._teste_desde > self.aberto_segundos
+            ):
+                self._teste_desde = agora
+                return True
+        metricas.disjuntor_rejeitadas.inc(self.nome)
+        return False
+    
+    def registrar(self, sucesso: bool):
+        """Registra o resultado de uma chamada permitida."""
+        agora = time.monotonic()
+        with self._lock:
+            self._expirar(agora)
+            if self._estado == MEIO_ABERTO:
+                self._teste_desde = None
+                if sucesso:
+                    self._janela.clear()
+                    self._mudar(FECHADO, "chamada de teste bem-sucedida")
+                else:
+                    self._abrir(agora, "chamada de teste falhou")
+                return
+            if self._estado == ABERTO:
+                # Chamada iniciada antes de o circuito abrir
+                return
+            
+            segundo = int(agora)
+            if not self._janela or self._janela[-1][0] != segundo:
+                self._janela.append([segundo, 0, 0])
+            while self._janela[0][0] <= segundo - self.janela_segundos:
+                self._janela.popleft()
+            balde = self._janela[-1]
+            balde[1] += 1
+            if sucesso:
+                return
+            balde[2] += 1
+            
+            chamadas = sum(b[1] for b in self._janela)
+            falhas = sum(b[2] for b in self._janela)
+            if chamadas >= self.minimo_chamadas and falhas >= self.taxa_erro * chamadas:
+                self._abrir(agora, f"{falhas}/{chamadas} falhas em {self.janela_segundos} s")
+    
+    def _expirar(self, agora: float):
+        if self._estado == ABERTO and agora >= self._aberto_ate:
+            self._mudar(MEIO_ABERTO, "aguardando chamada de teste")
+    
+    def _abrir(self, agora: float, motivo: str):
+        self._aberto_ate = agora + self.aberto_segundos
+        self._mudar(ABERTO, f"{motivo}; recusando chamadas por {self.aberto_segundos:g} s")
+    
+    def _mudar(self, estado: str, motivo: str):
+        self._estado = estado
+        metricas.disjuntor_estado.definir(_VALOR_ESTADO[estado], self.nome)
+        metricas.disjuntor_transicoes.inc(self.nome, estado)
+        if estado == FECHADO:
+            logger.info(f"🔌 Circuito {self.nome} fechado ({motivo})")
+        else:
+            logger.warning(f"🔌 Circuito {self.nome} {estado.replace('_', '-')} ({motivo})")
+    
+    def resumo(self) -> Dict[str, Any]:
+        agora = time.monotonic()
+        with self._lock:
+            self._expirar(agora)
+            janela = [b for b in self._janela if b[0] > int(agora) - self.janela_segundos]
+            return {
+                "estado": self._estado,
+                "chamadas_na_janela": sum(b[1] for b in janela),
+                "falhas_na_janela": sum(b[2] for b in janela),
+                "aberto_por_segundos": round(max(self._aberto_ate - agora, 0), 1) if self._estado == ABERTO else 0
+            }
+
+
+def _criar(nome: str) -> Disjuntor:
+    settings = get_settings()
+    return Disjuntor(
+        nome,
+        taxa_erro=settings.disjuntor_taxa_erro,
+        minimo_chamadas=settings.disjuntor_minimo_chamadas,
+        janela_segundos=settings.disjuntor_janela_segundos,
+        aberto_segundos=settings.disjuntor_aberto_segundos
+    )
+
+
+# Instâncias globais, uma por dependência
+disjuntor_zapi = _criar("zapi")
+disjuntor_firestore = _criar("firestore")
@@ -0,0 +1,249 @@
+"""
+Entregas: tempo do envio até a entrega e a leitura de cada mensagem.
+
+O messageId devolvido pela Z-API em cada envio entra numa fila ordenada
+por horário de envio (OrderedDict messageId -> (enviado_em, entregue)).
+Os callbacks de status da Z-API (MessageStatusCallback com RECEIVED, READ
+ou PLAYED) são casados com ela pelo ID. Cada tempo é contado num
+histograma de buckets fixos (BUCKETS_ENTREGA) da hora do envio. A
+mensagem sai da fila ao ser lida, ou depois de ENTREGAS_RETENCAO_HORAS
+(contada como sem entrega ou sem leitura). Memória: uma entrada por
+mensagem ainda não lida, no máximo ENTREGAS_CAPACIDADE.
+
+A cada ENTREGAS_ROLLUP_SEGUNDOS as contagens acumuladas são somadas, com
+incremento atômico, ao documento da hora na coleção "entregas_horas". Os
+percentis por hora saem da soma dos buckets de todos os workers, por
+interpolação dentro do bucket (como o histogram_quantile do Prometheus).
+
+Com vários workers, o callback só casa com o envio se chegar ao worker que
+enviou; os outros contam em chatbot_status_callbacks_total{casado="nao"}.
+Os percentis valem como amostra, mas as taxas (entregues / envios) não.
+O tempo usa o horário do evento informado no callback ("momment"), então
+depende do relógio da Z-API estar próximo do nosso.
+"""
+import asyncio
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Tuple
+
+from app.config import get_settings
+from app.services.firebase_service import firebase_service
+from app.services.metricas import metricas, BUCKETS_ENTREGA
+
+logger = logging.getLogger(__name__)
+
+# Tipos de callback da Z-API tratados aqui
+CALLBACKS_STATUS = ("MessageStatusCallback", "DeliveryCallback")
+
+# Status do MessageStatusCallback que marcam entrega e leitura
+STATUS_ENTREGUE = ("RECEIVED",)
+STATUS_LIDA = ("READ", "PLAYED")
+
+ETAPAS = ("entrega", "leitura")
+PERCENTIS = (0.5, 0.9, 0.99)
+
+_LIMITES = BUCKETS_ENTREGA + (float("inf"),)
+
+
+def _hora(epoch: float) -> str:
+    """Chave da hora (UTC) no formato "AAAA-MM-DDTHH"."""
+    return time.strftime("%Y-%m-%dT%H", time.gmtime(epoch))
+
+
+def percentil(contagens: List[int], p: float) -> Optional[float]:
+    """Percentil p (0-1) estimado das contagens por bucket; None sem amostras."""
+    total = sum(contagens)
+    if not total:
+        return None
+    alvo = p * total
+    acumulado = 0
+    inferior = 0.0
+    for limite, n in zip(_LIMITES, contagens):
+        if n and acumulado + n >= alvo:
+            if limite == float("inf"):
+                # Acima do último limite: só se sabe que passou dele
+                return inferior
+            return inferior + (limite - inferior) * (alvo - acumulado) / n
+        acumulado += n
+        inferior = limite
+    return inferior
+
+
+class Entregas:
+    """Mensagens enviadas aguardando entrega/leitura e contagens por hora."""
+    
+    _instance = None
+    _initialized = False
+    
+    def __new__(cls):
+        """Singleton pattern."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+    
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        self.settings = get_settings()
+        # messageId -> (enviado_em, entregue), em ordem de envio
+        self._mensagens: "OrderedDict[str, Tuple[float, bool]]" = OrderedDict()
+        # Contagens ainda não gravadas: hora -> campo -> valor
+        self._pendentes: Dict[str, Dict[str, float]] = {}
+        # Envios vêm de várias threads (webhook, outbox, campanhas)
+        self._lock = threading.Lock()
+        self._tarefa: Optional[asyncio.Task] = None
+    
+    # ==================== CICLO DE VIDA ====================
+    
+    def iniciar(self):
+        """Inicia a consolidação periódica no event loop atual."""
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = asyncio.create_task(self._executar())
+    
+    async def parar(self):
+        """Interrompe a consolidação e grava as contagens pendentes."""
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+        await asyncio.to_thread(self.consolidar)
+    
+    async def _executar(self):
+        while True:
+            await asyncio.sleep(self.settings.entregas_rollup_segundos)
+            try:
+                await asyncio.to_thread(self.consolidar)
+            except Exception as e:
+                logger.error(f"❌ Erro ao consolidar entregas: {e}", exc_info=True)
+    
+    # ==================== REGISTRO ====================
+    
+    def _somar(self, hora: str, campo: str, valor: float = 1):
+        contagens = self._pendentes.setdefault(hora, {})
+        contagens[campo] = contagens.get(campo, 0) + valor
+    
+    def registrar_envio(self, message_id: str, enviado_em: Optional[float] = None):
+        """Registra o messageId de uma mensagem aceita pela Z-API."""
+        enviado_em = enviado_em or time.time()
+        with self._lock:
+            self._mensagens[message_id] = (enviado_em, False)
+            self._somar(_hora(enviado_em), "envios")
+            if len(self._mensagens) > self.settings.entregas_capacidade:
+                self._descartar_mais_antiga()
+    
+    def registrar_callback(self, data: Dict[str, Any]) -> int:
+        """
+        Casa um callback de status com os envios; devolve quantas mensagens casaram.
+        
+        DeliveryCallback só confirma que a Z-API repassou a mensagem ao WhatsApp
+        (ou traz o erro): é contado, sem tempo registrado.
+        """
+        if data.get("type") == "DeliveryCallback":
+            status = "ERRO" if data.get("error") else "DELIVERY"
+            ids = [data.get("messageId")]
+        else:
+            status = str(data.get("status", "")).upper()
+            ids = data.get("ids") or [data.get("messageId")]
+        momento = data.get("momment")
+        evento_em = momento / 1000 if isinstance(momento, (int, float)) and momento > 0 else time.time()
+        
+        casadas = 0
+        with self._lock:
+            for message_id in ids:
+                registro = self._mensagens.get(message_id) if message_id else None
+                if registro is None:
+                    continue
+                casadas += 1
+                enviado_em, entregue = registro
+                if status in STATUS_ENTREGUE and not entregue:
+                    self._mensagens[message_id] = (enviado_em, True)
+                    self._contar(enviado_em, "entrega", evento_em)
+                elif status in STATUS_LIDA:
+                    del self._mensagens[message_id]
+                    if not entregue:
+                        # Lida sem confirmação de entrega: a leitura implica a entrega
+                        self._contar(enviado_em, "entrega", evento_em)
+                    self._contar(enviado_em, "leitura", evento_em)
+        metricas.status_callbacks.inc(status or "desconhecido", "sim" if casadas else "nao")
+        return casadas
+    
+    def _contar(self, enviado_em: float, etapa: str, evento_em: float):
+        segundos = max(evento_em - enviado_em, 0.0)
+        hora = _hora(enviado_em)
+        # bisect_left: primeiro bucket com limite >= tempo, como no Histograma
+        self._somar(hora, f"{etapa}_{bisect_left(BUCKETS_ENTREGA, segundos):02d}")
+        self._somar(hora, f"{etapa}_soma", segundos)
+        metricas.entrega_latencia.observar(segundos, etapa)
+    
+    def _descartar_mais_antiga(self):
+        _, (enviado_em, entregue) = self._mensagens.popitem(last=False)
+        self._somar(_hora(enviado_em), "sem_leitura" if entregue else "sem_entrega")
+    
+    # ==================== CONSOLIDAÇÃO ====================
+    
+    def consolidar(self):
+        """Descarta as mensagens vencidas e soma as contagens no Firestore."""
+        limite = time.time() - self.settings.entregas_retencao_horas * 3600
+        with self._lock:
+            while self._mensagens and next(iter(self._mensagens.values()))[0] < limite:
+                self._descartar_mais_antiga()
+            pendentes, self._pendentes = self._pendentes, {}
+        
+        for hora, contagens in pendentes.items():
+            if not firebase_service.incrementar_entregas_hora(hora, contagens):
+                # Fica para a próxima consolidação
+                with self._lock:
+                    for campo, valor in contagens.items():
+                        self._somar(hora, campo, valor)
+    
+    # ==================== CONSULTA ====================
+    
+    def resumo_por_hora(self, horas: int = 24) -> Dict[str, Any]:
+        """Envios, entregas, leituras e percentis dos tempos das últimas `horas` horas."""
+        desde = _hora(time.time() - (horas - 1) * 3600)
+        resumos = {r["hora"]: dict(r) for r in firebase_service.listar_entregas_horas(desde)}
+        # Soma as contagens deste worker ainda não gravadas
+        with self._lock:
+            for hora, contagens in self._pendentes.items():
+                if hora >= desde:
+                    resumo = resumos.setdefault(hora, {"hora": hora})
+                    for campo, valor in contagens.items():
+                        resumo[campo] = resumo.get(campo, 0) + valor
+            acompanhadas = len(self._mensagens)
+        
+        return {
+            "acompanhadas": acompanhadas,
+            "horas": [self._formatar(resumos[hora]) for hora in sorted(resumos, reverse=True)]
+        }
+    
+    @staticmethod
+    def _formatar(resumo: Dict[str, Any]) -> Dict[str, Any]:
+        dados = {
+            "hora": resumo["hora"] + ":00Z",
+            "envios": int(resumo.get("envios", 0)),
+            "sem_entrega": int(resumo.get("sem_entrega", 0)),
+            "sem_leitura": int(resumo.get("sem_leitura", 0))
+        }
+        for etapa in ETAPAS:
+            contagens = [int(resumo.get(f"{etapa}_{i:02d}", 0)) for i in range(len(_LIMITES))]
+            total = sum(contagens)
+            etapa_dados = {
+                "total": total,
+                "media_segundos": round(resumo.get(f"{etapa}_soma", 0) / total, 1) if total else None
+            }
+            for p in PERCENTIS:
+                valor = percentil(contagens, p)
+                etapa_dados[f"p{round(p * 100)}_segundos"] = round(valor, 1) if valor is not None else None
+            dados[etapa] = etapa_dados
+        return dados
+
+
+# Instância global das entregas
+entregas = Entregas()
@@ -1,27 +1,125 @@
 """
 Serviço de integração com Firebase/Firestore.
 """
+import contextvars
+import functools
 import logging
 import json
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, Iterator
 from datetime import datetime, timedelta
 import firebase_admin
 from firebase_admin import credentials, firestore
+from google.api_core.exceptions import FailedPrecondition, NotFound
 from google.cloud.firestore_v1.base_query import FieldFilter
 
 from app.config import get_settings
+from app.models.catalogo import Catalogo
 from app.models.conversation import ConversationState, Etapa, Fluxo
+from app.models.migrations import precisa_migrar
+from app.services.contexto_requisicao import memoizado, contabilizar
+from app.services.disjuntor import disjuntor_firestore, CircuitoAberto
+from app.services.metricas import metricas, cronometrado
+from app.services.rastreamento import rastreado, SPAN_CLIENTE
 
 logger = logging.getLogger(__name__)
 
+# Latência de cada método e erros (exceções e logs de erro) por método
+_cronometrado = cronometrado(metricas.firebase_duracao, metricas.firebase_erros)
+metricas.contar_erros_do_logger(logger, metricas.firebase_erros)
+
+
+# Dentro de um método protegido: None = fora; True = circuito aberto (o acesso
+# a _db levanta CircuitoAberto); False = chamada permitida
+_circuito_aberto: contextvars.ContextVar[Optional[bool]] = contextvars.ContextVar(
+    "circuito_firestore_aberto", default=None
+)
+# Falhas registradas pela chamada protegida em andamento (None = fora de uma)
+_falhas: contextvars.ContextVar[Optional[List[Exception]]] = contextvars.ContextVar(
+    "falhas_firestore", default=None
+)
+
+
+def _falha(mensagem: str, e: Exception):
+    """
+    Trata a exceção de um acesso ao Firestore: log de erro (contado em
+    chatbot_firebase_erros_total) e falha da chamada protegida em andamento.
+    A recusa do circuito aberto não é uma falha do Firestore e já é contada
+    em chatbot_disjuntor_rejeitadas_total: fica só no log de depuração.
+    """
+    if isinstance(e, CircuitoAberto):
+        logger.debug(f"{mensagem}: {e}", stacklevel=2)
+        return
+    falhas = _falhas.get()
+    if falhas is not None:
+        falhas.append(e)
+    # stacklevel=2: o contador de erros rotula o log pelo método que chamou
+    logger.error(f"{mensagem}: {e}", stacklevel=2)
+
+
+def _protegido(func):
+    """
+    Passa o método pelo disjuntor do Firestore.
+    
+    Os métodos tratam as próprias exceções com `_falha()`, que marca a
+    chamada como falha; uma exceção que escapa do método também conta. Com o
+    circuito aberto o método roda mesmo assim, mas o acesso a `_db` levanta
+    CircuitoAberto na hora: cai no tratamento de erro do próprio método (que
+    devolve vazio) ou, nas consultas de catálogo, no último catálogo carregado.
+    Chamadas aninhadas seguem a decisão da mais externa.
+    """
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if self._mock_mode or _circuito_aberto.get() is not None:
+            return func(self, *args, **kwargs)
+        
+        permitida = disjuntor_firestore.permitir()
+        token = _circuito_aberto.set(not permitida)
+        falhas: List[Exception] = []
+        token_falhas = _falhas.set(falhas)
+        sucesso = False
+        try:
+            resultado = func(self, *args, **kwargs)
+            sucesso = not falhas
+            return resultado
+        finally:
+            _falhas.reset(token_falhas)
+            _circuito_aberto.reset(token)
+            if permitida:
+                disjuntor_firestore.registrar(sucesso)
+    return wrapper
+
+
+def _instrumentado(func):
+    """Métricas de latência/erros, disjuntor e span de rastreamento do método."""
+    return rastreado(f"firestore.{func.__name__}", SPAN_CLIENTE)(_cronometrado(_protegido(func)))
+
+
+# Máximo de valores aceitos pelo Firestore em um filtro "in"
+FIRESTORE_LIMITE_IN = 30
+
+# Retorno de assumir_campanha quando outro worker tem o lease (ou a campanha não existe)
+CAMPANHA_DE_OUTRO_WORKER = "de_outro_worker"
+
+
+def _contar_consultas(documentos: int, consultas: int = 1):
+    """Contabiliza consultas: o Firestore cobra 1 leitura por documento, no mínimo 1 por consulta."""
+    contabilizar(leituras=max(documentos, consultas), consultas=consultas)
+
+
+def _consultas_in(valores: int) -> int:
+    """Consultas "in" feitas para a quantidade de valores (FIRESTORE_LIMITE_IN por consulta)."""
+    return -(-valores // FIRESTORE_LIMITE_IN)
+
 
 class FirebaseService:
     """Serviço para operações com Firestore."""
     
     _instance = None
-    _db = None
+    _cliente = None
     _initialized = False
     _mock_mode = False
+    # Último catálogo carregado (CatalogoService), usado com o circuito aberto
+    _catalogo_conhecido: Optional[Catalogo] = None
     
     def __new__(cls):
         """Singleton pattern para garantir única instância."""
@@ -73,19 +171,43 @@ class FirebaseService:
                         'projectId': settings.firebase_project_id
                     })
             
-            self._db = firestore.client()
+            self._cliente = firestore.client()
             logger.info("✅ Firebase inicializado com sucesso")
         except Exception as e:
             logger.warning(f"⚠️ Firebase não disponível: {e}")
             logger.warning("🔶 Executando em modo MOCK (dados simulados)")
             self._mock_mode = True
-            self._db = None
+            self._cliente = None
+    
+    @property
+    def _db(self):
+        """Cliente do Firestore; com o circuito aberto, falha antes de qualquer chamada de rede."""
+        if _circuito_aberto.get():
+            raise CircuitoAberto(disjuntor_firestore.nome)
+        return self._cliente
     
     @property
     def db(self):
         """Retorna instância do Firestore."""
         return self._db
     
+    def definir_catalogo_conhecido(self, catalogo: Catalogo):
+        """Guarda o último catálogo carregado para as consultas com o circuito aberto."""
+        self._catalogo_conhecido = catalogo
+    
+    def _catalogo_local(self) -> Optional[Catalogo]:
+        """
+        Catálogo em memória que responde às consultas de produtos, SKUs e
+        estoque no lugar do Firestore: os dados mock no modo MOCK e o último
+        catálogo carregado com o circuito aberto (estoque do campo "estoque"
+        dos SKUs naquela carga). None = consultar o Firestore.
+        """
+        if self._mock_mode:
+            return self._get_mock_catalogo()
+        if _circuito_aberto.get():
+            return self._catalogo_conhecido
+        return None
+    
     # ==================== MOCK DATA (para testes) ====================
     
     _mock_conversas = {}
@@ -111,14 +233,24 @@ class FirebaseService:
         {"_id": "sku_009", "produto_id": "prod_005", "sku": "FON-PRE-01", "preco": 199.90, "estoque": 20, "ativo": True, "atributos": {"Cor": "Preto"}},
     ]
     
+    _mock_catalogo = None
+    
+    def _get_mock_catalogo(self) -> Catalogo:
+        """Catálogo compacto indexado construído uma vez a partir dos dados mock."""
+        if FirebaseService._mock_catalogo is None:
+            FirebaseService._mock_catalogo = Catalogo.from_dicts(self._mock_produtos, self._mock_skus)
+        return FirebaseService._mock_catalogo
+    
     # ==================== CONVERSAS ====================
     
+    @_instrumentado
     def get_conversation_state(self, phone: str) -> Optional[ConversationState]:
         """Busca estado da conversa pelo número de telefone."""
+        contabilizar(leituras=1)
         if self._mock_mode:
             data = self._mock_conversas.get(phone)
             if data:
-                return ConversationState.from_dict(data)
+                return ConversationState.from_dict(dict(data))
             return None
         
         try:
@@ -127,28 +259,33 @@ class FirebaseService:
                 return ConversationState.from_dict(doc.to_dict())
             return None
         except Exception as e:
-            logger.error(f"Erro ao buscar conversa: {e}")
+            _falha("Erro ao buscar conversa", e)
             return None
     
+    @_instrumentado
     def save_conversation_state(self, state: ConversationState) -> bool:
         """Salva estado da conversa no Firestore."""
+        compacto = get_settings().conversa_formato_armazenamento == "blob"
+        contabilizar(escritas=1)
+        
         if self._mock_mode:
             state.ultima_atualizacao = datetime.utcnow()
-            self._mock_conversas[state.phone] = state.to_dict()
+            self._mock_conversas[state.phone] = state.to_dict(compacto=compacto)
             logger.info(f"[MOCK] Estado salvo para {state.phone}")
             return True
         
         try:
             state.ultima_atualizacao = datetime.utcnow()
             self._db.collection("conversas").document(state.phone).set(
-                state.to_dict()
+                state.to_dict(compacto=compacto)
             )
             logger.info(f"Estado salvo para {state.phone}")
             return True
         except Exception as e:
-            logger.error(f"Erro ao salvar conversa: {e}")
+            _falha("Erro ao salvar conversa", e)
             return False
     
+    @_instrumentado
     def get_or_create_conversation(self, phone: str) -> ConversationState:
         """Busca ou cria nova conversa para o telefone."""
         state = self.get_conversation_state(phone)
@@ -157,13 +294,109 @@ class FirebaseService:
             self.save_conversation_state(state)
         return state
     
+    @_instrumentado
+    def backfill_conversas(self, tamanho_lote: int = 200) -> Dict[str, int]:
+        """
+        Migra para o schema atual as conversas gravadas em versões antigas.
+        
+        Percorre a collection com paginação por cursor e regrava em lote
+        apenas os documentos desatualizados. Cada escrita tem como
+        pré-condição a data de atualização lida, para não sobrescrever uma
+        conversa que recebeu mensagem durante o backfill (essa conversa já
+        é migrada pelo próprio save).
+        
+        Args:
+            tamanho_lote: Documentos lidos por página (máximo 500 por lote de escrita)
+        
+        Returns:
+            Contadores: lidos, migrados, conflitos e erros
+        """
+        tamanho_lote = min(tamanho_lote, 500)
+        compacto = get_settings().conversa_formato_armazenamento == "blob"
+        resultado = {"lidos": 0, "migrados": 0, "conflitos": 0, "erros": 0}
+        
+        if self._mock_mode:
+            for phone, data in list(self._mock_conversas.items()):
+                resultado["lidos"] += 1
+                if precisa_migrar(data):
+                    state = ConversationState.from_dict(dict(data))
+                    self._mock_conversas[phone] = state.to_dict(compacto=compacto)
+                    resultado["migrados"] += 1
+            return resultado
+        
+        colecao = self._db.collection("conversas")
+        ultimo_doc = None
+        
+        while True:
+            query = colecao.order_by("__name__").limit(tamanho_lote)
+            if ultimo_doc is not None:
+                query = query.start_after(ultimo_doc)
+            docs = list(query.stream())
+            if not docs:
+                break
+            ultimo_doc = docs[-1]
+            
+            pendentes = []
+            for doc in docs:
+                resultado["lidos"] += 1
+                data = doc.to_dict()
+                if not precisa_migrar(data):
+                    continue
+                try:
+                    state = ConversationState.from_dict(data)
+                    novo = state.to_dict(compacto=compacto)
+                    # update() mantém campos não listados: remove o layout antigo
+                    campo_antigo = "dados_temporarios" if compacto else "dados_temporarios_blob"
+                    novo[campo_antigo] = firestore.DELETE_FIELD
+                    pendentes.append((doc, novo))
+                except Exception as e:
+                    _falha(f"Backfill: erro ao migrar conversa {doc.id}", e)
+                    resultado["erros"] += 1
+            
+            self._gravar_lote_backfill(pendentes, resultado)
+            logger.info(f"Backfill conversas: {resultado}")
+            
+            if len(docs) < tamanho_lote:
+                break
+        
+        return resultado
+    
+    def _gravar_lote_backfill(self, pendentes: List[tuple], resultado: Dict[str, int]):
+        """Grava um lote do backfill; se o lote falhar, regrava documento a documento."""
+        if not pendentes:
+            return
+        
+        batch = self._db.batch()
+        for doc, data in pendentes:
+            batch.update(doc.reference, data, option=self._db.write_option(last_update_time=doc.update_time))
+        
+        try:
+            batch.commit()
+            resultado["migrados"] += len(pendentes)
+            return
+        except Exception as e:
+            # Lote é atômico: uma pré-condição violada invalida todos
+            logger.warning(f"Backfill: lote falhou ({e}), gravando individualmente")
+        
+        for doc, data in pendentes:
+            try:
+                doc.reference.update(data, option=self._db.write_option(last_update_time=doc.update_time))
+                resultado["migrados"] += 1
+            except FailedPrecondition:
+                resultado["conflitos"] += 1
+            except Exception as e:
+                _falha(f"Backfill: erro ao gravar conversa {doc.id}", e)
+                resultado["erros"] += 1
+    
     # ==================== PRODUTOS ====================
     
+    @_instrumentado
     def get_categorias(self) -> List[str]:
         """Busca categorias únicas dos produtos ativos."""
-        if self._mock_mode:
-            categorias = set(p["categoria"] for p in self._mock_produtos if p.get("ativo"))
-            return sorted(list(categorias))
+        catalogo = self._catalogo_local()
+        if catalogo is not None:
+            _contar_consultas(sum(1 for p in catalogo.produtos() if p.ativo))
+            return catalogo.categorias()
         
         try:
             docs = self._db.collection("produtos").where(
@@ -171,21 +404,28 @@ class FirebaseService:
             ).stream()
             
             categorias = set()
+            lidos = 0
             for doc in docs:
+                lidos += 1
                 data = doc.to_dict()
                 if "categoria" in data:
                     categorias.add(data["categoria"])
+            _contar_consultas(lidos)
             
             return sorted(list(categorias))
         except Exception as e:
-            logger.error(f"Erro ao buscar categorias: {e}")
+            _falha("Erro ao buscar categorias", e)
             return []
     
+    @_instrumentado
     def get_produtos_por_categoria(self, categoria: str) -> List[Dict[str, Any]]:
         """Busca produtos ativos de uma categoria."""
-        if self._mock_mode:
-            return [p.copy() for p in self._mock_produtos 
-                    if p.get("categoria") == categoria and p.get("ativo")]
+        catalogo = self._catalogo_local()
+        if catalogo is not None:
+            produtos = [catalogo.produto_to_dict(p) for p in catalogo.produtos_da_categoria(categoria)
+                        if p.ativo]
+            _contar_consultas(len(produtos))
+            return produtos
         
         try:
             docs = self._db.collection("produtos").where(
@@ -199,19 +439,76 @@ class FirebaseService:
                 data = doc.to_dict()
                 data["_id"] = doc.id
                 produtos.append(data)
+            _contar_consultas(len(produtos))
             
             return produtos
         except Exception as e:
-            logger.error(f"Erro ao buscar produtos: {e}")
+            _falha("Erro ao buscar produtos", e)
             return []
     
+    @_instrumentado
+    def get_produtos_pagina(
+        self,
+        categoria: str,
+        limite: int,
+        apos: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Busca uma página de produtos ativos da categoria, em ordem de ID.
+        
+        Lê limite + 1 documentos para saber se existe próxima página sem
+        uma consulta extra.
+        
+        Args:
+            categoria: Categoria dos produtos
+            limite: Quantidade de produtos na página
+            apos: ID do último produto da página anterior (None = início)
+        
+        Returns:
+            Tupla (produtos da página, cursor da próxima página ou None)
+        """
+        catalogo = self._catalogo_local()
+        if catalogo is not None:
+            ordenados = sorted(
+                (p for p in catalogo.produtos_da_categoria(categoria)
+                 if p.ativo and (apos is None or p.id > apos)),
+                key=lambda p: p.id
+            )
+            produtos = [catalogo.produto_to_dict(p) for p in ordenados[:limite + 1]]
+        else:
+            try:
+                query = self._db.collection("produtos").where(
+                    filter=FieldFilter("categoria", "==", categoria)
+                ).where(
+                    filter=FieldFilter("ativo", "==", True)
+                ).order_by("__name__").limit(limite + 1)
+                if apos:
+                    query = query.start_after({"__name__": apos})
+                
+                produtos = []
+                for doc in query.stream():
+                    data = doc.to_dict()
+                    data["_id"] = doc.id
+                    produtos.append(data)
+            except Exception as e:
+                _falha("Erro ao buscar página de produtos", e)
+                return [], None
+        _contar_consultas(len(produtos))
+        
+        if len(produtos) > limite:
+            produtos = produtos[:limite]
+            return produtos, produtos[-1]["_id"]
+        return produtos, None
+    
+    @memoizado("produtos")
+    @_instrumentado
     def get_produto_by_id(self, produto_id: str) -> Optional[Dict[str, Any]]:
         """Busca produto pelo ID."""
-        if self._mock_mode:
-            for p in self._mock_produtos:
-                if p["_id"] == produto_id:
-                    return p.copy()
-            return None
+        contabilizar(leituras=1)
+        catalogo = self._catalogo_local()
+        if catalogo is not None:
+            produto = catalogo.produto(produto_id)
+            return catalogo.produto_to_dict(produto) if produto else None
         
         try:
             doc = self._db.collection("produtos").document(produto_id).get()
@@ -221,16 +518,20 @@ class FirebaseService:
                 return data
             return None
         except Exception as e:
-            logger.error(f"Erro ao buscar produto: {e}")
+            _falha("Erro ao buscar produto", e)
             return None
     
     # ==================== SKUS ====================
     
+    @_instrumentado
     def get_skus_por_produto(self, produto_id: str) -> List[Dict[str, Any]]:
         """Busca SKUs ativos de um produto."""
-        if self._mock_mode:
-            return [s.copy() for s in self._mock_skus 
-                    if s.get("produto_id") == produto_id and s.get("ativo")]
+        catalogo = self._catalogo_local()
+        if catalogo is not None:
+            skus = [catalogo.sku_to_dict(s) for s in catalogo.skus_do_produto(produto_id)
+                    if s.ativo]
+            _contar_consultas(len(skus))
+            return skus
         
         try:
             docs = self._db.collection("skus").where(
@@ -244,19 +545,64 @@ class FirebaseService:
                 data = doc.to_dict()
                 data["_id"] = doc.id
                 skus.append(data)
+            _contar_consultas(len(skus))
             
             return skus
         except Exception as e:
-            logger.error(f"Erro ao buscar SKUs: {e}")
+            _falha("Erro ao buscar SKUs", e)
             return []
     
+    @_instrumentado
+    def get_skus_por_produtos(self, produto_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Busca SKUs ativos de vários produtos de uma vez.
+        
+        Usa consultas "in" (até 30 valores cada) em vez de uma consulta
+        por produto.
+        
+        Returns:
+            Dicionário produto_id -> lista de SKUs (só produtos com SKUs)
+        """
+        catalogo = self._catalogo_local()
+        if catalogo is not None:
+            resultado = {}
+            for produto_id in produto_ids:
+                skus = [catalogo.sku_to_dict(s) for s in catalogo.skus_do_produto(produto_id)
+                        if s.ativo]
+                if skus:
+                    resultado[produto_id] = skus
+            _contar_consultas(sum(map(len, resultado.values())), _consultas_in(len(produto_ids)))
+            return resultado
+        
+        resultado: Dict[str, List[Dict[str, Any]]] = {}
+        try:
+            for inicio in range(0, len(produto_ids), FIRESTORE_LIMITE_IN):
+                docs = self._db.collection("skus").where(
+                    filter=FieldFilter("produto_id", "in", produto_ids[inicio:inicio + FIRESTORE_LIMITE_IN])
+                ).where(
+                    filter=FieldFilter("ativo", "==", True)
+                ).stream()
+                
+                for doc in docs:
+                    data = doc.to_dict()
+                    data["_id"] = doc.id
+                    resultado.setdefault(data.get("produto_id"), []).append(data)
+            _contar_consultas(sum(map(len, resultado.values())), _consultas_in(len(produto_ids)))
+            
+            return resultado
+        except Exception as e:
+            _falha("Erro ao buscar SKUs dos produtos", e)
+            return {}
+    
+    @memoizado("skus")
+    @_instrumentado
     def get_sku_by_id(self, sku_id: str) -> Optional[Dict[str, Any]]:
         """Busca SKU pelo ID."""
-        if self._mock_mode:
-            for s in self._mock_skus:
-                if s["_id"] == sku_id:
-                    return s.copy()
-            return None
+        contabilizar(leituras=1)
+        catalogo = self._catalogo_local()
+        if catalogo is not None:
+            sku = catalogo.sku(sku_id)
+            return catalogo.sku_to_dict(sku) if sku else None
         
         try:
             doc = self._db.collection("skus").document(sku_id).get()
@@ -266,21 +612,54 @@ class FirebaseService:
                 return data
             return None
         except Exception as e:
-            logger.error(f"Erro ao buscar SKU: {e}")
+            _falha("Erro ao buscar SKU", e)
             return None
     
+    @_instrumentado
+    def get_skus_por_ids(self, sku_ids: List[str]) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Busca vários SKUs pelo ID em uma única chamada (get_all).
+        
+        Returns:
+            Dicionário sku_id -> SKU (IDs inexistentes ficam de fora), ou None
+            em caso de erro
+        """
+        # get_all cobra uma leitura por documento pedido, exista ou não
+        contabilizar(leituras=len(set(sku_ids)))
+        catalogo = self._catalogo_local()
+        if catalogo is not None:
+            skus = (catalogo.sku(sku_id) for sku_id in sku_ids)
+            return {sku.id: catalogo.sku_to_dict(sku) for sku in skus if sku}
+        
+        try:
+            refs = [self._db.collection("skus").document(sku_id) for sku_id in dict.fromkeys(sku_ids)]
+            skus = {}
+            for doc in self._db.get_all(refs):
+                if doc.exists:
+                    data = doc.to_dict()
+                    data["_id"] = doc.id
+                    skus[doc.id] = data
+            return skus
+        except Exception as e:
+            _falha("Erro ao buscar SKUs em lote", e)
+            return None
+    
+    @memoizado("skus_codigo")
+    @_instrumentado
     def get_sku_by_codigo(self, sku_codigo: str) -> Optional[Dict[str, Any]]:
         """Busca SKU pelo código."""
-        if self._mock_mode:
-            for s in self._mock_skus:
-                if s["sku"] == sku_codigo:
-                    return s.copy()
-            return None
+        catalogo = self._catalogo_local()
+        if catalogo is not None:
+            sku = catalogo.sku_por_codigo(sku_codigo)
+            _contar_consultas(1 if sku else 0)
+            return catalogo.sku_to_dict(sku) if sku else None
         
         try:
             docs = self._db.collection("skus").where(
                 filter=FieldFilter("sku", "==", sku_codigo)
             ).limit(1).stream()
+            # limit(1): no máximo um documento lido
+            _contar_consultas(1)
             
             for doc in docs:
                 data = doc.to_dict()
@@ -288,18 +667,92 @@ class FirebaseService:
                 return data
             return None
         except Exception as e:
-            logger.error(f"Erro ao buscar SKU: {e}")
+            _falha("Erro ao buscar SKU", e)
             return None
     
+    @_instrumentado
+    def get_skus_por_codigos(self, codigos: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Busca SKUs ativos por código com consultas "in" em lote.
+        
+        Returns:
+            Dicionário código -> SKU (códigos não encontrados ficam de fora)
+        """
+        catalogo = self._catalogo_local()
+        if catalogo is not None:
+            skus = (catalogo.sku_por_codigo(codigo) for codigo in codigos)
+            encontrados = {sku.codigo: catalogo.sku_to_dict(sku) for sku in skus if sku and sku.ativo}
+            _contar_consultas(len(encontrados), _consultas_in(len(codigos)))
+            return encontrados
+        
+        try:
+            skus = {}
+            for inicio in range(0, len(codigos), FIRESTORE_LIMITE_IN):
+                docs = self._db.collection("skus").where(
+                    filter=FieldFilter("sku", "in", codigos[inicio:inicio + FIRESTORE_LIMITE_IN])
+                ).where(
+                    filter=FieldFilter("ativo", "==", True)
+                ).stream()
+                for doc in docs:
+                    data = doc.to_dict()
+                    data["_id"] = doc.id
+                    skus[data.get("sku")] = data
+            _contar_consultas(len(skus), _consultas_in(len(codigos)))
+            return skus
+        except Exception as e:
+            _falha("Erro ao buscar SKUs por código", e)
+            return {}
+    
+    # ==================== CATÁLOGO ====================
+    
+    @_instrumentado
+    def listar_catalogo(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Busca todos os produtos e SKUs ativos (2 consultas).
+        
+        Usado para montar o catálogo em memória (ver CatalogoService).
+        
+        Returns:
+            Tupla (produtos, skus)
+        """
+        if self._mock_mode:
+            _contar_consultas(len(self._mock_produtos) + len(self._mock_skus), 2)
+            return self._mock_produtos, self._mock_skus
+        
+        try:
+            produtos = []
+            for doc in self._db.collection("produtos").where(
+                filter=FieldFilter("ativo", "==", True)
+            ).stream():
+                data = doc.to_dict()
+                data["_id"] = doc.id
+                produtos.append(data)
+            
+            skus = []
+            for doc in self._db.collection("skus").where(
+                filter=FieldFilter("ativo", "==", True)
+            ).stream():
+                data = doc.to_dict()
+                data["_id"] = doc.id
+                skus.append(data)
+            _contar_consultas(len(produtos) + len(skus), 2)
+            
+            return produtos, skus
+        except Exception as e:
+            _falha("Erro ao listar catálogo", e)
+            return [], []
+    
     # ==================== ESTOQUE ====================
     
+    @memoizado("estoque")
+    @_instrumentado
     def get_estoque_sku(self, sku: str) -> int:
         """Retorna quantidade total em estoque de um SKU."""
-        if self._mock_mode:
-            for s in self._mock_skus:
-                if s["sku"] == sku:
-                    return s.get("estoque", 0)
-            return 0
+        catalogo = self._catalogo_local()
+        if catalogo is not None:
+            sku_obj = catalogo.sku_por_codigo(sku)
+            _contar_consultas(1 if sku_obj else 0)
+            return catalogo.estoque(sku_obj) if sku_obj else 0
         
         try:
             docs = self._db.collection("estoque").where(
@@ -307,19 +760,221 @@ class FirebaseService:
             ).stream()
             
             total = 0
+            lidos = 0
             for doc in docs:
+                lidos += 1
                 data = doc.to_dict()
                 total += data.get("quantidade", 0)
+            _contar_consultas(lidos)
             
             return total
         except Exception as e:
-            logger.error(f"Erro ao buscar estoque: {e}")
+            _falha("Erro ao buscar estoque", e)
             return 0
     
+    @_instrumentado
+    def get_estoque_skus(self, codigos: List[str]) -> Dict[str, int]:
+        """
+        Estoque total de vários SKUs (por código) com consultas "in" em lote.
+        
+        Returns:
+            Dicionário código -> quantidade (códigos sem estoque ficam com 0)
+        """
+        totais = {codigo: 0 for codigo in codigos}
+        catalogo = self._catalogo_local()
+        if catalogo is not None:
+            for codigo in totais:
+                sku = catalogo.sku_por_codigo(codigo)
+                totais[codigo] = catalogo.estoque(sku) if sku else 0
+            _contar_consultas(sum(1 for total in totais.values() if total), _consultas_in(len(totais)))
+            return totais
+        
+        try:
+            unicos = list(totais)
+            lidos = 0
+            for inicio in range(0, len(unicos), FIRESTORE_LIMITE_IN):
+                docs = self._db.collection("estoque").where(
+                    filter=FieldFilter("sku", "in", unicos[inicio:inicio + FIRESTORE_LIMITE_IN])
+                ).stream()
+                for doc in docs:
+                    lidos += 1
+                    data = doc.to_dict()
+                    totais[data.get("sku")] = totais.get(data.get("sku"), 0) + data.get("quantidade", 0)
+            _contar_consultas(lidos, _consultas_in(len(unicos)))
+            return totais
+        except Exception as e:
+            _falha("Erro ao buscar estoque em lote", e)
+            return totais
+    
+    # ==================== RESERVAS ====================
+    
+    _mock_reservas: Dict[str, Dict[str, Any]] = {}
+    _mock_reservado: Dict[str, int] = {}
+    
+    @_instrumentado
+    def alterar_reservado_sku(self, sku_id: str, delta: int) -> Optional[int]:
+        """
+        Soma delta ao contador de unidades reservadas do SKU.
+        
+        O incremento é atômico no Firestore (vários workers reservando o
+        mesmo SKU não perdem atualizações); o total é relido em seguida.
+        
+        Returns:
+            Total reservado após a alteração, ou None em caso de erro
+        """
+        contabilizar(leituras=1, escritas=1)
+        if self._mock_mode:
+            total = self._mock_reservado.get(sku_id, 0) + delta
+            self._mock_reservado[sku_id] = total
+            return total
+        
+        try:
+            ref = self._db.collection("skus").document(sku_id)
+            ref.update({"reservado": firestore.Increment(delta)})
+            doc = ref.get(field_paths=["reservado"])
+            return int((doc.to_dict() or {}).get("reservado", 0))
+        except Exception as e:
+            _falha(f"Erro ao alterar reserva do SKU {sku_id}", e)
+            return None
+    
+    @_instrumentado
+    def somar_reserva(self, reserva_id: str, reserva: Dict[str, Any]) -> Optional[int]:
+        """
+        Grava a reserva somando a quantidade à já gravada com o mesmo ID.
+        
+        O incremento é atômico no Firestore: o mesmo cliente reservando o
+        mesmo SKU em outro worker não sobrescreve as unidades de lá. Os
+        demais campos (validade, vínculo) são substituídos; a quantidade
+        total é relida em seguida.
+        
+        Returns:
+            Quantidade total da reserva após a soma, ou None em caso de erro
+        """
+        contabilizar(leituras=1, escritas=1)
+        if self._mock_mode:
+            anterior = self._mock_reservas.get(reserva_id, {}).get("quantidade", 0)
+            self._mock_reservas[reserva_id] = dict(reserva, quantidade=anterior + reserva["quantidade"])
+            return self._mock_reservas[reserva_id]["quantidade"]
+        
+        try:
+            ref = self._db.collection("reservas").document(reserva_id)
+            ref.set({**reserva, "quantidade": firestore.Increment(reserva["quantidade"])}, merge=True)
+            doc = ref.get(field_paths=["quantidade"])
+            return int((doc.to_dict() or {}).get("quantidade", 0))
+        except Exception as e:
+            _falha(f"Erro ao somar reserva {reserva_id}", e)
+            return None
+    
+    @_instrumentado
+    def remover_reserva(self, reserva_id: str) -> bool:
+        """
+        Remove uma reserva.
+        
+        Returns:
+            True se esta chamada removeu a reserva; False se ela já não
+            existia (outro worker liberou antes) ou em caso de erro
+        """
+        contabilizar(escritas=1)
+        if self._mock_mode:
+            return self._mock_reservas.pop(reserva_id, None) is not None
+        
+        try:
+            self._db.collection("reservas").document(reserva_id).delete(
+                option=self._db.write_option(exists=True)
+            )
+            return True
+        except (NotFound, FailedPrecondition):
+            return False
+        except Exception as e:
+            _falha(f"Erro ao remover reserva {reserva_id}", e)
+            return False
+    
+    @_instrumentado
+    def listar_reservas(self) -> List[Dict[str, Any]]:
+        """Lista todas as reservas de estoque gravadas."""
+        if self._mock_mode:
+            _contar_consultas(len(self._mock_reservas))
+            return [dict(r, _id=reserva_id) for reserva_id, r in self._mock_reservas.items()]
+        
+        try:
+            reservas = []
+            for doc in self._db.collection("reservas").stream():
+                data = doc.to_dict()
+                data["_id"] = doc.id
+                reservas.append(data)
+            _contar_consultas(len(reservas))
+            return reservas
+        except Exception as e:
+            _falha("Erro ao listar reservas", e)
+            return []
+    
+    @_instrumentado
+    def listar_reservas_em_andamento(self, telefone: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Lista as reservas do orçamento em andamento do cliente (ainda sem
+        número de orçamento), feitas por qualquer worker.
+        
+        Returns:
+            Lista de reservas, ou None em caso de erro
+        """
+        if self._mock_mode:
+            reservas = [
+                dict(r, _id=reserva_id) for reserva_id, r in self._mock_reservas.items()
+                if r["telefone"] == telefone and r.get("numero_orcamento") is None
+            ]
+            _contar_consultas(len(reservas))
+            return reservas
+        
+        try:
+            query = (
+                self._db.collection("reservas")
+                .where(filter=FieldFilter("telefone", "==", telefone))
+                .where(filter=FieldFilter("numero_orcamento", "==", None))
+            )
+            reservas = []
+            for doc in query.stream():
+                data = doc.to_dict()
+                data["_id"] = doc.id
+                reservas.append(data)
+            _contar_consultas(len(reservas))
+            return reservas
+        except Exception as e:
+            _falha(f"Erro ao listar reservas de {telefone}", e)
+            return None
+    
+    @_instrumentado
+    def vincular_reserva(self, reserva_id: str, numero_orcamento: str) -> bool:
+        """
+        Vincula uma reserva ao orçamento finalizado.
+        
+        Returns:
+            True se a reserva existia e foi vinculada
+        """
+        contabilizar(escritas=1)
+        if self._mock_mode:
+            reserva = self._mock_reservas.get(reserva_id)
+            if reserva is None:
+                return False
+            reserva["numero_orcamento"] = numero_orcamento
+            return True
+        
+        try:
+            self._db.collection("reservas").document(reserva_id).update(
+                {"numero_orcamento": numero_orcamento}
+            )
+            return True
+        except NotFound:
+            return False
+        except Exception as e:
+            _falha(f"Erro ao vincular reserva {reserva_id}", e)
+            return False
+    
     # ==================== ORÇAMENTOS ====================
     
+    @_instrumentado
     def get_proximo_numero_orcamento(self) -> int:
         """Retorna próximo número sequencial de orçamento."""
+        contabilizar(leituras=1, escritas=1)
         if self._mock_mode:
             FirebaseService._mock_orcamento_seq += 1
             return FirebaseService._mock_orcamento_seq
@@ -341,20 +996,28 @@ class FirebaseService:
             
             return proximo_numero
         except Exception as e:
-            logger.error(f"Erro ao gerar número de orçamento: {e}")
+            _falha("Erro ao gerar número de orçamento", e)
             # Fallback: usa timestamp
             return int(datetime.utcnow().timestamp()) % 100000
     
     _mock_orcamentos = {}
     
+    @_instrumentado
     def criar_orcamento(
         self,
         cliente_nome: str,
         cliente_telefone: str,
         itens: List[Dict[str, Any]],
-        subtotal: float
+        subtotal: float,
+        snapshot_em: Optional[str] = None
     ) -> Optional[Dict[str, Any]]:
-        """Cria novo orçamento no Firestore."""
+        """
+        Cria novo orçamento no Firestore.
+        
+        Args:
+            snapshot_em: Momento (ISO) em que preços e estoques dos itens
+                foram conferidos
+        """
         try:
             settings = get_settings()
             numero = self.get_proximo_numero_orcamento()
@@ -383,10 +1046,12 @@ class FirebaseService:
                     "total": subtotal
                 },
                 "itens": itens,
+                "snapshot_em": snapshot_em or datetime.utcnow().isoformat(),
                 "observacoes": "",
                 "encaminhado_atendente": False
             }
             
+            contabilizar(escritas=1)
             if self._mock_mode:
                 self._mock_orcamentos[doc_id] = orcamento
                 logger.info(f"[MOCK] Orçamento {numero_formatado} criado com sucesso")
@@ -396,12 +1061,14 @@ class FirebaseService:
             
             return orcamento
         except Exception as e:
-            logger.error(f"Erro ao criar orçamento: {e}")
+            _falha("Erro ao criar orçamento", e)
             return None
     
+    @_instrumentado
     def get_orcamento_by_numero(self, numero_formatado: str) -> Optional[Dict[str, Any]]:
         """Busca orçamento pelo número formatado."""
         if self._mock_mode:
+            _contar_consultas(1)
             for orc in self._mock_orcamentos.values():
                 if orc.get("numero_formatado") == numero_formatado:
                     return orc.copy()
@@ -411,6 +1078,7 @@ class FirebaseService:
             docs = self._db.collection("orcamentos").where(
                 filter=FieldFilter("numero_formatado", "==", numero_formatado)
             ).limit(1).stream()
+            _contar_consultas(1)
             
             for doc in docs:
                 data = doc.to_dict()
@@ -418,13 +1086,335 @@ class FirebaseService:
                 return data
             return None
         except Exception as e:
-            logger.error(f"Erro ao buscar orçamento: {e}")
+            _falha("Erro ao buscar orçamento", e)
             return None
     
+    # ==================== CAMPANHAS ====================
+    
+    _mock_campanhas: Dict[str, Dict[str, Any]] = {}
+    
+    def _filtrar_conversas(self, filtros: Dict[str, Any]):
+        query = self._db.collection("conversas")
+        for campo, valor in filtros.items():
+            query = query.where(filter=FieldFilter(campo, "==", valor))
+        return query
+    
+    @_instrumentado
+    def contar_conversas(self, filtros: Dict[str, Any]) -> Optional[int]:
+        """
+        Conta as conversas com os campos iguais aos filtros (agregação count,
+        cobrada como 1 leitura a cada 1000 documentos contados).
+        """
+        if self._mock_mode:
+            total = sum(1 for c in self._mock_conversas.values()
+                        if all(c.get(campo) == valor for campo, valor in filtros.items()))
+            contabilizar(leituras=max(1, -(-total // 1000)), consultas=1)
+            return total
+        
+        try:
+            resultado = self._filtrar_conversas(filtros).count().get()
+            total = int(resultado[0][0].value)
+            contabilizar(leituras=max(1, -(-total // 1000)), consultas=1)
+            return total
+        except Exception as e:
+            _falha("Erro ao contar conversas", e)
+            return None
+    
+    @_instrumentado
+    def listar_conversas_pagina(
+        self,
+        filtros: Dict[str, Any],
+        apos: Optional[str] = None,
+        limite: int = 100,
+        campos: Optional[List[str]] = None
+    ) -> Optional[Tuple[List[Dict[str, Any]], Optional[str]]]:
+        """
+        Página de conversas com os campos iguais aos filtros, em ordem de telefone.
+        
+        Args:
+            filtros: Campo -> valor (igualdade)
+            apos: Telefone (ID) da última conversa da página anterior (None = início)
+            limite: Conversas por página
+            campos: Campos retornados (None = todos)
+        
+        Returns:
+            Tupla (conversas da página, cursor da próxima página ou None), ou
+            None em caso de erro
+        """
+        if self._mock_mode:
+            conversas = [
+                dict(c, _id=phone) for phone, c in sorted(self._mock_conversas.items())
+                if (apos is None or phone > apos)
+                and all(c.get(campo) == valor for campo, valor in filtros.items())
+            ][:limite + 1]
+        else:
+            try:
+                query = self._filtrar_conversas(filtros)
+                if campos:
+                    query = query.select(campos)
+                query = query.order_by("__name__").limit(limite + 1)
+                if apos:
+                    query = query.start_after({"__name__": apos})
+                
+                conversas = []
+                for doc in query.stream():
+                    data = doc.to_dict()
+                    data["_id"] = doc.id
+                    conversas.append(data)
+            except Exception as e:
+                _falha("Erro ao buscar página de conversas", e)
+                return None
+        _contar_consultas(len(conversas))
+        
+        if len(conversas) > limite:
+            conversas = conversas[:limite]
+            return conversas, conversas[-1]["_id"]
+        return conversas, None
+    
+    @_instrumentado
+    def criar_campanha(self, campanha: Dict[str, Any]) -> Optional[str]:
+        """Grava uma nova campanha; retorna o ID."""
+        contabilizar(escritas=1)
+        if self._mock_mode:
+            campanha_id = f"camp_{len(self._mock_campanhas) + 1:04d}"
+            self._mock_campanhas[campanha_id] = dict(campanha)
+            return campanha_id
+        
+        try:
+            _, ref = self._db.collection("campanhas").add(campanha)
+            return ref.id
+        except Exception as e:
+            _falha("Erro ao criar campanha", e)
+            return None
+    
+    @_instrumentado
+    def get_campanha(self, campanha_id: str) -> Optional[Dict[str, Any]]:
+        """Busca campanha pelo ID."""
+        contabilizar(leituras=1)
+        if self._mock_mode:
+            campanha = self._mock_campanhas.get(campanha_id)
+            return dict(campanha, _id=campanha_id) if campanha else None
+        
+        try:
+            doc = self._db.collection("campanhas").document(campanha_id).get()
+            if doc.exists:
+                data = doc.to_dict()
+                data["_id"] = doc.id
+                return data
+            return None
+        except Exception as e:
+            _falha("Erro ao buscar campanha", e)
+            return None
+    
+    @_instrumentado
+    def listar_campanhas(self, status: Optional[str] = None, limite: int = 20) -> List[Dict[str, Any]]:
+        """Campanhas mais recentes (opcionalmente só as de um status)."""
+        if self._mock_mode:
+            campanhas = [dict(c, _id=campanha_id) for campanha_id, c in self._mock_campanhas.items()
+                         if status is None or c.get("status") == status]
+            campanhas.sort(key=lambda c: c.get("criada_em", ""), reverse=True)
+            _contar_consultas(len(campanhas[:limite]))
+            return campanhas[:limite]
+        
+        try:
+            query = self._db.collection("campanhas")
+            if status:
+                query = query.where(filter=FieldFilter("status", "==", status))
+            else:
+                query = query.order_by("criada_em", direction=firestore.Query.DESCENDING)
+            campanhas = []
+            for doc in query.limit(limite).stream():
+                data = doc.to_dict()
+                data["_id"] = doc.id
+                campanhas.append(data)
+            _contar_consultas(len(campanhas))
+            return campanhas
+        except Exception as e:
+            _falha("Erro ao listar campanhas", e)
+            return []
+    
+    @_instrumentado
+    def atualizar_campanha(self, campanha_id: str, campos: Dict[str, Any]) -> bool:
+        """Atualiza campos da campanha."""
+        contabilizar(escritas=1)
+        if self._mock_mode:
+            if campanha_id not in self._mock_campanhas:
+                return False
+            self._mock_campanhas[campanha_id].update(campos)
+            return True
+        
+        try:
+            self._db.collection("campanhas").document(campanha_id).update(campos)
+            return True
+        except NotFound:
+            return False
+        except Exception as e:
+            _falha(f"Erro ao atualizar campanha {campanha_id}", e)
+            return False
+    
+    @_instrumentado
+    def assumir_campanha(self, campanha_id: str, dono: str, lease_ate: str,
+                         campos: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """
+        Grava dono, lease e `campos` se a campanha está em envio e não tem
+        outro dono com lease válido. Usado ao assumir o envio e a cada
+        checkpoint; a gravação exige que o documento não tenha mudado desde a
+        leitura, então dois workers não assumem a mesma campanha.
+        
+        Returns:
+            Status atual da campanha; CAMPANHA_DE_OUTRO_WORKER se outro worker
+            é o dono, assumiu entre a leitura e a gravação ou a campanha não
+            existe; None em caso de erro (o dono pode tentar de novo)
+        """
+        contabilizar(leituras=1)
+        agora = datetime.utcnow().isoformat()
+        
+        def pode_assumir(data: Dict[str, Any]) -> bool:
+            return data.get("dono") in (None, dono) or data.get("lease_ate", "") < agora
+        
+        if self._mock_mode:
+            data = self._mock_campanhas.get(campanha_id)
+            if data is None or not pode_assumir(data):
+                return CAMPANHA_DE_OUTRO_WORKER
+            if data.get("status") == "enviando":
+                contabilizar(escritas=1)
+                data.update(campos or {}, dono=dono, lease_ate=lease_ate)
+            return data.get("status")
+        
+        try:
+            ref = self._db.collection("campanhas").document(campanha_id)
+            doc = ref.get()
+            data = doc.to_dict() if doc.exists else None
+            if data is None or not pode_assumir(data):
+                return CAMPANHA_DE_OUTRO_WORKER
+            if data.get("status") == "enviando":
+                contabilizar(escritas=1)
+                ref.update(
+                    {**(campos or {}), "dono": dono, "lease_ate": lease_ate},
+                    option=self._db.write_option(last_update_time=doc.update_time)
+                )
+            return data.get("status")
+        except FailedPrecondition:
+            return CAMPANHA_DE_OUTRO_WORKER
+        except Exception as e:
+            _falha(f"Erro ao assumir campanha {campanha_id}", e)
+            return None
+    
+    # ==================== OUTBOX ====================
+    
+    _mock_outbox: Dict[str, Dict[str, Any]] = {}
+    
+    @_instrumentado
+    def salvar_envio_pendente(self, envio_id: str, envio: Dict[str, Any]) -> bool:
+        """Grava (ou substitui) uma resposta da outbox."""
+        contabilizar(escritas=1)
+        if self._mock_mode:
+            self._mock_outbox[envio_id] = dict(envio)
+            return True
+        
+        try:
+            self._db.collection("outbox").document(envio_id).set(envio)
+            return True
+        except Exception as e:
+            _falha(f"Erro ao salvar envio pendente {envio_id}", e)
+            return False
+    
+    @_instrumentado
+    def remover_envio_pendente(self, envio_id: str) -> Optional[bool]:
+        """
+        Remove uma resposta da outbox.
+        
+        Returns:
+            True se esta chamada removeu; False se ela já não existia (outro
+            worker enviou antes); None em caso de erro
+        """
+        contabilizar(escritas=1)
+        if self._mock_mode:
+            return self._mock_outbox.pop(envio_id, None) is not None
+        
+        try:
+            self._db.collection("outbox").document(envio_id).delete(
+                option=self._db.write_option(exists=True)
+            )
+            return True
+        except (NotFound, FailedPrecondition):
+            return False
+        except Exception as e:
+            _falha(f"Erro ao remover envio pendente {envio_id}", e)
+            return None
+    
+    @_instrumentado
+    def listar_envios_pendentes(self) -> List[Dict[str, Any]]:
+        """Respostas gravadas na outbox, na ordem em que foram enfileiradas."""
+        if self._mock_mode:
+            _contar_consultas(len(self._mock_outbox))
+            envios = [dict(e, _id=envio_id) for envio_id, e in self._mock_outbox.items()]
+            return sorted(envios, key=lambda e: e.get("criado_em", ""))
+        
+        try:
+            envios = []
+            for doc in self._db.collection("outbox").order_by("criado_em").stream():
+                data = doc.to_dict()
+                data["_id"] = doc.id
+                envios.append(data)
+            _contar_consultas(len(envios))
+            return envios
+        except Exception as e:
+            _falha("Erro ao listar envios pendentes", e)
+            return []
+    
+    # ==================== ENTREGAS ====================
+    
+    _mock_entregas: Dict[str, Dict[str, Any]] = {}
+    
+    @_instrumentado
+    def incrementar_entregas_hora(self, hora: str, contagens: Dict[str, float]) -> bool:
+        """
+        Soma as contagens ao resumo de entregas da hora ("AAAA-MM-DDTHH").
+        
+        O incremento é atômico no Firestore: cada worker soma as suas.
+        """
+        contabilizar(escritas=1)
+        if self._mock_mode:
+            resumo = self._mock_entregas.setdefault(hora, {"hora": hora})
+            for campo, n in contagens.items():
+                resumo[campo] = resumo.get(campo, 0) + n
+            return True
+        
+        try:
+            self._db.collection("entregas_horas").document(hora).set(
+                {"hora": hora, **{campo: firestore.Increment(n) for campo, n in contagens.items()}},
+                merge=True
+            )
+            return True
+        except Exception as e:
+            _falha(f"Erro ao gravar entregas da hora {hora}", e)
+            return False
+    
+    @_instrumentado
+    def listar_entregas_horas(self, desde: str) -> List[Dict[str, Any]]:
+        """Resumos de entregas a partir da hora informada ("AAAA-MM-DDTHH"), em ordem."""
+        if self._mock_mode:
+            resumos = [dict(r) for hora, r in sorted(self._mock_entregas.items()) if hora >= desde]
+            _contar_consultas(len(resumos))
+            return resumos
+        
+        try:
+            docs = self._db.collection("entregas_horas").where(
+                filter=FieldFilter("hora", ">=", desde)
+            ).order_by("hora").stream()
+            resumos = [doc.to_dict() for doc in docs]
+            _contar_consultas(len(resumos))
+            return resumos
+        except Exception as e:
+            _falha("Erro ao listar entregas", e)
+            return []
+    
     # ==================== LOGS ====================
     
     _mock_logs = []
     
+    @_instrumentado
     def log_interacao(
         self,
         phone: str,
@@ -432,9 +1422,15 @@ class FirebaseService:
         mensagem_recebida: str,
         mensagem_enviada: str,
         etapa: str,
-        fluxo: str
+        fluxo: str,
+        duracao_ms: Optional[float] = None
     ):
-        """Registra log de interação no Firestore."""
+        """
+        Registra log de interação no Firestore.
+        
+        Args:
+            duracao_ms: Tempo de processamento da mensagem até a resposta
+        """
         try:
             log_data = {
                 "phone": phone,
@@ -445,13 +1441,74 @@ class FirebaseService:
                 "fluxo": fluxo,
                 "timestamp": datetime.utcnow().isoformat()
             }
+            if duracao_ms is not None:
+                log_data["duracao_ms"] = duracao_ms
             
+            contabilizar(escritas=1)
             if self._mock_mode:
                 self._mock_logs.append(log_data)
             else:
                 self._db.collection("logs_interacoes").add(log_data)
         except Exception as e:
-            logger.error(f"Erro ao salvar log: {e}")
+            _falha("Erro ao salvar log", e)
+    
+    def listar_logs_interacoes(
+        self,
+        desde: Optional[str] = None,
+        ate: Optional[str] = None,
+        tamanho_lote: int = 500
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Percorre os logs de interação em ordem de timestamp, com paginação por cursor.
+        
+        Args:
+            desde: Timestamp ISO inicial (inclusivo)
+            ate: Timestamp ISO final (exclusivo)
+            tamanho_lote: Documentos lidos por página
+        """
+        if self._mock_mode:
+            logs = sorted(self._mock_logs, key=lambda log: log["timestamp"])
+            for log in logs:
+                if (desde is None or log["timestamp"] >= desde) and (ate is None or log["timestamp"] < ate):
+                    yield dict(log)
+            return
+        
+        query = self._db.collection("logs_interacoes").order_by("timestamp")
+        if desde:
+            query = query.where(filter=FieldFilter("timestamp", ">=", desde))
+        if ate:
+            query = query.where(filter=FieldFilter("timestamp", "<", ate))
+        
+        ultimo_doc = None
+        while True:
+            pagina = query.limit(tamanho_lote)
+            if ultimo_doc is not None:
+                pagina = pagina.start_after(ultimo_doc)
+            docs = list(pagina.stream())
+            _contar_consultas(len(docs))
+            for doc in docs:
+                data = doc.to_dict()
+                data["_id"] = doc.id
+                yield data
+            if len(docs) < tamanho_lote:
+                break
+            ultimo_doc = docs[-1]
+    
+    # ==================== SAÚDE ====================
+    
+    @_instrumentado
+    def verificar_conexao(self) -> Dict[str, Any]:
+        """Lê um documento fixo (1 leitura) para verificar o acesso ao Firestore."""
+        contabilizar(leituras=1)
+        if self._mock_mode:
+            return {"connected": True, "mock": True}
+        
+        try:
+            self._db.collection("_saude").document("prontidao").get()
+            return {"connected": True}
+        except Exception as e:
+            _falha("Firestore indisponível na verificação de prontidão", e)
+            return {"connected": False, "error": str(e)}
 
 
 # Instância global do serviço
@@ -0,0 +1,309 @@
+"""
+Métricas da aplicação no formato texto do Prometheus (GET /metrics).
+
+Contadores, medidores (gauges) e histogramas com rótulos, registrados
+uma vez na importação.
+O registro de uma amostra é barato: cada série de histograma tem as
+contagens dos buckets pré-alocadas numa lista e a observação é uma busca
+binária nos limites mais um incremento. Não há lock: os endpoints rodam
+no loop de eventos (uma thread), e em threads um incremento perdido numa
+corrida é aceitável para métricas.
+
+Os valores são do processo (cada worker expõe os seus).
+"""
+import functools
+import logging
+import time
+from bisect import bisect_left
+from typing import Dict, List, Tuple, Sequence, Callable, Iterator
+
+# Limites dos buckets de latência, em segundos
+BUCKETS_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Limites dos buckets de operações no Firestore por mensagem
+BUCKETS_OPERACOES = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+# Limites dos buckets de tempo até a entrega/leitura de mensagens (segundos).
+# Os resumos por hora no Firestore guardam as contagens pela posição do
+# bucket: alterar os limites invalida os resumos já gravados.
+BUCKETS_ENTREGA = (1, 2, 5, 10, 20, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 21600, 86400)
+
+
+def _formatar_rotulos(nomes: Sequence[str], valores: Sequence[str]) -> str:
+    pares = []
+    for nome, valor in zip(nomes, valores):
+        valor = str(valor).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        pares.append(f'{nome}="{valor}"')
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+class Contador:
+    """Contador monotônico, com uma série por combinação de rótulos."""
+    
+    tipo = "counter"
+    
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        # Sem rótulos a série única já existe, exportada com 0
+        self._valores: Dict[Tuple[str, ...], float] = {} if self.rotulos else {(): 0}
+    
+    def inc(self, *valores: str, n: float = 1):
+        """Incrementa a série dos rótulos informados (na ordem de `rotulos`)."""
+        self._valores[valores] = self._valores.get(valores, 0) + n
+    
+    def valor(self, *valores: str) -> float:
+        return self._valores.get(valores, 0)
+    
+    def amostras(self) -> Iterator[str]:
+        for valores, total in list(self._valores.items()):
+            yield f"{self.nome}{_formatar_rotulos(self.rotulos, valores)} {total:g}"
+
+
+class Medidor:
+    """Valor que sobe e desce (gauge), com uma série por combinação de rótulos."""
+    
+    tipo = "gauge"
+    
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._valores: Dict[Tuple[str, ...], float] = {} if self.rotulos else {(): 0}
+    
+    def definir(self, valor: float, *valores: str):
+        """Define o valor atual da série dos rótulos informados."""
+        self._valores[valores] = valor
+    
+    def valor(self, *valores: str) -> float:
+        return self._valores.get(valores, 0)
+    
+    def amostras(self) -> Iterator[str]:
+        for valores, valor in list(self._valores.items()):
+            yield f"{self.nome}{_formatar_rotulos(self.rotulos, valores)} {valor:g}"
+
+
+class _SerieHistograma:
+    __slots__ = ("contagens", "soma")
+    
+    def __init__(self, n_buckets: int):
+        # Um contador por bucket, mais o +Inf
+        self.contagens: List[int] = [0] * (n_buckets + 1)
+        self.soma = 0.0
+
+
+class Histograma:
+    """Histograma de buckets fixos, com uma série por combinação de rótulos."""
+    
+    tipo = "histogram"
+    
+    def __init__(
+        self,
+        nome: str,
+        ajuda: str,
+        rotulos: Sequence[str] = (),
+        buckets: Sequence[float] = BUCKETS_LATENCIA
+    ):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], _SerieHistograma] = {}
+    
+    def observar(self, valor: float, *valores: str):
+        """Registra uma amostra na série dos rótulos informados."""
+        serie = self._series.get(valores)
+        if serie is None:
+            serie = self._series[valores] = _SerieHistograma(len(self.buckets))
+        # bisect_left: o valor entra no primeiro bucket com limite >= valor (le)
+        serie.contagens[bisect_left(self.buckets, valor)] += 1
+        serie.soma += valor
+    
+    def total(self, *valores: str) -> int:
+        serie = self._series.get(valores)
+        return sum(serie.contagens) if serie is not None else 0
+    
+    def amostras(self) -> Iterator[str]:
+        nomes = self.rotulos + ("le",)
+        for valores, serie in list(self._series.items()):
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + (float("inf"),), serie.contagens):
+                acumulado += contagem
+                le = "+Inf" if limite == float("inf") else f"{limite:g}"
+                yield f"{self.nome}_bucket{_formatar_rotulos(nomes, valores + (le,))} {acumulado}"
+            rotulos = _formatar_rotulos(self.rotulos, valores)
+            yield f"{self.nome}_sum{rotulos} {serie.soma:.6f}"
+            yield f"{self.nome}_count{rotulos} {acumulado}"
+
+
+class _ContadorErrosLog(logging.Handler):
+    """Conta os logs de erro de um logger pela função que os emitiu."""
+    
+    def __init__(self, contador: Contador):
+        super().__init__(level=logging.ERROR)
+        self.contador = contador
+    
+    def emit(self, record: logging.LogRecord):
+        self.contador.inc(record.funcName)
+
+
+class Metricas:
+    """Métricas registradas da aplicação."""
+    
+    _instance = None
+    _initialized = False
+    
+    def __new__(cls):
+        """Singleton pattern."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+    
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        self._registradas: List = []
+        
+        self.webhook_duracao = self._registrar(Histograma(
+            "chatbot_webhook_duracao_segundos",
+            "Tempo do webhook do recebimento até o envio da resposta",
+            ("resultado",)
+        ))
+        self.mensagem_duracao = self._registrar(Histograma(
+            "chatbot_mensagem_duracao_segundos",
+            "Tempo de MessageHandler.process_message por fluxo e etapa de entrada",
+            ("fluxo", "etapa")
+        ))
+        self.firebase_duracao = self._registrar(Histograma(
+            "chatbot_firebase_duracao_segundos",
+            "Latência dos métodos do FirebaseService",
+            ("metodo",)
+        ))
+        self.firebase_erros = self._registrar(Contador(
+            "chatbot_firebase_erros_total",
+            "Erros nos métodos do FirebaseService",
+            ("metodo",)
+        ))
+        self.firestore_leituras = self._registrar(Histograma(
+            "chatbot_firestore_leituras_por_mensagem",
+            "Documentos lidos no Firestore por mensagem, por fluxo e etapa de entrada",
+            ("fluxo", "etapa"),
+            BUCKETS_OPERACOES
+        ))
+        self.firestore_escritas = self._registrar(Histograma(
+            "chatbot_firestore_escritas_por_mensagem",
+            "Documentos gravados no Firestore por mensagem, por fluxo e etapa de entrada",
+            ("fluxo", "etapa"),
+            BUCKETS_OPERACOES
+        ))
+        self.firestore_consultas = self._registrar(Histograma(
+            "chatbot_firestore_consultas_por_mensagem",
+            "Consultas ao Firestore por mensagem, por fluxo e etapa de entrada",
+            ("fluxo", "etapa"),
+            BUCKETS_OPERACOES
+        ))
+        self.zapi_duracao = self._registrar(Histograma(
+            "chatbot_zapi_envio_duracao_segundos",
+            "Latência do envio de mensagens pela Z-API"
+        ))
+        self.zapi_envios = self._registrar(Contador(
+            "chatbot_zapi_envios_total",
+            "Envios pela Z-API por status HTTP (ou timeout, erro, nao_configurado, circuito_aberto)",
+            ("status",)
+        ))
+        self.mensagens_recebidas = self._registrar(Contador(
+            "chatbot_mensagens_recebidas_total",
+            "Mensagens de clientes processadas pelo webhook"
+        ))
+        self.mensagens_enviadas = self._registrar(Contador(
+            "chatbot_mensagens_enviadas_total",
+            "Mensagens enviadas com sucesso pela Z-API"
+        ))
+        self.callbacks_ignorados = self._registrar(Contador(
+            "chatbot_callbacks_ignorados_total",
+            "Callbacks do webhook ignorados, por motivo",
+            ("motivo",)
+        ))
+        self.campanha_envios = self._registrar(Contador(
+            "chatbot_campanha_envios_total",
+            "Mensagens de campanhas por resultado (enviada, falha)",
+            ("resultado",)
+        ))
+        self.entrega_latencia = self._registrar(Histograma(
+            "chatbot_entrega_latencia_segundos",
+            "Tempo do envio pela Z-API até a entrega (entrega) ou leitura (leitura) da mensagem",
+            ("etapa",),
+            BUCKETS_ENTREGA
+        ))
+        self.status_callbacks = self._registrar(Contador(
+            "chatbot_status_callbacks_total",
+            "Callbacks de status da Z-API por status e se casaram com um envio deste worker",
+            ("status", "casado")
+        ))
+        self.disjuntor_estado = self._registrar(Medidor(
+            "chatbot_disjuntor_estado",
+            "Estado do circuito por dependência (0 fechado, 1 meio-aberto, 2 aberto)",
+            ("dependencia",)
+        ))
+        self.disjuntor_transicoes = self._registrar(Contador(
+            "chatbot_disjuntor_transicoes_total",
+            "Mudanças de estado do circuito por dependência e novo estado",
+            ("dependencia", "estado")
+        ))
+        self.disjuntor_rejeitadas = self._registrar(Contador(
+            "chatbot_disjuntor_rejeitadas_total",
+            "Chamadas recusadas sem acessar a dependência (circuito aberto)",
+            ("dependencia",)
+        ))
+        self.outbox_pendentes = self._registrar(Medidor(
+            "chatbot_outbox_pendentes",
+            "Respostas aguardando envio na outbox deste worker"
+        ))
+        self.outbox_envios = self._registrar(Contador(
+            "chatbot_outbox_envios_total",
+            "Respostas da outbox por resultado (enfileirada, enviada, descartada)",
+            ("resultado",)
+        ))
+    
+    def _registrar(self, metrica):
+        self._registradas.append(metrica)
+        return metrica
+    
+    def contar_erros_do_logger(self, logger: logging.Logger, contador: Contador):
+        """Conta no contador os logs de erro do logger, rotulados pela função."""
+        logger.addHandler(_ContadorErrosLog(contador))
+    
+    def exportar(self) -> str:
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)."""
+        linhas = []
+        for metrica in self._registradas:
+            linhas.append(f"# HELP {metrica.nome} {metrica.ajuda}")
+            linhas.append(f"# TYPE {metrica.nome} {metrica.tipo}")
+            linhas.extend(metrica.amostras())
+        return "\n".join(linhas) + "\n"
+
+
+def cronometrado(histograma: Histograma, erros: Contador) -> Callable:
+    """
+    Decorator que registra a duração de cada chamada no histograma, rotulada
+    pelo nome da função, e conta no contador as exceções que escapam dela.
+    """
+    def decorator(func: Callable) -> Callable:
+        nome = func.__name__
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                erros.inc(nome)
+                raise
+            finally:
+                histograma.observar(time.perf_counter() - inicio, nome)
+        return wrapper
+    return decorator
+
+
+# Instância global das métricas
+metricas = Metricas()
@@ -0,0 +1,295 @@
+"""
+Outbox: respostas que não puderam ser enviadas, reenviadas em ordem.
+
+Quando a Z-API falha (erro, timeout ou circuito aberto), as partes da
+resposta que não saíram entram na fila deste worker e são gravadas na
+coleção "outbox". Uma tarefa do event loop, iniciada no lifespan, verifica a
+fila a cada OUTBOX_INTERVALO_SEGUNDOS e, com o circuito da Z-API não aberto,
+reenvia por telefone na ordem de chegada; cada falha dobra a espera até a
+próxima tentativa.
+
+- Enquanto um telefone tem respostas na fila, as novas respostas dele entram
+  atrás delas: o cliente não recebe a resposta nova antes da antiga.
+- Uma resposta é descartada depois de OUTBOX_TENTATIVAS falhas com o
+  circuito fechado (a Z-API responde, mas recusa aquele envio). Falhas com
+  o circuito aberto não contam.
+- Cada resposta gravada leva o dono (worker que a enfileirou) e um lease
+  que vale até a próxima tentativa mais 3 intervalos. No início da
+  aplicação cada worker carrega as respostas gravadas sem lease válido (de
+  um worker que caiu, reiniciou ou está congelado); as de um dono ativo
+  ficam com ele.
+- Antes de cada reenvio o worker remove o documento exigindo que ele
+  exista, inclusive o dono: só um worker reenvia cada resposta. Se o envio
+  falha, a resposta é gravada de novo com lease renovado.
+- Onde tarefas de fundo não rodam entre requisições (ex.: Vercel), o
+  webhook chama `drenar_se_parada()` antes de processar cada mensagem: sem
+  a tarefa, as respostas gravadas são carregadas (uma vez por processo) e
+  as que chegaram na vez são reenviadas ali.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any, Deque, Tuple
+
+from app.config import get_settings
+from app.services.disjuntor import disjuntor_zapi, ABERTO, FECHADO
+from app.services.firebase_service import firebase_service
+from app.services.metricas import metricas
+from app.services.zapi_service import zapi_service
+
+logger = logging.getLogger(__name__)
+
+# Espera máxima entre tentativas de uma resposta (segundos)
+ESPERA_MAXIMA = 300
+
+
+@dataclass
+class EnvioPendente:
+    """Partes de uma resposta que ainda não foram enviadas."""
+    telefone: str
+    partes: List[str]
+    criado_em: str
+    tentativas: int = 0
+    dono: str = ""
+    lease_ate: str = ""
+    # Estado local (não gravado)
+    proxima_tentativa: float = 0.0
+    gravado: bool = False
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "telefone": self.telefone,
+            "partes": self.partes,
+            "criado_em": self.criado_em,
+            "tentativas": self.tentativas,
+            "dono": self.dono,
+            "lease_ate": self.lease_ate
+        }
+
+
+class Outbox:
+    """Fila de reenvio das respostas, por telefone e em ordem."""
+    
+    _instance = None
+    _initialized = False
+    
+    def __new__(cls):
+        """Singleton pattern."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+    
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        self.settings = get_settings()
+        self._dono = f"{socket.gethostname()}-{os.getpid()}"
+        self._envios: Dict[str, EnvioPendente] = {}
+        # IDs dos envios de cada telefone, na ordem de chegada
+        self._por_telefone: Dict[str, Deque[str]] = {}
+        self._tarefa: Optional[asyncio.Task] = None
+        self._ultima_volta = 0.0
+        self._carregada = False
+        # Tarefa e webhook não drenam ao mesmo tempo (reenviariam a mesma resposta)
+        self._drenando = asyncio.Lock()
+    
+    # ==================== CICLO DE VIDA ====================
+    
+    def carregar(self):
+        """Carrega as respostas gravadas sem dono ativo (início da aplicação)."""
+        self._carregada = True
+        agora = datetime.utcnow().isoformat()
+        com_dono = 0
+        for data in firebase_service.listar_envios_pendentes():
+            envio_id = data.pop("_id")
+            if envio_id in self._envios:
+                continue
+            if data.get("dono") not in (None, "", self._dono) and data.get("lease_ate", "") >= agora:
+                # Outro worker ativo reenvia esta resposta
+                com_dono += 1
+                continue
+            self._adicionar(envio_id, EnvioPendente(
+                telefone=data["telefone"],
+                partes=list(data["partes"]),
+                criado_em=data.get("criado_em", ""),
+                tentativas=data.get("tentativas", 0),
+                gravado=True
+            ))
+        if self._envios:
+            logger.info(f"📮 Outbox: {len(self._envios)} respostas pendentes carregadas")
+        if com_dono:
+            logger.info(f"📮 Outbox: {com_dono} respostas pendentes com outro worker")
+    
+    def iniciar(self):
+        """Inicia a tarefa de reenvio no event loop atual."""
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = asyncio.create_task(self._executar())
+    
+    async def parar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+        nao_gravados = sum(1 for e in self._envios.values() if not e.gravado)
+        if nao_gravados:
+            logger.warning(f"⚠️ Outbox: {nao_gravados} respostas não gravadas perdidas no encerramento")
+    
+    @property
+    def ativa(self) -> bool:
+        """
+        Indica se a tarefa de reenvio está rodando: existe e deu uma volta nos
+        últimos 3 intervalos (processo congelado entre requisições não conta).
+        """
+        return (
+            self._tarefa is not None and not self._tarefa.done()
+            and time.monotonic() - self._ultima_volta < 3 * self.settings.outbox_intervalo_segundos
+        )
+    
+    async def drenar_se_parada(self):
+        """
+        Sem a tarefa de reenvio (lifespan não executado ou processo congelado
+        entre requisições, como na Vercel), carrega e reenvia aqui.
+        """
+        if self.ativa or self._drenando.locked():
+            return
+        if not self._carregada:
+            await asyncio.to_thread(self.carregar)
+        await self.drenar()
+    
+    async def _executar(self):
+        while True:
+            self._ultima_volta = time.monotonic()
+            try:
+                await self.drenar()
+            except Exception as e:
+                logger.error(f"❌ Erro ao reenviar respostas da outbox: {e}", exc_info=True)
+            await asyncio.sleep(self.settings.outbox_intervalo_segundos)
+    
+    # ==================== ENVIO ====================
+    
+    def pendentes(self, telefone: str) -> bool:
+        """Indica se o telefone tem respostas na fila."""
+        return telefone in self._por_telefone
+    
+    def enviar(self, telefone: str, partes: List[str]) -> Tuple[List[str], int]:
+        """
+        Envia as partes da resposta em ordem; as que não saírem vão para a fila.
+        
+        Se o telefone já tem respostas na fila, a resposta inteira entra
+        atrás delas sem tentar o envio. Sem Z-API configurada nada é
+        enfileirado.
+        
+        Returns:
+            Tupla (messageIds das partes enviadas agora, partes enfileiradas)
+        """
+        message_ids = [] if self.pendentes(telefone) else zapi_service.send_messages(telefone, partes)
+        restantes = partes[len(message_ids):]
+        if restantes and zapi_service.configurado and self.enfileirar(telefone, restantes):
+            return message_ids, len(restantes)
+        return message_ids, 0
+    
+    def enfileirar(self, telefone: str, partes: List[str]) -> bool:
+        """Coloca as partes na fila do telefone; False se a outbox está cheia."""
+        if len(self._envios) >= self.settings.outbox_capacidade:
+            logger.error(f"❌ Outbox cheia ({len(self._envios)}): resposta para {telefone} descartada")
+            metricas.outbox_envios.inc("descartada")
+            return False
+        envio_id = f"{telefone}_{time.time_ns()}"
+        envio = EnvioPendente(telefone=telefone, partes=list(partes), criado_em=datetime.utcnow().isoformat())
+        self._adicionar(envio_id, envio)
+        envio.gravado = firebase_service.salvar_envio_pendente(envio_id, self._com_lease(envio, 0))
+        metricas.outbox_envios.inc("enfileirada")
+        logger.warning(f"📮 Resposta para {telefone} na outbox ({len(partes)} mensagens)")
+        return True
+    
+    async def drenar(self):
+        """Reenvia, por telefone e em ordem, as respostas cuja vez chegou."""
+        async with self._drenando:
+            for telefone in list(self._por_telefone):
+                fila = self._por_telefone.get(telefone)
+                while fila:
+                    if disjuntor_zapi.estado == ABERTO:
+                        return
+                    envio_id = fila[0]
+                    envio = self._envios[envio_id]
+                    if envio.proxima_tentativa > time.monotonic():
+                        break
+                    if not await self._reenviar(envio_id, envio):
+                        break
+                    self._remover(envio_id)
+    
+    async def _reenviar(self, envio_id: str, envio: EnvioPendente) -> bool:
+        """Tenta reenviar a resposta; True se ela sai da fila (enviada ou descartada)."""
+        if envio.gravado:
+            # Assume o reenvio: só quem remove o documento envia
+            removido = await asyncio.to_thread(firebase_service.remover_envio_pendente, envio_id)
+            if removido is None:
+                envio.proxima_tentativa = time.monotonic() + self.settings.outbox_intervalo_segundos
+                return False
+            if not removido:
+                # Outro worker assumiu e reenviou
+                return True
+            envio.gravado = False
+        
+        message_ids = await asyncio.to_thread(zapi_service.send_messages, envio.telefone, envio.partes)
+        envio.partes = envio.partes[len(message_ids):]
+        if not envio.partes:
+            metricas.outbox_envios.inc("enviada")
+            logger.info(f"📮 Resposta para {envio.telefone} reenviada da outbox")
+            return True
+        
+        # Com o circuito aberto (ou aberto por esta falha) a Z-API está fora: não conta
+        if disjuntor_zapi.estado == FECHADO:
+            envio.tentativas += 1
+        if envio.tentativas >= self.settings.outbox_tentativas:
+            logger.error(f"❌ Resposta para {envio.telefone} descartada da outbox após {envio.tentativas} tentativas")
+            metricas.outbox_envios.inc("descartada")
+            return True
+        
+        espera = min(2 ** envio.tentativas, ESPERA_MAXIMA)
+        envio.proxima_tentativa = time.monotonic() + espera
+        envio.gravado = await asyncio.to_thread(
+            firebase_service.salvar_envio_pendente, envio_id, self._com_lease(envio, espera)
+        )
+        return False
+    
+    def _com_lease(self, envio: EnvioPendente, espera: float) -> Dict[str, Any]:
+        """Documento da resposta com este worker como dono até a próxima tentativa mais 3 intervalos."""
+        segundos = espera + 3 * self.settings.outbox_intervalo_segundos
+        envio.dono = self._dono
+        envio.lease_ate = (datetime.utcnow() + timedelta(seconds=segundos)).isoformat()
+        return envio.to_dict()
+    
+    def _adicionar(self, envio_id: str, envio: EnvioPendente):
+        self._envios[envio_id] = envio
+        self._por_telefone.setdefault(envio.telefone, deque()).append(envio_id)
+        metricas.outbox_pendentes.definir(len(self._envios))
+    
+    def _remover(self, envio_id: str):
+        envio = self._envios.pop(envio_id)
+        fila = self._por_telefone[envio.telefone]
+        fila.popleft()
+        if not fila:
+            del self._por_telefone[envio.telefone]
+        metricas.outbox_pendentes.definir(len(self._envios))
+    
+    def resumo(self) -> Dict[str, Any]:
+        mais_antigo = min((e.criado_em for e in self._envios.values()), default=None)
+        return {
+            "pendentes": len(self._envios),
+            "telefones": len(self._por_telefone),
+            "mais_antiga": mais_antigo
+        }
+
+
+# Instância global da outbox
+outbox = Outbox()
@@ -0,0 +1,80 @@
+"""
+Cache de páginas renderizadas do catálogo.
+
+A lista de categorias e a lista de produtos de cada categoria são iguais
+para todos os clientes enquanto o catálogo não muda. O cache guarda o
+texto pronto e o mapa opção -> dados que vai para o estado da conversa,
+com chave (tipo da página, categoria, página, versão do catálogo, locale).
+A página é identificada pelo cursor de início (ou pelo número, nas listas
+paginadas em memória), então cada página de uma lista tem sua entrada. Quando
+o catálogo muda a versão muda junto, e as páginas antigas saem por LRU.
+"""
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Tuple
+
+from app.config import get_settings
+from app.services.catalogo_service import catalogo_service
+from app.templates.renderer import templates
+
+logger = logging.getLogger(__name__)
+
+ChavePagina = Tuple[str, str, str, int, str]
+
+
+@dataclass(frozen=True)
+class PaginaRenderizada:
+    """Texto da página, mapa de opções numeradas e cursor da próxima página."""
+    texto: str
+    opcoes: Dict[str, Any]
+    proximo_cursor: Optional[str] = None
+
+
+class PageCache:
+    """Cache LRU de páginas renderizadas, com contagem de acertos."""
+    
+    def __init__(self, capacidade: int):
+        self.capacidade = capacidade
+        self._paginas: "OrderedDict[ChavePagina, PaginaRenderizada]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def chave(self, tipo: str, categoria: str = "", pagina: str = "") -> ChavePagina:
+        """Monta a chave da página para o catálogo e locale atuais."""
+        return (tipo, categoria, pagina, catalogo_service.versao(), templates.locale)
+    
+    def get(self, chave: ChavePagina) -> Optional[PaginaRenderizada]:
+        pagina = self._paginas.get(chave)
+        if pagina is None:
+            self.misses += 1
+            return None
+        self._paginas.move_to_end(chave)
+        self.hits += 1
+        return pagina
+    
+    def put(self, chave: ChavePagina, pagina: PaginaRenderizada):
+        self._paginas[chave] = pagina
+        self._paginas.move_to_end(chave)
+        while len(self._paginas) > self.capacidade:
+            self._paginas.popitem(last=False)
+            self.evictions += 1
+    
+    def limpar(self):
+        self._paginas.clear()
+    
+    def estatisticas(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "paginas": len(self._paginas),
+            "capacidade": self.capacidade,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+
+# Instância global
+page_cache = PageCache(get_settings().page_cache_capacidade)
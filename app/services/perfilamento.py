@@ -0,0 +1,205 @@
+"""
+Perfilamento sob demanda de requisições individuais.
+
+Uma requisição é perfilada quando chega com o header X-Admin-Secret válido
+ou quando cai na amostragem (PERFILAMENTO_AMOSTRAGEM, alterável em tempo de
+execução por /admin/perfis/amostragem). Durante a requisição, uma thread
+amostra a pilha da thread que a processa a cada PERFILAMENTO_INTERVALO_MS e
+conta as pilhas no formato "collapsed" (uma linha "a;b;c N" por pilha), o
+mesmo do flamegraph.pl e do speedscope.
+
+Os perfis ficam num buffer circular com os últimos PERFILAMENTO_CAPACIDADE,
+por worker. Com a amostragem em 0 e sem o header, `perfilar()` devolve um
+objeto nulo: nenhuma thread é criada e nada é medido.
+
+A resolução depende do GIL: enquanto a requisição espera rede (Firestore,
+Z-API) as amostras saem no intervalo configurado; em trechos só de CPU a
+thread amostradora só roda a cada troca de GIL (sys.getswitchinterval()).
+"""
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Funções mais frequentes no topo da pilha, mostradas na listagem
+TOPO_LISTAGEM = 5
+
+
+def _nome_frame(frame) -> str:
+    codigo = frame.f_code
+    return f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})"
+
+
+def _pilha(frame, raiz) -> Optional[str]:
+    """Pilha do frame até a raiz do perfil, da raiz para o topo; None se a raiz não está nela."""
+    nomes = []
+    while frame is not None and frame is not raiz:
+        nomes.append(_nome_frame(frame))
+        frame = frame.f_back
+    if frame is None:
+        return None
+    nomes.append(_nome_frame(raiz))
+    return ";".join(reversed(nomes))
+
+
+class Perfil:
+    """Perfil de uma requisição; usado como context manager em volta do processamento."""
+    
+    def __init__(self, perfilador: "Perfilador", nome: str, motivo: str, atributos: Dict[str, Any]):
+        self.perfilador = perfilador
+        self.id = 0
+        self.nome = nome
+        self.motivo = motivo
+        self.atributos = atributos
+        self.inicio = datetime.utcnow()
+        self.duracao_ms = 0.0
+        self._inicio_relogio = 0.0
+        self.pilhas: Counter = Counter()
+        self.fora = 0
+        self._raiz = None
+        self._thread_id = 0
+        self._parar = threading.Event()
+        self._amostrador: Optional[threading.Thread] = None
+    
+    def __enter__(self) -> "Perfil":
+        self._raiz = sys._getframe(1)
+        self._thread_id = threading.get_ident()
+        self._amostrador = threading.Thread(target=self._amostrar, name="perfilador", daemon=True)
+        self._inicio_relogio = time.perf_counter()
+        self._amostrador.start()
+        return self
+    
+    def __exit__(self, tipo_excecao, excecao, tb):
+        self.duracao_ms = (time.perf_counter() - self._inicio_relogio) * 1000
+        self._parar.set()
+        self._amostrador.join()
+        self._raiz = None
+        self.perfilador._registrar(self)
+        return False
+    
+    def _amostrar(self):
+        intervalo = self.perfilador.intervalo
+        while not self._parar.wait(intervalo):
+            frame = sys._current_frames().get(self._thread_id)
+            pilha = _pilha(frame, self._raiz) if frame is not None else None
+            if pilha:
+                self.pilhas[pilha] += 1
+            else:
+                # Thread fora do trecho perfilado (ex: event loop atendendo outra requisição)
+                self.fora += 1
+    
+    def resumo(self) -> Dict[str, Any]:
+        topo: Counter = Counter()
+        for pilha, n in self.pilhas.items():
+            topo[pilha.rsplit(";", 1)[-1]] += n
+        return {
+            "id": self.id,
+            "nome": self.nome,
+            "motivo": self.motivo,
+            "inicio": self.inicio.isoformat() + "Z",
+            "duracao_ms": round(self.duracao_ms, 1),
+            "amostras": sum(self.pilhas.values()),
+            "fora": self.fora,
+            "topo": [{"funcao": funcao, "amostras": n} for funcao, n in topo.most_common(TOPO_LISTAGEM)],
+            **self.atributos
+        }
+    
+    def collapsed(self) -> str:
+        """Pilhas no formato collapsed (flamegraph.pl / speedscope)."""
+        return "".join(f"{pilha} {n}\n" for pilha, n in self.pilhas.most_common())
+
+
+class _PerfilNulo:
+    """Perfil de requisições não perfiladas: não faz nada."""
+    
+    __slots__ = ()
+    
+    def __enter__(self) -> "_PerfilNulo":
+        return self
+    
+    def __exit__(self, tipo_excecao, excecao, tb):
+        return False
+
+
+_PERFIL_NULO = _PerfilNulo()
+
+
+class Perfilador:
+    """Decide quais requisições perfilar e guarda os últimos perfis."""
+    
+    _instance = None
+    _initialized = False
+    
+    def __new__(cls):
+        """Singleton pattern."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+    
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        settings = get_settings()
+        self.amostragem = settings.perfilamento_amostragem
+        self.intervalo = settings.perfilamento_intervalo_ms / 1000
+        self._perfis: deque = deque(maxlen=settings.perfilamento_capacidade)
+        self._proximo_id = 1
+        # Um perfil por vez: a amostragem é da thread inteira
+        self._ocupado = threading.Lock()
+        self._lock = threading.Lock()
+    
+    def perfilar(self, nome: str, forcado: bool = False, **atributos):
+        """
+        Context manager que perfila o trecho se `forcado` (header de admin)
+        ou se a requisição cair na amostragem; senão não faz nada.
+        """
+        if forcado:
+            motivo = "header"
+        elif self.amostragem > 0 and random.random() < self.amostragem:
+            motivo = "amostragem"
+        else:
+            return _PERFIL_NULO
+        if not self._ocupado.acquire(blocking=False):
+            return _PERFIL_NULO
+        return Perfil(self, nome, motivo, atributos)
+    
+    def _registrar(self, perfil: Perfil):
+        with self._lock:
+            perfil.id = self._proximo_id
+            self._proximo_id += 1
+            self._perfis.append(perfil)
+        self._ocupado.release()
+        logger.info(f"🔬 Perfil {perfil.id} ({perfil.nome}, {perfil.motivo}): "
+                    f"{perfil.duracao_ms:.0f} ms, {sum(perfil.pilhas.values())} amostras")
+    
+    def definir_amostragem(self, fracao: float):
+        """Altera a fração de requisições perfiladas neste worker (0 desliga)."""
+        self.amostragem = fracao
+        logger.info(f"🔬 Amostragem do perfilamento: {fracao}")
+    
+    def listar(self) -> Dict[str, Any]:
+        with self._lock:
+            perfis: List[Perfil] = list(self._perfis)
+        return {
+            "amostragem": self.amostragem,
+            "capacidade": self._perfis.maxlen,
+            "perfis": [p.resumo() for p in reversed(perfis)]
+        }
+    
+    def obter(self, perfil_id: int) -> Optional[Perfil]:
+        with self._lock:
+            return next((p for p in self._perfis if p.id == perfil_id), None)
+
+
+# Instância global do perfilador
+perfilador = Perfilador()
@@ -0,0 +1,136 @@
+"""
+Prontidão (readiness) da aplicação: Firestore e Z-API verificados em segundo plano.
+
+Uma tarefa do event loop, iniciada no lifespan, verifica as dependências a
+cada PRONTIDAO_INTERVALO_SEGUNDOS (em threads, sem bloquear o loop) e guarda
+o resultado de cada uma com horário e latência. `/ready` e `/zapi/status`
+respondem a partir desse resultado, sem chamadas de rede, então as sondas
+do balanceador não multiplicam o tráfego para a Z-API.
+
+Uma verificação mais antiga que 3 intervalos (tarefa travada ou parada) conta
+como falha.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Any, Callable, Optional, Tuple
+
+from app.config import get_settings
+from app.services.firebase_service import firebase_service
+from app.services.zapi_service import zapi_service
+
+logger = logging.getLogger(__name__)
+
+
+class Prontidao:
+    """Verificações periódicas das dependências e o último resultado de cada uma."""
+    
+    _instance = None
+    _initialized = False
+    
+    def __new__(cls):
+        """Singleton pattern."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+    
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        settings = get_settings()
+        self.intervalo = settings.prontidao_intervalo_segundos
+        self.timeout = settings.prontidao_timeout_segundos
+        # Cada verificação devolve um dict com "connected" (e "error" se falhou)
+        self._verificacoes: Dict[str, Callable[[], Dict[str, Any]]] = {
+            "firestore": firebase_service.verificar_conexao,
+            "zapi": zapi_service.get_status,
+        }
+        self._resultados: Dict[str, Dict[str, Any]] = {}
+        self._tarefa: Optional[asyncio.Task] = None
+    
+    def iniciar(self):
+        """Inicia a tarefa de verificação no event loop atual."""
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = asyncio.create_task(self._executar())
+    
+    async def parar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+    
+    async def _executar(self):
+        while True:
+            try:
+                await self.verificar()
+            except Exception as e:
+                logger.error(f"❌ Erro nas verificações de prontidão: {e}", exc_info=True)
+            await asyncio.sleep(self.intervalo)
+    
+    async def verificar(self):
+        """Executa todas as verificações em paralelo e atualiza os resultados."""
+        await asyncio.gather(*(self._verificar(nome, func) for nome, func in self._verificacoes.items()))
+    
+    async def _verificar(self, nome: str, func: Callable[[], Dict[str, Any]]):
+        inicio = time.perf_counter()
+        try:
+            detalhe = await asyncio.wait_for(asyncio.to_thread(func), self.timeout)
+        except asyncio.TimeoutError:
+            detalhe = {"connected": False, "error": f"sem resposta em {self.timeout:g} s"}
+        except Exception as e:
+            detalhe = {"connected": False, "error": str(e)}
+        latencia_ms = (time.perf_counter() - inicio) * 1000
+        
+        ok = bool(detalhe.get("connected"))
+        anterior = self._resultados.get(nome)
+        if anterior is None or anterior["ok"] != ok:
+            if ok:
+                logger.info(f"✅ {nome} disponível ({latencia_ms:.0f} ms)")
+            else:
+                logger.warning(f"⚠️ {nome} indisponível: {detalhe.get('error', detalhe)}")
+        
+        self._resultados[nome] = {
+            "ok": ok,
+            "verificado_em": datetime.utcnow().isoformat() + "Z",
+            "latencia_ms": round(latencia_ms, 1),
+            "detalhe": detalhe,
+            "_relogio": time.monotonic()
+        }
+    
+    def _resultado(self, nome: str, agora: float) -> Dict[str, Any]:
+        resultado = self._resultados.get(nome)
+        if resultado is None:
+            return {"ok": False, "erro": "ainda não verificado"}
+        publico = {k: v for k, v in resultado.items() if k != "_relogio"}
+        idade = agora - resultado["_relogio"]
+        if idade > 3 * self.intervalo:
+            publico["ok"] = False
+            publico["erro"] = f"verificação desatualizada ({idade:.0f} s)"
+        return publico
+    
+    def estado(self) -> Tuple[bool, Dict[str, Any]]:
+        """Prontidão agregada (todas as verificações ok e recentes) e o detalhe de cada uma."""
+        agora = time.monotonic()
+        verificacoes = {nome: self._resultado(nome, agora) for nome in self._verificacoes}
+        pronto = all(v["ok"] for v in verificacoes.values())
+        return pronto, {"status": "ready" if pronto else "not_ready", "verificacoes": verificacoes}
+    
+    def zapi_status(self) -> Dict[str, Any]:
+        """Último status da Z-API (mesmo formato do /status da Z-API), com horário e latência."""
+        resultado = self._resultados.get("zapi")
+        if resultado is None:
+            return {"connected": False, "error": "Status ainda não verificado"}
+        return {
+            **resultado["detalhe"],
+            "verificado_em": resultado["verificado_em"],
+            "latencia_ms": resultado["latencia_ms"]
+        }
+
+
+# Instância global da prontidão
+prontidao = Prontidao()
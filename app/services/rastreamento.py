@@ -0,0 +1,266 @@
+"""
+Rastreamento (tracing) das mensagens: spans do webhook até o Firestore e a Z-API.
+
+Um trace começa no webhook (`rastreador.trace`) e cada etapa abre um span
+filho com `span(nome)` ou `@rastreado(nome)`: processamento da mensagem,
+handler do (fluxo, etapa), métodos do FirebaseService e envio pela Z-API.
+O span atual fica num ContextVar, então a hierarquia segue as chamadas sem
+passar nada adiante.
+
+O ID do trace é derivado do messageId da Z-API (o mesmo messageId gera
+sempre o mesmo trace) e a amostragem (RASTREAMENTO_AMOSTRAGEM) é decidida
+por ele. Fora de um trace amostrado, `span()` devolve um objeto nulo e o
+custo é uma leitura do ContextVar.
+
+Ao terminar, o trace é gravado em RASTREAMENTO_ARQUIVO, uma linha JSON por
+trace no formato OTLP/JSON (ExportTraceServiceRequest), o mesmo do file
+exporter do OpenTelemetry Collector. Quando o arquivo passaria de
+RASTREAMENTO_ARQUIVO_MAX_MB, ele é renomeado para "<arquivo>.1" (o anterior
+é descartado) e um novo é iniciado: no disco ficam no máximo duas vezes o
+limite.
+"""
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional, Dict, Any, List, Callable
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+SERVICO = "whatsapp-ecommerce-chatbot"
+
+# Tipos de span do OTLP
+SPAN_INTERNO = 1
+SPAN_SERVIDOR = 2
+SPAN_CLIENTE = 3
+
+_STATUS_OK = 1
+_STATUS_ERRO = 2
+
+
+def _valor_otlp(valor: Any) -> Dict[str, Any]:
+    if isinstance(valor, bool):
+        return {"boolValue": valor}
+    if isinstance(valor, int):
+        return {"intValue": str(valor)}
+    if isinstance(valor, float):
+        return {"doubleValue": valor}
+    return {"stringValue": str(valor)}
+
+
+class Span:
+    """Trecho cronometrado de um trace; usado como context manager."""
+    
+    __slots__ = ("trace", "span_id", "pai_id", "nome", "tipo", "atributos",
+                 "inicio_ns", "fim_ns", "erro", "_token")
+    
+    def __init__(self, trace: "_Trace", nome: str, tipo: int, atributos: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.pai_id: Optional[str] = None
+        self.nome = nome
+        self.tipo = tipo
+        self.atributos = atributos
+        self.inicio_ns = 0
+        self.fim_ns = 0
+        self.erro: Optional[str] = None
+        self._token = None
+    
+    def definir(self, **atributos):
+        """Acrescenta atributos ao span (ex: resultado conhecido só no fim)."""
+        self.atributos.update(atributos)
+    
+    def __enter__(self) -> "Span":
+        pai = _span_atual.get()
+        self.pai_id = pai.span_id if pai is not None else None
+        self._token = _span_atual.set(self)
+        self.inicio_ns = time.time_ns()
+        return self
+    
+    def __exit__(self, tipo_excecao, excecao, tb):
+        self.fim_ns = time.time_ns()
+        if excecao is not None:
+            self.erro = f"{tipo_excecao.__name__}: {excecao}"
+        _span_atual.reset(self._token)
+        self.trace.spans.append(self)
+        return False
+    
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.nome,
+            "kind": self.tipo,
+            "startTimeUnixNano": str(self.inicio_ns),
+            "endTimeUnixNano": str(self.fim_ns),
+            "attributes": [{"key": k, "value": _valor_otlp(v)} for k, v in self.atributos.items()],
+            "status": {"code": _STATUS_ERRO, "message": self.erro} if self.erro else {"code": _STATUS_OK}
+        }
+        if self.pai_id:
+            span["parentSpanId"] = self.pai_id
+        return span
+
+
+class _SpanNulo:
+    """Span de mensagens não amostradas: não registra nada."""
+    
+    __slots__ = ()
+    
+    def definir(self, **atributos):
+        pass
+    
+    def __enter__(self) -> "_SpanNulo":
+        return self
+    
+    def __exit__(self, tipo_excecao, excecao, tb):
+        return False
+
+
+_SPAN_NULO = _SpanNulo()
+
+
+class _Trace:
+    __slots__ = ("trace_id", "spans")
+    
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.spans: List[Span] = []
+
+
+_trace_atual: ContextVar[Optional[_Trace]] = ContextVar("trace_atual", default=None)
+_span_atual: ContextVar[Optional[Span]] = ContextVar("span_atual", default=None)
+
+
+class _TraceRaiz:
+    """Context manager do span raiz: abre o trace e exporta ao sair."""
+    
+    def __init__(self, rastreador: "Rastreador", trace: _Trace, span: Span):
+        self._rastreador = rastreador
+        self._trace = trace
+        self._span = span
+        self._token = None
+    
+    def __enter__(self) -> Span:
+        self._token = _trace_atual.set(self._trace)
+        return self._span.__enter__()
+    
+    def __exit__(self, tipo_excecao, excecao, tb):
+        self._span.__exit__(tipo_excecao, excecao, tb)
+        _trace_atual.reset(self._token)
+        self._rastreador.exportar(self._trace)
+        return False
+
+
+class Rastreador:
+    """Amostragem e exportação dos traces."""
+    
+    _instance = None
+    _initialized = False
+    
+    def __new__(cls):
+        """Singleton pattern."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+    
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        settings = get_settings()
+        self.amostragem = settings.rastreamento_amostragem
+        self.arquivo = settings.rastreamento_arquivo
+        self.max_bytes = int(settings.rastreamento_arquivo_max_mb * 1024 * 1024)
+        # Tamanho atual do arquivo (lido do disco na primeira gravação)
+        self._tamanho: Optional[int] = None
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def trace_id(id_externo: Optional[str] = None) -> str:
+        """ID de trace (32 hex) derivado do ID externo, ou aleatório."""
+        if id_externo:
+            return hashlib.md5(id_externo.encode()).hexdigest()
+        return os.urandom(16).hex()
+    
+    def amostrado(self, trace_id: str) -> bool:
+        """Decide pela amostragem a partir do ID (o mesmo ID tem sempre a mesma decisão)."""
+        if self.amostragem <= 0:
+            return False
+        return int(trace_id[:8], 16) < self.amostragem * 0x100000000
+    
+    def trace(self, nome: str, id_externo: Optional[str] = None, tipo: int = SPAN_SERVIDOR, **atributos):
+        """
+        Abre um trace com o span raiz `nome` (ou um span filho, se já houver
+        um trace em andamento).
+        
+        Args:
+            id_externo: ID de origem da mensagem (messageId da Z-API)
+        """
+        if _trace_atual.get() is not None:
+            return span(nome, tipo, **atributos)
+        trace_id = self.trace_id(id_externo)
+        if not self.amostrado(trace_id):
+            return _SPAN_NULO
+        if id_externo:
+            atributos["message.id"] = id_externo
+        trace = _Trace(trace_id)
+        return _TraceRaiz(self, trace, Span(trace, nome, tipo, atributos))
+    
+    def exportar(self, trace: _Trace):
+        """Grava o trace no arquivo, uma linha OTLP/JSON."""
+        requisicao = {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": _valor_otlp(SERVICO)}]},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [s.to_otlp() for s in trace.spans]
+                }]
+            }]
+        }
+        linha = (json.dumps(requisicao, ensure_ascii=False) + "\n").encode("utf-8")
+        try:
+            with self._lock:
+                if self._tamanho is None:
+                    self._tamanho = os.path.getsize(self.arquivo) if os.path.exists(self.arquivo) else 0
+                if self.max_bytes and self._tamanho and self._tamanho + len(linha) > self.max_bytes:
+                    os.replace(self.arquivo, self.arquivo + ".1")
+                    self._tamanho = 0
+                with open(self.arquivo, "ab") as f:
+                    f.write(linha)
+                self._tamanho += len(linha)
+        except Exception as e:
+            # Tamanho relido na próxima gravação
+            self._tamanho = None
+            logger.error(f"Erro ao gravar trace {trace.trace_id}: {e}")
+
+
+def span(nome: str, tipo: int = SPAN_INTERNO, **atributos):
+    """Abre um span filho do atual (sem trace amostrado, não faz nada)."""
+    trace = _trace_atual.get()
+    if trace is None:
+        return _SPAN_NULO
+    return Span(trace, nome, tipo, atributos)
+
+
+def rastreado(nome: str, tipo: int = SPAN_INTERNO) -> Callable:
+    """Decorator que envolve cada chamada da função em um span."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            trace = _trace_atual.get()
+            if trace is None:
+                return func(*args, **kwargs)
+            with Span(trace, nome, tipo, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Instância global do rastreador
+rastreador = Rastreador()
@@ -0,0 +1,240 @@
+"""
+Reservas de estoque durante a montagem do orçamento.
+
+Quando o cliente informa a quantidade de um item, as unidades ficam
+reservadas para ele até a validade do orçamento (ORCAMENTO_VALIDADE_DIAS),
+e os outros clientes passam a ver disponível = estoque - reservado.
+
+- O total reservado por SKU fica num contador em memória e no campo
+  "reservado" do documento do SKU, alterado com incremento atômico. O
+  disponível sai do contador, sem varrer reservas.
+- A reserva é feita incrementando primeiro e conferindo o total depois:
+  se passou do estoque (outro cliente reservou ao mesmo tempo), desfaz.
+- A expiração usa um heap (expira_em, reserva) conferido a cada operação.
+- As reservas são gravadas na coleção "reservas" para sobreviver a
+  reinícios. Reservar de novo o mesmo SKU soma a quantidade à reserva
+  gravada (incremento atômico), inclusive a feita em outro worker. A remoção exige que o documento exista, então só um worker
+  devolve as unidades de cada reserva.
+- Cancelar ou voltar ao menu com itens no orçamento em andamento libera as
+  reservas dele, buscadas no Firestore (reservas do telefone sem número de
+  orçamento): o worker que recebe o comando pode não ser o que reservou.
+  Ao finalizar, as reservas dos SKUs do orçamento (tirados do estado da
+  conversa) ficam vinculadas a ele até expirar. Um worker que reservou e
+  não liberou continua contando a reserva no contador local até ela vencer.
+"""
+import heapq
+import logging
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Set, Tuple, Iterable
+
+from app.config import get_settings
+from app.services.firebase_service import firebase_service
+
+logger = logging.getLogger(__name__)
+
+SEGUNDOS_POR_DIA = 86400
+
+
+@dataclass
+class Reserva:
+    """Unidades de um SKU reservadas para um cliente."""
+    telefone: str
+    sku_id: str
+    quantidade: int
+    expira_em: float
+    numero_orcamento: Optional[str] = None
+    criada_em: str = ""
+
+
+class ReservaService:
+    """Reservas de estoque com expiração e contador por SKU."""
+    
+    _instance = None
+    _initialized = False
+    
+    def __new__(cls):
+        """Singleton pattern."""
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+    
+    def __init__(self):
+        if self._initialized:
+            return
+        self._initialized = True
+        self.settings = get_settings()
+        self._reservas: Dict[str, Reserva] = {}
+        self._reservado: Dict[str, int] = {}
+        self._por_telefone: Dict[str, Set[str]] = {}
+        self._expiracoes: List[Tuple[float, str]] = []
+    
+    @staticmethod
+    def _chave(telefone: str, sku_id: str) -> str:
+        return f"{telefone}_{sku_id}"
+    
+    def carregar(self):
+        """Carrega as reservas gravadas (início da aplicação) e libera as vencidas."""
+        for data in firebase_service.listar_reservas():
+            chave = data.pop("_id")
+            reserva = Reserva(**data)
+            self._registrar(chave, reserva)
+            if reserva.numero_orcamento is None:
+                self._por_telefone.setdefault(reserva.telefone, set()).add(chave)
+        self._expirar_vencidas()
+        if self._reservas:
+            logger.info(f"📦 {len(self._reservas)} reservas de estoque ativas carregadas")
+    
+    def _registrar(self, chave: str, reserva: Reserva):
+        self._reservas[chave] = reserva
+        self._reservado[reserva.sku_id] = self._reservado.get(reserva.sku_id, 0) + reserva.quantidade
+        heapq.heappush(self._expiracoes, (reserva.expira_em, chave))
+    
+    # ==================== CONSULTA ====================
+    
+    def disponivel(self, sku_id: str, estoque: int, reservado_documento: int = 0) -> int:
+        """
+        Unidades livres do SKU: estoque menos as reservas ativas.
+        
+        Usa o maior entre o contador local e o "reservado" do documento do
+        SKU, que inclui reservas feitas por outros workers (o documento pode
+        ter vindo do estado da conversa e estar defasado; a conferência em
+        reservar() é que garante o limite).
+        """
+        self._expirar_vencidas()
+        return estoque - max(self._reservado.get(sku_id, 0), reservado_documento)
+    
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            "reservas": len(self._reservas),
+            "skus": sum(1 for total in self._reservado.values() if total > 0),
+            "unidades": sum(self._reservado.values())
+        }
+    
+    # ==================== ALTERAÇÃO ====================
+    
+    def reservar(self, telefone: str, sku_id: str, quantidade: int, estoque: int) -> bool:
+        """
+        Reserva unidades do SKU para o cliente até a validade do orçamento.
+        
+        Args:
+            estoque: Estoque atual do SKU (0 = sem controle de estoque)
+        
+        Returns:
+            False se não há unidades livres suficientes
+        """
+        if not self.settings.reservar_estoque or estoque <= 0:
+            return True
+        self._expirar_vencidas()
+        
+        total = firebase_service.alterar_reservado_sku(sku_id, quantidade)
+        if total is None:
+            # Sem contador não há como reservar: não bloqueia o orçamento
+            return True
+        if total > estoque:
+            firebase_service.alterar_reservado_sku(sku_id, -quantidade)
+            return False
+        
+        chave = self._chave(telefone, sku_id)
+        expira_em = time.time() + self.settings.orcamento_validade_dias * SEGUNDOS_POR_DIA
+        reserva = Reserva(telefone, sku_id, quantidade, expira_em, criada_em=datetime.utcnow().isoformat())
+        # Mesmo SKU de novo no orçamento (em qualquer worker): soma à reserva
+        # gravada e renova a validade
+        total = firebase_service.somar_reserva(chave, asdict(reserva))
+        anterior = self._reservas.get(chave)
+        if anterior is not None:
+            self._reservado[sku_id] -= anterior.quantidade
+        if total is not None:
+            reserva.quantidade = total
+        elif anterior is not None:
+            reserva.quantidade += anterior.quantidade
+        self._registrar(chave, reserva)
+        self._por_telefone.setdefault(telefone, set()).add(chave)
+        
+        logger.info(f"📦 [{telefone}] Reservadas {quantidade} un. do SKU {sku_id} ({reserva.quantidade} no orçamento)")
+        return True
+    
+    def liberar_telefone(self, telefone: str, sku_ids: Iterable[str]):
+        """
+        Libera as reservas do orçamento em andamento do cliente, feitas por qualquer worker.
+        
+        Args:
+            sku_ids: SKUs dos itens do orçamento em andamento; sem itens não
+                há reserva a liberar e o Firestore não é consultado
+        """
+        if not self.settings.reservar_estoque or not any(sku_ids):
+            return
+        self._expirar_vencidas()
+        locais = self._por_telefone.pop(telefone, set())
+        gravadas = firebase_service.listar_reservas_em_andamento(telefone)
+        if gravadas is None:
+            # Firestore indisponível: libera ao menos as reservas deste worker
+            for chave in locais:
+                self._liberar(chave)
+            return
+        # Reservas locais fora da lista já foram liberadas ou vinculadas em outro worker
+        for data in gravadas:
+            chave = data.pop("_id")
+            self._liberar(chave, Reserva(**data))
+    
+    def liberar(self, telefone: str, sku_id: str):
+        """Libera a reserva de um SKU do orçamento em andamento do cliente."""
+        chave = self._chave(telefone, sku_id)
+        if chave in self._por_telefone.get(telefone, ()):
+            self._liberar(chave)
+            return
+        # Reserva feita por outro worker
+        for data in firebase_service.listar_reservas_em_andamento(telefone) or []:
+            if data.pop("_id") == chave:
+                self._liberar(chave, Reserva(**data))
+    
+    def vincular_orcamento(self, telefone: str, numero_orcamento: str, sku_ids: Iterable[str]):
+        """
+        Vincula as reservas do cliente ao orçamento finalizado (mantidas até expirar).
+        
+        Args:
+            sku_ids: SKUs dos itens do orçamento, que identificam também as
+                reservas feitas por outros workers
+        """
+        chaves = self._por_telefone.pop(telefone, set()) | {self._chave(telefone, s) for s in sku_ids}
+        for chave in chaves:
+            reserva = self._reservas.get(chave)
+            if reserva is not None:
+                reserva.numero_orcamento = numero_orcamento
+            firebase_service.vincular_reserva(chave, numero_orcamento)
+    
+    def _liberar(self, chave: str, gravada: Optional[Reserva] = None):
+        """
+        Libera a reserva: desconta do contador local e, se esta chamada
+        removeu o documento, devolve as unidades ao SKU.
+        
+        Args:
+            gravada: Reserva como está no Firestore (a quantidade devolvida
+                ao SKU); padrão: a reserva em memória
+        """
+        reserva = self._reservas.pop(chave, None)
+        if reserva is not None:
+            self._reservado[reserva.sku_id] -= reserva.quantidade
+            telefone = self._por_telefone.get(reserva.telefone)
+            if telefone is not None:
+                telefone.discard(chave)
+        gravada = gravada or reserva
+        if gravada is None:
+            return
+        if firebase_service.remover_reserva(chave):
+            firebase_service.alterar_reservado_sku(gravada.sku_id, -gravada.quantidade)
+            logger.info(f"📦 [{gravada.telefone}] Liberadas {gravada.quantidade} un. do SKU {gravada.sku_id}")
+    
+    def _expirar_vencidas(self):
+        agora = time.time()
+        while self._expiracoes and self._expiracoes[0][0] <= agora:
+            expira_em, chave = heapq.heappop(self._expiracoes)
+            reserva = self._reservas.get(chave)
+            # Entradas de reservas já liberadas ou renovadas são ignoradas
+            if reserva is not None and reserva.expira_em == expira_em:
+                self._liberar(chave)
+
+
+# Instância global do serviço
+reserva_service = ReservaService()
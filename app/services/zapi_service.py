@@ -3,10 +3,15 @@ Serviço de integração com Z-API para WhatsApp.
 Z-API usa WhatsApp Web para envio de mensagens.
 """
 import logging
-from typing import Optional
+import time
+from typing import Optional, List
 import httpx
 
 from app.config import get_settings
+from app.services.disjuntor import disjuntor_zapi
+from app.services.entregas import entregas
+from app.services.metricas import metricas
+from app.services.rastreamento import rastreado, SPAN_CLIENTE
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +22,7 @@ class ZAPIService:
     _instance = None
     _base_url = None
     _client_token = None
+    _client = None
     
     def __new__(cls):
         """Singleton pattern."""
@@ -34,14 +40,30 @@ class ZAPIService:
         settings = get_settings()
         try:
             if settings.zapi_instance_id and settings.zapi_token:
-                self._base_url = f"https://api.z-api.io/instances/{settings.zapi_instance_id}/token/{settings.zapi_token}"
+                self._base_url = (
+                    f"{settings.zapi_base_url.rstrip('/')}/instances/{settings.zapi_instance_id}"
+                    f"/token/{settings.zapi_token}"
+                )
                 self._client_token = settings.zapi_client_token
+                # Cliente único: conexões (TCP + TLS) reaproveitadas entre envios
+                self._client = httpx.Client(
+                    timeout=30.0,
+                    limits=httpx.Limits(
+                        max_connections=settings.zapi_max_conexoes,
+                        max_keepalive_connections=settings.zapi_max_conexoes
+                    )
+                )
                 logger.info("Z-API configurado com sucesso")
             else:
                 logger.warning("Credenciais Z-API não configuradas")
         except Exception as e:
             logger.error(f"Erro ao configurar Z-API: {e}")
     
+    @property
+    def configurado(self) -> bool:
+        """Indica se as credenciais da Z-API foram configuradas."""
+        return self._base_url is not None
+    
     def _normalize_phone(self, phone: str) -> str:
         """
         Normaliza número de telefone para formato Z-API.
@@ -70,6 +92,7 @@ class ZAPIService:
         
         return phone
     
+    @rastreado("zapi.send_message", SPAN_CLIENTE)
     def send_message(self, to: str, body: str) -> Optional[str]:
         """
         Envia mensagem WhatsApp via Z-API.
@@ -83,8 +106,16 @@ class ZAPIService:
         """
         if self._base_url is None:
             logger.error("Z-API não configurado")
+            metricas.zapi_envios.inc("nao_configurado")
             return None
         
+        # Z-API fora do ar: falha na hora em vez de esperar o timeout
+        if not disjuntor_zapi.permitir():
+            metricas.zapi_envios.inc("circuito_aberto")
+            return None
+        
+        inicio = time.perf_counter()
+        status = "erro"
         try:
             phone = self._normalize_phone(to)
             
@@ -101,28 +132,65 @@ class ZAPIService:
                 "message": body
             }
             
-            with httpx.Client(timeout=30.0) as client:
-                response = client.post(
-                    f"{self._base_url}/send-text",
-                    headers=headers,
-                    json=payload
-                )
+            response = self._client.post(
+                f"{self._base_url}/send-text",
+                headers=headers,
+                json=payload
+            )
+            status = str(response.status_code)
             
             if response.status_code == 200:
                 data = response.json()
                 message_id = data.get("messageId", data.get("id"))
                 logger.info(f"Mensagem enviada para {phone}: ID={message_id}")
+                metricas.mensagens_enviadas.inc()
+                if message_id:
+                    # Casado depois com os callbacks de entrega/leitura
+                    entregas.registrar_envio(message_id)
                 return message_id
             else:
                 logger.error(f"Erro Z-API: {response.status_code} - {response.text}")
                 return None
                 
         except httpx.TimeoutException:
+            status = "timeout"
             logger.error(f"Timeout ao enviar mensagem para {to}")
             return None
         except Exception as e:
             logger.error(f"Erro ao enviar mensagem: {e}")
             return None
+        finally:
+            metricas.zapi_duracao.observar(time.perf_counter() - inicio)
+            metricas.zapi_envios.inc(status)
+            # Só erros do servidor, timeouts e falhas de conexão contam contra a
+            # Z-API; 4xx é problema da requisição (ex: número inválido)
+            disjuntor_zapi.registrar(status.isdigit() and int(status) < 500)
+    
+    @rastreado("zapi.send_messages", SPAN_CLIENTE)
+    def send_messages(self, to: str, partes: List[str]) -> List[str]:
+        """
+        Envia as partes de uma resposta, em ordem.
+        
+        Cada parte só é enviada depois que a Z-API aceitou a anterior: a
+        Z-API entrega na ordem em que recebe, e envios simultâneos podem
+        chegar fora de ordem. A conexão é reaproveitada entre as partes.
+        Para no primeiro erro (as partes seguintes ficariam sem contexto).
+        
+        Returns:
+            messageIds das partes enviadas (menos que len(partes) se houve erro)
+        """
+        message_ids = []
+        for parte in partes:
+            message_id = self.send_message(to, parte)
+            if not message_id:
+                break
+            message_ids.append(message_id)
+        return message_ids
+    
+    def fechar(self):
+        """Fecha as conexões do cliente HTTP (encerramento da aplicação)."""
+        if self._client is not None:
+            self._client.close()
     
     def get_status(self) -> dict:
         """
@@ -139,11 +207,11 @@ class ZAPIService:
             if self._client_token:
                 headers["Client-Token"] = self._client_token
             
-            with httpx.Client(timeout=10.0) as client:
-                response = client.get(
-                    f"{self._base_url}/status",
-                    headers=headers
-                )
+            response = self._client.get(
+                f"{self._base_url}/status",
+                headers=headers,
+                timeout=10.0
+            )
             
             if response.status_code == 200:
                 return response.json()
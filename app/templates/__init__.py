@@ -0,0 +1 @@
+# Templates module
@@ -0,0 +1,250 @@
+"""
+Textos das mensagens em português (Brasil).
+
+Outros locales (app/templates/<locale>.py) só precisam definir as chaves
+que mudam; as demais vêm deste arquivo.
+"""
+
+TEMPLATES = {
+    "_formato": {
+        "simbolo_moeda": "R$",
+        "milhar": ".",
+        "decimal": ",",
+        "data": "%d/%m/%Y",
+    },
+    
+    # ==================== GERAL ====================
+    
+    "opcao_lista": "{n:emoji} {texto}\n",
+    
+    # ==================== INÍCIO E MENU ====================
+    
+    "boas_vindas": (
+        "👋 Olá! Seja bem-vindo(a) à {empresa}. "
+        "Sou o assistente virtual e estou aqui para te ajudar 😊\n\n"
+        "Para começar, qual é o seu nome?"
+    ),
+    "nome_invalido": (
+        "Por favor, me informe seu nome corretamente. 😊\n\n"
+        "Qual é o seu nome?"
+    ),
+    "nome_registrado": "Prazer em te conhecer, {nome}! 😄\n\n{menu}",
+    "menu_opcoes": (
+        "Escolha uma das opções abaixo 👇\n\n"
+        "1️⃣ Orçamento\n"
+        "2️⃣ Compras\n"
+        "3️⃣ Pós-venda\n"
+        "4️⃣ Falar com atendente"
+    ),
+    "menu_principal": "Como posso te ajudar?\n\n{menu}",
+    "menu_principal_com_nome": "Olá, {nome}! Como posso te ajudar?\n\n{menu}",
+    "menu_opcao_invalida": "Opção inválida. Por favor, escolha uma das opções abaixo:\n\n{menu}",
+    "operacao_cancelada": "Orçamento cancelado. ❌\n\n{menu}",
+    "encaminhado_atendente": (
+        "Sem problemas 😊\n"
+        "Vou te encaminhar agora para um atendente humano.\n\n"
+        "⏳ Aguarde um momento, por favor.\n\n"
+        "_Digite *menu* a qualquer momento para voltar ao início._"
+    ),
+    "aguardando_atendente": (
+        "Você já foi encaminhado para um atendente. ⏳\n"
+        "Por favor, aguarde que em breve você será atendido.\n\n"
+        "_Digite *menu* para voltar ao menu principal._"
+    ),
+    
+    # ==================== CONFIRMAÇÃO DE NOME ====================
+    
+    "confirmar_nome": (
+        "Você é *{nome}*, certo? 😊\n\n"
+        "1️⃣ Sim, sou eu\n"
+        "2️⃣ Não, quero informar outro nome"
+    ),
+    "confirmar_nome_opcao_invalida": (
+        "Por favor, escolha uma opção:\n\n"
+        "1️⃣ Sim, sou {nome}\n"
+        "2️⃣ Não, quero informar outro nome"
+    ),
+    "informar_outro_nome": "Ok! Qual é o seu nome?",
+    "nome_invalido_curto": "Por favor, informe um nome válido.",
+    
+    # ==================== COMPRAS ====================
+    
+    "compras_pedir_nome": "Para prosseguir com sua compra, preciso do seu nome.\n\nQual é o seu nome?",
+    "compras_encaminhado": (
+        "Perfeito, {nome}! 😄\n\n"
+        "Vou te encaminhar agora para um de nossos atendentes "
+        "para finalizar sua compra 🛒\n\n"
+        "⏳ Aguarde um momento, por favor.\n\n"
+        "_Digite *menu* a qualquer momento para voltar ao início._"
+    ),
+    
+    # ==================== PÓS-VENDA ====================
+    
+    "posvenda_pedir_nome": "Para prosseguir com seu atendimento, preciso do seu nome.\n\nQual é o seu nome?",
+    "posvenda_pedir_numero": (
+        "Certo, {nome}! 😊\n\n"
+        "Por favor, me informe o *número do seu pedido* para que eu possa localizar:\n\n"
+        "_Exemplo: 12345 ou PED-2026-00001_"
+    ),
+    "posvenda_numero_invalido": (
+        "Por favor, informe um número de pedido válido.\n\n"
+        "_Exemplo: 12345 ou PED-2026-00001_"
+    ),
+    "posvenda_encaminhado": (
+        "Perfeito! Já localizei sua solicitação ✅\n\n"
+        "📦 *Pedido:* {numero_pedido}\n"
+        "👤 *Cliente:* {nome}\n\n"
+        "Vou te encaminhar para um atendente que vai te ajudar "
+        "com isso agora mesmo 😊\n\n"
+        "⏳ Aguarde um momento, por favor.\n\n"
+        "_Digite *menu* a qualquer momento para voltar ao início._"
+    ),
+    
+    # ==================== ORÇAMENTO: CATEGORIAS E PRODUTOS ====================
+    
+    "sem_categorias": (
+        "Ops! Não encontrei categorias disponíveis no momento. 😕\n\n"
+        "Por favor, tente novamente mais tarde ou fale com um atendente.\n\n"
+        "Digite *menu* para voltar ao menu principal."
+    ),
+    "categorias_titulo": "📦 *Categorias disponíveis:*\n\n",
+    "categorias_rodape": (
+        "\n👉 Digite o *número* da categoria desejada:\n"
+        "_Ou digite o nome do produto para buscar (ex: camiseta preta M)._"
+    ),
+    "categoria_invalida": "Opção inválida. Por favor, escolha um número da lista.\n\n{categorias}",
+    "categoria_sem_produtos": (
+        "Não encontrei produtos na categoria *{categoria}*. 😕\n\n"
+        "Vamos escolher outra categoria?\n\n"
+        "{categorias}"
+    ),
+    "categoria_sem_disponiveis": (
+        "Não encontrei produtos disponíveis na categoria *{categoria}*. 😕\n\n"
+        "{categorias}"
+    ),
+    "produtos_titulo": "🛍️ *Produtos em {categoria}:*\n\n",
+    "produto_item": "{n:emoji} *{nome}*\n   💰 {preco}\n\n",
+    "faixa_preco": "{minimo:moeda} - {maximo:moeda}",
+    "produtos_rodape": (
+        "👉 Digite o *número* do produto desejado:\n"
+        "_Ou digite *voltar* para ver outras categorias._"
+    ),
+    "produto_invalido": "Opção inválida. Por favor, escolha um número da lista de produtos.",
+    "busca_titulo": "🔎 *Resultados para \"{consulta}\":*\n\n",
+    "busca_item": "{n:emoji} *{nome}*{atributos}\n   💰 {preco:moeda}\n\n",
+    "busca_rodape": "👉 Digite o *número* da opção desejada:",
+    "busca_sem_resultados": "Não encontrei produtos para *{consulta}*. 😕\n\n{categorias}",
+    "paginacao_mais": "➡️ Digite *mais* para ver a próxima página\n",
+    "paginacao_anterior": "⬅️ Digite *anterior* para voltar à página anterior\n",
+    "paginacao_ultima": "Essa já é a última página. 😉\n\n",
+    "paginacao_primeira": "Essa já é a primeira página. 😉\n\n",
+    "produto_sku_unico": (
+        "✅ *{nome}*\n"
+        "💰 Preço: {preco:moeda}\n\n"
+        "Quantas unidades você deseja?"
+    ),
+    
+    # ==================== ORÇAMENTO: VARIAÇÕES ====================
+    
+    "variacoes_titulo": "🔍 *{nome}*\n\nEscolha a variação desejada:\n\n",
+    "variacao_item_estoque": "{n:emoji} {atributos}\n   💰 {preco:moeda} | 📦 {estoque:qtd} em estoque\n\n",
+    "variacao_item_sob_consulta": "{n:emoji} {atributos}\n   💰 {preco:moeda} | ⚠️ Sob consulta\n\n",
+    "variacoes_rodape": "👉 Digite o *número* da opção desejada:",
+    "variacao_atributo_titulo": "🔍 *{nome}*{selecao}\n\nEscolha *{atributo}*:\n\n",
+    "variacao_valor_estoque": "{n:emoji} *{valor}*\n   💰 {preco} | 📦 {estoque:qtd} em estoque\n\n",
+    "variacao_valor_sob_consulta": "{n:emoji} *{valor}*\n   💰 {preco} | ⚠️ Sob consulta\n\n",
+    "opcoes_sku_titulo": "🔍 *{nome}*\n\nOpções disponíveis:\n\n",
+    "opcao_sku_item": "{n:emoji} {codigo} - {preco:moeda}\n",
+    "opcoes_sku_rodape": "\n👉 Digite o *número* da opção desejada:",
+    "opcao_invalida_lista": "Opção inválida. Por favor, escolha um número da lista.",
+    "sku_selecionado": (
+        "✅ Selecionado: *{codigo}*{atributos}\n"
+        "💰 Preço unitário: {preco:moeda}\n\n"
+        "Quantas unidades você deseja?"
+    ),
+    
+    # ==================== ORÇAMENTO: QUANTIDADE E RESUMO ====================
+    
+    "quantidade_invalida": "Por favor, informe uma quantidade válida (número inteiro maior que zero).",
+    "produto_nao_encontrado": "Ops! Não encontrei o produto. Vamos tentar novamente?\n\n{categorias}",
+    "quantidade_indisponivel": (
+        "⚠️ Quantidade indisponível.\n"
+        "Temos apenas *{estoque:qtd}* unidades em estoque.\n\n"
+        "Qual quantidade você deseja?"
+    ),
+    "resumo_titulo": (
+        "✅ *Item adicionado ao orçamento!*\n\n"
+        "📋 *Resumo do seu orçamento:*\n"
+        "────────────────────\n\n"
+    ),
+    "resumo_item": "• {descricao}\n  {quantidade:qtd}x {preco:moeda} = *{total:moeda}*\n\n",
+    "resumo_rodape": (
+        "────────────────────\n"
+        "💰 *Subtotal: {subtotal:moeda}*\n\n"
+        "O que deseja fazer agora?\n\n"
+        "1️⃣ Adicionar mais produtos\n"
+        "2️⃣ Finalizar orçamento\n"
+        "3️⃣ Falar com atendente"
+    ),
+    "continuar_opcao_invalida": (
+        "Opção inválida. Por favor, escolha:\n\n"
+        "1️⃣ Adicionar mais produtos\n"
+        "2️⃣ Finalizar orçamento\n"
+        "3️⃣ Falar com atendente"
+    ),
+    
+    # ==================== ORÇAMENTO: FINALIZAÇÃO ====================
+    
+    "orcamento_vazio": (
+        "Seu orçamento está vazio! 😅\n\n"
+        "Vamos adicionar alguns produtos?\n\n"
+        "{categorias}"
+    ),
+    "orcamento_erro_salvar": (
+        "Ops! Ocorreu um erro ao salvar seu orçamento. 😕\n"
+        "Por favor, tente novamente ou fale com um atendente.\n\n"
+        "1️⃣ Tentar novamente\n"
+        "2️⃣ Falar com atendente"
+    ),
+    "pedido_rapido_avisos": "⚠️ *Alguns itens não foram adicionados:*\n\n",
+    "pedido_rapido_nao_encontrado": "• *{codigo}*: código não encontrado\n",
+    "pedido_rapido_sem_estoque": "• *{codigo}*: temos apenas {estoque:qtd} disponíveis (pedido: {quantidade:qtd})\n",
+    "pedido_rapido_nenhum": (
+        "Não consegui adicionar nenhum item. 😕\n\n"
+        "Confira os códigos e envie de novo (ex: *2x CAM-PRE-M, 1 MOU-PRE-01*) "
+        "ou digite *menu* para voltar ao início."
+    ),
+    "revalidacao_titulo": "⚠️ *Alguns itens mudaram desde que foram adicionados:*\n\n",
+    "revalidacao_preco": "• {descricao}: preço atualizado de {anterior:moeda} para {atual:moeda}\n",
+    "revalidacao_estoque": "• {descricao}: temos apenas {estoque:qtd} em estoque (pedido: {quantidade:qtd})\n",
+    "revalidacao_esgotado": "• {descricao}: esgotado no momento (pedido: {quantidade:qtd})\n",
+    "revalidacao_indisponivel": "• {descricao}: não está mais disponível e saiu do orçamento\n",
+    "revalidacao_erro": (
+        "Ops! Não consegui conferir os preços e o estoque agora. 😕\n"
+        "Seus itens continuam no orçamento.\n\n"
+        "2️⃣ Tentar finalizar de novo\n"
+        "3️⃣ Falar com atendente"
+    ),
+    "orcamento_gerado": (
+        "🎉 *Orçamento gerado com sucesso!*\n\n"
+        "📄 *Número:* {numero}\n"
+        "💰 *Valor Total:* {total:moeda}\n"
+        "📅 *Válido até:* {validade:data}\n\n"
+        "────────────────────\n\n"
+        "Agora vou te encaminhar para um de nossos atendentes finalizar seu pedido! 😊\n\n"
+        "⏳ Aguarde um momento, por favor."
+    ),
+    "orcamento_encaminhado": (
+        "Perfeito! 😊\n\n"
+        "Vou te encaminhar agora para um atendente humano.\n\n"
+        "⏳ Aguarde um momento, por favor.\n\n"
+        "_Digite *menu* a qualquer momento para voltar ao início._"
+    ),
+    "orcamento_encaminhado_parcial": (
+        "Perfeito! 😊\n\n"
+        "Seu orçamento parcial ({subtotal:moeda}) foi salvo.\n\n"
+        "Vou te encaminhar agora para um atendente humano.\n\n"
+        "⏳ Aguarde um momento, por favor.\n\n"
+        "_Digite *menu* a qualquer momento para voltar ao início._"
+    ),
+}
@@ -0,0 +1,152 @@
+"""
+Templates de mensagens pré-compilados, com suporte a locale.
+
+Os textos ficam em módulos de locale (app/templates/<locale>.py, dicionário
+TEMPLATES) e podem ser sobrescritos por empresa com um arquivo JSON
+(TEMPLATES_OVERRIDE_PATH). Cada template é compilado uma vez no
+carregamento: textos sem campos viram strings prontas e os demais uma
+sequência de (literal, campo, formatador), renderizada com um único join.
+
+Campos usam a sintaxe do str.format, com formatadores adicionais:
+    {preco:moeda}     R$ 1.234,56 (conforme o locale)
+    {estoque:qtd}     1.234
+    {validade:data}   31/01/2026 (a partir de data ISO)
+    {n:emoji}         1️⃣ (números maiores viram um keycap por dígito: 1️⃣2️⃣)
+"""
+import importlib
+import json
+import logging
+from datetime import date
+from string import Formatter
+from typing import Dict, Any, Callable, List, Tuple, Union
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+LOCALE_PADRAO = "pt_BR"
+
+_Parte = Tuple[str, str, Callable[[Any], str]]
+_Compilado = Union[str, Tuple[_Parte, ...]]
+
+
+class Templates:
+    """Conjunto de templates compilados de um locale."""
+    
+    def __init__(self, locale: str = LOCALE_PADRAO, override_path: str = ""):
+        self.locale = locale
+        
+        textos = dict(self._carregar_locale(LOCALE_PADRAO))
+        if locale != LOCALE_PADRAO:
+            textos.update(self._carregar_locale(locale))
+        if override_path:
+            textos.update(self._carregar_override(override_path))
+        
+        formato = textos.pop("_formato")
+        self._simbolo_moeda = formato["simbolo_moeda"]
+        # f"{v:,.2f}" usa "," para milhar e "." para decimal: troca conforme o locale
+        self._tabela_numero = str.maketrans({",": formato["milhar"], ".": formato["decimal"]})
+        self._formato_data = formato["data"]
+        
+        self._compilados: Dict[str, _Compilado] = {
+            chave: self._compilar(texto) for chave, texto in textos.items()
+        }
+    
+    @staticmethod
+    def _carregar_locale(locale: str) -> Dict[str, Any]:
+        return importlib.import_module(f"app.templates.{locale}").TEMPLATES
+    
+    @staticmethod
+    def _carregar_override(path: str) -> Dict[str, Any]:
+        """Textos específicos da empresa (JSON chave -> template)."""
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Erro ao carregar templates de {path}: {e}")
+            return {}
+    
+    # ==================== COMPILAÇÃO ====================
+    
+    def _formatador(self, spec: str) -> Callable[[Any], str]:
+        if not spec:
+            return str
+        if spec == "moeda":
+            return self.moeda
+        if spec == "qtd":
+            return self.quantidade
+        if spec == "data":
+            return self.data
+        if spec == "emoji":
+            return self.emoji_numero
+        return lambda valor: format(valor, spec)
+    
+    def _compilar(self, texto: str) -> _Compilado:
+        partes: List[_Parte] = []
+        for literal, campo, spec, _conversao in Formatter().parse(texto):
+            partes.append((literal, campo, self._formatador(spec) if campo is not None else None))
+        if len(partes) == 1 and partes[0][1] is None:
+            return partes[0][0]
+        return tuple(partes)
+    
+    # ==================== RENDERIZAÇÃO ====================
+    
+    def render(self, chave: str, **valores: Any) -> str:
+        """Renderiza o template `chave` com os valores informados."""
+        compilado = self._compilados[chave]
+        if compilado.__class__ is str:
+            return compilado
+        pedacos = []
+        for literal, campo, formatador in compilado:
+            pedacos.append(literal)
+            if campo is not None:
+                pedacos.append(formatador(valores[campo]))
+        return "".join(pedacos)
+    
+    def renderizador(self, texto: str) -> Callable[..., str]:
+        """Compila um texto avulso (ex: mensagem de campanha) e devolve a função que o renderiza."""
+        compilado = self._compilar(texto)
+        if compilado.__class__ is str:
+            return lambda **valores: compilado
+        
+        def renderizar(**valores: Any) -> str:
+            pedacos = []
+            for literal, campo, formatador in compilado:
+                pedacos.append(literal)
+                if campo is not None:
+                    pedacos.append(formatador(valores[campo]))
+            return "".join(pedacos)
+        return renderizar
+    
+    def moeda(self, valor: float) -> str:
+        """Valor monetário no formato do locale (ex: R$ 1.234,56)."""
+        return f"{self._simbolo_moeda} {valor:,.2f}".translate(self._tabela_numero)
+    
+    def quantidade(self, valor: int) -> str:
+        """Quantidade inteira com separador de milhar do locale."""
+        return f"{valor:,}".translate(self._tabela_numero)
+    
+    @staticmethod
+    def emoji_numero(valor: int) -> str:
+        """Número como emoji keycap, um por dígito (10 -> 1️⃣0️⃣)."""
+        return "".join(digito + "\ufe0f\u20e3" for digito in str(valor))
+    
+    def data(self, valor: Union[str, date]) -> str:
+        """Data (ISO ou date) no formato do locale."""
+        if isinstance(valor, str):
+            valor = date.fromisoformat(valor[:10])
+        return valor.strftime(self._formato_data)
+
+
+def _criar_templates() -> Templates:
+    settings = get_settings()
+    return Templates(settings.locale, settings.templates_override_path)
+
+
+# Instância global
+templates = _criar_templates()
+
+
+def t(chave: str, **valores: Any) -> str:
+    """Atalho para templates.render."""
+    return templates.render(chave, **valores)
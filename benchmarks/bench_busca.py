@@ -0,0 +1,125 @@
+"""
+Benchmark da busca por texto livre (app.services.busca_service).
+
+Gera um catálogo sintético com nomes de produtos combinando tipo, modelo,
+material e marca, mais cor e tamanho nos SKUs, e mede:
+  - construção do índice completo;
+  - sincronização incremental após alterar 1% dos produtos;
+  - latência das buscas (exatas, com erro de digitação, por prefixo e
+    com vários termos), em p50/p99.
+
+Uso:
+    python -m benchmarks.bench_busca [--tamanhos 10000,100000] [--buscas 2000]
+"""
+import argparse
+import random
+import statistics
+import time
+from typing import Any, Dict, List, Tuple
+
+from app.models.catalogo import Catalogo
+from app.services.busca_service import IndiceBusca
+
+TIPOS = ["Camiseta", "Calça", "Bermuda", "Jaqueta", "Tênis", "Sandália", "Mochila", "Boné", "Meia", "Vestido"]
+MODELOS = ["Básica", "Slim", "Oversize", "Esportiva", "Casual", "Social", "Térmica", "Infantil"]
+MATERIAIS = ["Algodão", "Poliéster", "Couro", "Jeans", "Linho", "Malha"]
+MARCAS = ["Aurora", "Brisa", "Cometa", "Duna", "Estrela", "Farol", "Galáxia", "Horizonte"]
+CORES = ["Preto", "Branco", "Azul", "Vermelho", "Verde"]
+TAMANHOS = ["P", "M", "G", "GG", "XG", "36", "38", "40", "42", "44"]
+SKUS_POR_PRODUTO = 10
+
+BUSCAS = [
+    "camiseta preta m",
+    "calca jeans azul 40",
+    "camizeta basica",
+    "tenis esportivo",
+    "jaq",
+    "mochila couro aurora",
+    "vestido linho verde gg",
+    "bone",
+]
+
+
+def gerar_documentos(n_skus: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Gera documentos de produtos e SKUs no formato do Firestore."""
+    rnd = random.Random(42)
+    produtos = []
+    skus = []
+    for i in range(n_skus // SKUS_POR_PRODUTO):
+        produto_id = f"prod_{i:07d}"
+        tipo = rnd.choice(TIPOS)
+        nome = f"{tipo} {rnd.choice(MODELOS)} {rnd.choice(MARCAS)} {i % 1000}"
+        produtos.append({
+            "_id": produto_id,
+            "nome": nome,
+            "descricao": f"{tipo} de {rnd.choice(MATERIAIS)}",
+            "categoria": "Roupas",
+            "ativo": True,
+            "atributos": ["Cor", "Tamanho"]
+        })
+        for j in range(SKUS_POR_PRODUTO):
+            cor = CORES[(i + j) % len(CORES)]
+            tamanho = TAMANHOS[j % len(TAMANHOS)]
+            skus.append({
+                "_id": f"sku_{i:07d}_{j}",
+                "produto_id": produto_id,
+                "sku": f"P{i}-{cor[:3].upper()}-{tamanho}",
+                "preco": 10.0 + (i % 500),
+                "estoque": (i * j) % 50,
+                "ativo": True,
+                "atributos": {"Cor": cor, "Tamanho": tamanho}
+            })
+    return produtos, skus
+
+
+def percentil(valores: List[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def medir(n_skus: int, n_buscas: int):
+    produtos, skus = gerar_documentos(n_skus)
+    catalogo = Catalogo.from_dicts(produtos, skus)
+
+    indice = IndiceBusca()
+    inicio = time.perf_counter()
+    indice.sincronizar(catalogo)
+    construcao = time.perf_counter() - inicio
+
+    # Renomeia 1% dos produtos e sincroniza de novo
+    for p in produtos[::100]:
+        p["nome"] += " Edição Limitada"
+    catalogo = Catalogo.from_dicts(produtos, skus)
+    inicio = time.perf_counter()
+    alterados = indice.sincronizar(catalogo)
+    incremental = time.perf_counter() - inicio
+
+    print(f"\n{n_skus} SKUs: índice em {construcao:.2f} s, "
+          f"incremental ({alterados} produtos) em {incremental * 1000:.0f} ms")
+    print(f"  {'busca':<26} {'resultados':>10} {'p50 (µs)':>9} {'p99 (µs)':>9}")
+    for consulta in BUSCAS:
+        # Primeira chamada preenche o cache de expansões, como em produção
+        resultados = indice.buscar(consulta)
+        tempos = []
+        for _ in range(n_buscas):
+            inicio = time.perf_counter()
+            indice.buscar(consulta)
+            tempos.append((time.perf_counter() - inicio) * 1e6)
+        print(
+            f"  {consulta:<26} {len(resultados):>10} "
+            f"{statistics.median(tempos):>9.0f} {percentil(tempos, 0.99):>9.0f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", default="10000,100000", help="quantidades de SKUs, separadas por vírgula")
+    parser.add_argument("--buscas", type=int, default=2000, help="repetições de cada busca")
+    args = parser.parse_args()
+
+    for n in (int(t) for t in args.tamanhos.split(",")):
+        medir(n, args.buscas)
+
+
+if __name__ == "__main__":
+    main()
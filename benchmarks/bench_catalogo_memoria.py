@@ -0,0 +1,103 @@
+"""
+Benchmark de memória: catálogo como dicionários vs. Catalogo compacto.
+
+Gera um catálogo sintético (10 SKUs por produto, combinações de cor e
+tamanho) e mede com tracemalloc a memória retida em cada representação.
+Os dicionários simulam documentos vindos do Firestore: cada documento tem
+suas próprias cópias das strings, como acontece na desserialização. O tempo
+de carga é medido sob tracemalloc e por isso fica acima do real.
+
+Uso:
+    python -m benchmarks.bench_catalogo_memoria [--tamanhos 10000,100000,1000000]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import Any, Dict, List, Tuple
+
+from app.models.catalogo import Catalogo
+
+CORES = ["Preto", "Branco", "Azul", "Vermelho", "Verde"]
+TAMANHOS = ["P", "M", "G", "GG", "XG", "36", "38", "40", "42", "44"]
+CATEGORIAS = ["Roupas", "Calçados", "Informática", "Eletrônicos", "Acessórios"]
+SKUS_POR_PRODUTO = 10
+
+
+def _copia(s: str) -> str:
+    """Nova instância da string (como o cliente Firestore produz)."""
+    return s.encode("utf-8").decode("utf-8")
+
+
+def gerar_documentos(n_skus: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Gera documentos de produtos e SKUs no formato do Firestore."""
+    produtos = []
+    skus = []
+    for i in range(n_skus // SKUS_POR_PRODUTO):
+        produto_id = f"prod_{i:07d}"
+        produtos.append({
+            "_id": produto_id,
+            "nome": f"Produto {i}",
+            "descricao": f"Descrição do produto {i}",
+            "categoria": _copia(CATEGORIAS[i % len(CATEGORIAS)]),
+            "ativo": True,
+            "atributos": [_copia("Cor"), _copia("Tamanho")]
+        })
+        for j in range(SKUS_POR_PRODUTO):
+            cor = CORES[(i + j) % len(CORES)]
+            tamanho = TAMANHOS[j % len(TAMANHOS)]
+            skus.append({
+                "_id": f"sku_{i:07d}_{j}",
+                "produto_id": _copia(produto_id),
+                "sku": f"P{i}-{cor[:3].upper()}-{tamanho}",
+                "preco": 10.0 + (i % 500),
+                "estoque": (i * j) % 50,
+                "ativo": True,
+                "atributos": {_copia("Cor"): _copia(cor), _copia("Tamanho"): _copia(tamanho)}
+            })
+    return produtos, skus
+
+
+def medir(n_skus: int) -> Tuple[int, int, float]:
+    """
+    Retorna (bytes dos dicionários, bytes do Catalogo, segundos de carga).
+    
+    A memória do Catalogo é medida após descartar os dicionários, para
+    contabilizar as strings que ele passou a ser o único a referenciar.
+    """
+    gc.collect()
+    tracemalloc.start()
+    docs = gerar_documentos(n_skus)
+    mem_dicts, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    catalogo = Catalogo.from_dicts(*docs)
+    duracao = time.perf_counter() - inicio
+    del docs
+    gc.collect()
+    mem_catalogo, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    del catalogo
+    return mem_dicts, mem_catalogo, duracao
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", default="10000,100000,1000000", help="quantidades de SKUs, separadas por vírgula")
+    args = parser.parse_args()
+    
+    print(f"{'SKUs':>9} {'dicts (MB)':>11} {'Catalogo (MB)':>14} {'B/SKU dicts':>12} {'B/SKU Catalogo':>15} {'carga (s)':>10}")
+    for n in (int(t) for t in args.tamanhos.split(",")):
+        mem_dicts, mem_catalogo, duracao = medir(n)
+        print(
+            f"{n:>9} {mem_dicts / 2**20:>11.1f} {mem_catalogo / 2**20:>14.1f} "
+            f"{mem_dicts / n:>12.0f} {mem_catalogo / n:>15.0f} {duracao:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Microbenchmark: formato de armazenamento de dados_temporarios.
+
+Compara o layout atual (mapa via model_dump) com o blob compactado
+(DadosTemporarios.to_blob) em tamanho estimado do documento Firestore
+e tempo de serialização/desserialização do ConversationState, incluindo
+a codificação protobuf feita pelo cliente Firestore (sem rede).
+
+Uso:
+    python -m benchmarks.bench_dados_temporarios [--itens 5] [--repeticoes 500]
+"""
+import argparse
+import time
+from typing import Any, Callable
+
+from google.cloud.firestore_v1 import _helpers
+from google.cloud.firestore_v1.types import document
+
+from app.models.conversation import (
+    ConversationState, DadosTemporarios, Etapa, Fluxo,
+    ItemOrcamento, OrcamentoTemporario
+)
+
+
+def tamanho_firestore(valor: Any) -> int:
+    """
+    Estima o tamanho de um valor segundo as regras de cálculo do Firestore
+    (strings: bytes UTF-8 + 1; números: 8; bool/null: 1; bytes: tamanho).
+    """
+    if valor is None or isinstance(valor, bool):
+        return 1
+    if isinstance(valor, (int, float)):
+        return 8
+    if isinstance(valor, str):
+        return len(valor.encode("utf-8")) + 1
+    if isinstance(valor, bytes):
+        return len(valor)
+    if isinstance(valor, dict):
+        return sum(len(k.encode("utf-8")) + 1 + tamanho_firestore(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple)):
+        return sum(tamanho_firestore(v) for v in valor)
+    return len(str(valor))
+
+
+def montar_estado(n_itens: int) -> ConversationState:
+    """Monta um estado típico: produtos listados, variações e itens no orçamento."""
+    skus = [
+        {
+            "_id": f"sku_{i:03d}", "produto_id": "prod_001", "sku": f"CAM-PRE-{i}",
+            "preco": 59.9, "estoque": 10, "ativo": True,
+            "atributos": {"Cor": "Preto", "Tamanho": str(i)}
+        }
+        for i in range(6)
+    ]
+    produtos = {
+        str(i + 1): {
+            "_id": f"prod_{i:03d}", "nome": f"Produto {i}", "descricao": "Descrição do produto",
+            "categoria": "Roupas", "ativo": True, "atributos": ["Cor", "Tamanho"],
+            "preco_min": 59.9, "preco_max": 69.9, "skus": skus
+        }
+        for i in range(5)
+    }
+    itens = [
+        ItemOrcamento(
+            item_id=i + 1, sku=f"CAM-PRE-{i}", produto_id="prod_001",
+            nome_produto="Camiseta Básica", descricao=f"Camiseta Básica - Preto / {i}",
+            quantidade=2, preco_unitario=59.9, total=119.8,
+            atributos={"Cor": "Preto", "Tamanho": str(i)}
+        )
+        for i in range(n_itens)
+    ]
+    dados = DadosTemporarios(
+        categoria_selecionada="Roupas",
+        produto_selecionado="prod_001",
+        opcoes_produtos=produtos,
+        opcoes_skus={str(i + 1): s for i, s in enumerate(skus)},
+        orcamento_atual=OrcamentoTemporario(itens=itens, subtotal=119.8 * n_itens)
+    )
+    return ConversationState(
+        phone="5511999999999", nome="João",
+        etapa=Etapa.ORCAMENTO_ATRIBUTOS, fluxo=Fluxo.ORCAMENTO,
+        dados_temporarios=dados
+    )
+
+
+def cronometrar(fn: Callable[[], Any], repeticoes: int) -> float:
+    """Retorna o tempo médio por chamada em microssegundos."""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        fn()
+    return (time.perf_counter() - inicio) / repeticoes * 1e6
+
+
+def para_wire(data: dict) -> bytes:
+    """Codifica o dicionário como o cliente Firestore faria no set()."""
+    return document.Document.serialize(document.Document(fields=_helpers.encode_dict(data)))
+
+
+def de_wire(wire: bytes) -> dict:
+    """Decodifica o documento como o cliente Firestore faria no get()."""
+    return _helpers.decode_dict(document.Document.deserialize(wire).fields, None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--itens", type=int, default=5, help="itens no orçamento")
+    parser.add_argument("--repeticoes", type=int, default=500)
+    args = parser.parse_args()
+    
+    estado = montar_estado(args.itens)
+    
+    print(
+        f"{'formato':<8} {'doc (B)':>9} {'wire (B)':>9} "
+        f"{'to_dict (µs)':>13} {'from_dict (µs)':>15} {'salvar (µs)':>12} {'carregar (µs)':>14}"
+    )
+    for nome, compacto in (("dict", False), ("blob", True)):
+        doc = estado.to_dict(compacto=compacto)
+        wire = para_wire(doc)
+        t_enc = cronometrar(lambda: estado.to_dict(compacto=compacto), args.repeticoes)
+        # from_dict altera o dicionário recebido, por isso usa uma cópia rasa
+        t_dec = cronometrar(lambda: ConversationState.from_dict(dict(doc)), args.repeticoes)
+        t_salvar = cronometrar(lambda: para_wire(estado.to_dict(compacto=compacto)), args.repeticoes)
+        t_carregar = cronometrar(lambda: ConversationState.from_dict(de_wire(wire)), args.repeticoes)
+        print(
+            f"{nome:<8} {tamanho_firestore(doc):>9} {len(wire):>9} "
+            f"{t_enc:>13.1f} {t_dec:>15.1f} {t_salvar:>12.1f} {t_carregar:>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
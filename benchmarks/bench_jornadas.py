@@ -0,0 +1,174 @@
+"""
+Benchmark do MessageHandler sobre conversas roteirizadas (benchmarks/jornadas.py).
+
+Chama MessageHandler.process_message direto, sem HTTP, para cada jornada
+(orçamento completo, compras, pós-venda e atendente), cada iteração com um
+telefone novo, e mede:
+  - mensagens por segundo no total;
+  - latência de cada passo, em p50/p95/p99;
+  - memória alocada por passo (pico do tracemalloc, numa rodada separada).
+
+Roda no modo MOCK. Com --latencia-ms, cada chamada ao Firestore espera esse
+tempo (uma vez por consulta nas consultas em lote), simulando a latência da
+rede. As reservas de estoque ficam desligadas: o estoque do mock acabaria
+em poucas iterações e o orçamento passaria a cair no aviso de sem estoque.
+
+Para comparar commits, salve o resultado de um e compare no outro:
+    python -m benchmarks.bench_jornadas --salvar base.json
+    python -m benchmarks.bench_jornadas --comparar base.json
+
+Uso:
+    python -m benchmarks.bench_jornadas [--iteracoes 200] [--latencia-ms 0]
+                                        [--iteracoes-alocacao 20]
+                                        [--salvar arquivo.json] [--comparar arquivo.json]
+"""
+import argparse
+import json
+import logging
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Tuple
+
+import app.services.firebase_service as firebase_module
+from app.config import get_settings
+from app.handlers.message_handler import message_handler
+from app.services.catalogo_service import catalogo_service
+from app.services.firebase_service import firebase_service
+from benchmarks.jornadas import JORNADAS, Passo
+
+
+def percentil(valores: List[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def injetar_latencia(latencia_ms: float):
+    """Faz cada chamada ao Firestore (contabilizada) esperar latencia_ms."""
+    contabilizar = firebase_module.contabilizar
+    latencia = latencia_ms / 1000
+
+    def contabilizar_com_latencia(leituras: int = 0, escritas: int = 0, consultas: int = 0):
+        time.sleep(latencia * max(1, consultas))
+        contabilizar(leituras=leituras, escritas=escritas, consultas=consultas)
+
+    firebase_module.contabilizar = contabilizar_com_latencia
+
+
+def conferir_jornadas():
+    """Roda cada jornada uma vez e confere as respostas antes de medir."""
+    for nome, passos in JORNADAS.items():
+        telefone = f"bench_conferencia_{nome}"
+        for passo in passos:
+            resposta = message_handler.process_message(telefone, passo.mensagem)
+            if passo.esperado not in resposta:
+                print(f"❌ Jornada {nome}, passo {passo.rotulo}: esperado {passo.esperado!r} na resposta:")
+                print(resposta)
+                sys.exit(1)
+
+
+def executar(iteracoes: int, prefixo: str, medir) -> float:
+    """Roda todas as jornadas `iteracoes` vezes; retorna o tempo total (s)."""
+    total = 0.0
+    for i in range(iteracoes):
+        for nome, passos in JORNADAS.items():
+            telefone = f"{prefixo}_{nome}_{i}"
+            for passo in passos:
+                total += medir(nome, passo, telefone)
+    return total
+
+
+def medir_tempos(iteracoes: int) -> Tuple[Dict[str, List[float]], float, int]:
+    tempos: Dict[str, List[float]] = {}
+
+    def medir(nome: str, passo: Passo, telefone: str) -> float:
+        inicio = time.perf_counter()
+        message_handler.process_message(telefone, passo.mensagem)
+        duracao = time.perf_counter() - inicio
+        tempos.setdefault(f"{nome}/{passo.rotulo}", []).append(duracao)
+        return duracao
+
+    total = executar(iteracoes, "bench", medir)
+    mensagens = sum(len(v) for v in tempos.values())
+    return tempos, total, mensagens
+
+
+def medir_alocacoes(iteracoes: int) -> Dict[str, List[int]]:
+    alocacoes: Dict[str, List[int]] = {}
+
+    def medir(nome: str, passo: Passo, telefone: str) -> float:
+        tracemalloc.reset_peak()
+        antes = tracemalloc.get_traced_memory()[0]
+        message_handler.process_message(telefone, passo.mensagem)
+        alocacoes.setdefault(f"{nome}/{passo.rotulo}", []).append(tracemalloc.get_traced_memory()[1] - antes)
+        return 0.0
+
+    tracemalloc.start()
+    try:
+        executar(iteracoes, "bench_alocacao", medir)
+    finally:
+        tracemalloc.stop()
+    return alocacoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iteracoes", type=int, default=200, help="repetições de cada jornada")
+    parser.add_argument("--latencia-ms", type=float, default=0.0, help="latência por chamada ao Firestore")
+    parser.add_argument("--iteracoes-alocacao", type=int, default=20, help="repetições na rodada com tracemalloc (0 desliga)")
+    parser.add_argument("--salvar", help="grava o resultado em JSON")
+    parser.add_argument("--comparar", help="compara com um resultado salvo")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    firebase_service._mock_mode = True
+    get_settings().reservar_estoque = False
+    catalogo_service.recarregar()
+    if args.latencia_ms > 0:
+        injetar_latencia(args.latencia_ms)
+
+    conferir_jornadas()
+    tempos, total, mensagens = medir_tempos(args.iteracoes)
+    alocacoes = medir_alocacoes(args.iteracoes_alocacao) if args.iteracoes_alocacao > 0 else {}
+
+    resultado = {
+        "latencia_ms": args.latencia_ms,
+        "mensagens": mensagens,
+        "mensagens_por_segundo": mensagens / total,
+        "passos": {
+            passo: {
+                "p50_us": statistics.median(valores) * 1e6,
+                "p95_us": percentil(valores, 0.95) * 1e6,
+                "p99_us": percentil(valores, 0.99) * 1e6,
+                "alocado_kib": statistics.median(alocacoes[passo]) / 1024 if passo in alocacoes else None
+            }
+            for passo, valores in tempos.items()
+        }
+    }
+
+    base = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+
+    print(f"\n{mensagens} mensagens em {total:.2f} s: {resultado['mensagens_por_segundo']:.0f} mensagens/s"
+          + (f" (base: {base['mensagens_por_segundo']:.0f})" if base else ""))
+    print(f"  {'passo':<40} {'p50 (µs)':>9} {'p95 (µs)':>9} {'p99 (µs)':>9} {'KiB':>7}"
+          + (f" {'p50 vs base':>12}" if base else ""))
+    for passo, r in resultado["passos"].items():
+        kib = f"{r['alocado_kib']:.1f}" if r["alocado_kib"] is not None else "-"
+        linha = f"  {passo:<40} {r['p50_us']:>9.0f} {r['p95_us']:>9.0f} {r['p99_us']:>9.0f} {kib:>7}"
+        anterior = base["passos"].get(passo) if base else None
+        if anterior:
+            linha += f" {(r['p50_us'] / anterior['p50_us'] - 1) * 100:>+11.0f}%"
+        print(linha)
+
+    if args.salvar:
+        with open(args.salvar, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"\nResultado salvo em {args.salvar}")
+
+
+if __name__ == "__main__":
+    main()
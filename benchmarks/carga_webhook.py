@@ -0,0 +1,279 @@
+"""
+Teste de carga do /webhook/whatsapp com uma Z-API falsa local.
+
+Sobe uma Z-API falsa (aceita /send-text e devolve um messageId, com
+latência e erros configuráveis), sobe a aplicação real com uvicorn
+apontando para ela (ZAPI_BASE_URL) e simula milhares de clientes, cada um
+com um telefone novo percorrendo uma jornada de benchmarks/jornadas.py.
+
+Relata vazão, latência do webhook em p50/p95/p99 (total e por passo),
+status HTTP, e se cada resposta enviada à Z-API contém o trecho esperado
+do passo. Sai com código 1 se alguma resposta entregue estiver errada.
+
+A aplicação sobe em modo MOCK (sem credenciais do Firebase) e com as
+reservas de estoque desligadas. Para medir uma instância já no ar (por
+exemplo com vários workers e um Firestore de teste), use --url e configure
+nela ZAPI_BASE_URL=http://<esta máquina>:<--porta-zapi>; no modo MOCK o
+estado fica na memória de cada worker, então use um único worker.
+
+Uso:
+    python -m benchmarks.carga_webhook [--clientes 1000] [--concorrencia 50]
+        [--mix orcamento=6,compras=2,posvenda=1,atendente=1] [--pausa-ms 0]
+        [--zapi-latencia-ms 50] [--zapi-taxa-erro 0.0] [--url http://...]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.jornadas import JORNADAS, Passo
+
+
+def percentil(valores: List[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+# ==================== Z-API FALSA ====================
+
+class ZapiFalsa:
+    """Servidor HTTP que imita o /send-text da Z-API e guarda as mensagens por telefone."""
+
+    def __init__(self, porta: int, latencia_ms: float, taxa_erro: float):
+        self.latencia = latencia_ms / 1000
+        self.taxa_erro = taxa_erro
+        self.mensagens: Dict[str, List[str]] = {}
+        self.envios = 0
+        self.erros_injetados = 0
+        self._lock = threading.Lock()
+        self._rnd = random.Random(7)
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", porta), self._handler())
+        self._servidor.daemon_threads = True
+        self.porta = self._servidor.server_address[1]
+
+    def _handler(self):
+        zapi = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                corpo = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.endswith("/send-text"):
+                    return self._responder(404, {"error": "not found"})
+                if zapi.latencia:
+                    time.sleep(zapi.latencia)
+                with zapi._lock:
+                    zapi.envios += 1
+                    if zapi._rnd.random() < zapi.taxa_erro:
+                        zapi.erros_injetados += 1
+                        return self._responder(500, {"error": "erro simulado"})
+                    zapi.mensagens.setdefault(corpo.get("phone", ""), []).append(corpo.get("message", ""))
+                message_id = uuid.uuid4().hex.upper()
+                self._responder(200, {"zaapId": message_id, "messageId": message_id, "id": message_id})
+
+            def do_GET(self):
+                self._responder(200, {"connected": True, "smartphoneConnected": True})
+
+            def _responder(self, status: int, dados: dict):
+                corpo = json.dumps(dados).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def iniciar(self):
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+
+    def parar(self):
+        self._servidor.shutdown()
+
+    def quantidade(self, telefone: str) -> int:
+        return len(self.mensagens.get(telefone, ()))
+
+    def ultima(self, telefone: str) -> Optional[str]:
+        mensagens = self.mensagens.get(telefone)
+        return mensagens[-1] if mensagens else None
+
+
+# ==================== APLICAÇÃO ====================
+
+def iniciar_app(porta: int, porta_zapi: int, log: str) -> subprocess.Popen:
+    """Sobe main:app com uvicorn apontando para a Z-API falsa, em modo MOCK."""
+    env = dict(os.environ)
+    env.pop("GOOGLE_APPLICATION_CREDENTIALS", None)
+    env.update({
+        "ZAPI_INSTANCE_ID": "carga",
+        "ZAPI_TOKEN": "carga",
+        "ZAPI_CLIENT_TOKEN": "",
+        "ZAPI_BASE_URL": f"http://127.0.0.1:{porta_zapi}",
+        "FIREBASE_CREDENTIALS_JSON": "",
+        "FIREBASE_CREDENTIALS_PATH": os.path.join(tempfile.gettempdir(), "sem-credenciais.json"),
+        "RESERVAR_ESTOQUE": "false",
+        "LOG_LEVEL": "WARNING",
+    })
+    with open(log, "w") as saida:
+        processo = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(porta), "--log-level", "warning"],
+            env=env, stdout=saida, stderr=subprocess.STDOUT
+        )
+    url = f"http://127.0.0.1:{porta}/health"
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            sys.exit(f"❌ A aplicação terminou ao iniciar (veja {log})")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return processo
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    processo.terminate()
+    sys.exit(f"❌ A aplicação não respondeu em 30 s (veja {log})")
+
+
+# ==================== CARGA ====================
+
+class Resultados:
+    def __init__(self):
+        self.latencias: List[float] = []
+        self.por_passo: Dict[str, List[float]] = {}
+        self.status: Counter = Counter()
+        self.corretas = 0
+        self.erradas: List[str] = []
+        self.sem_resposta = 0
+
+    def registrar(self, chave: str, status, duracao: float):
+        self.latencias.append(duracao)
+        self.por_passo.setdefault(chave, []).append(duracao)
+        self.status[status] += 1
+
+
+async def cliente(http: httpx.AsyncClient, url: str, telefone: str, jornada: str, passos: List[Passo],
+                  zapi: ZapiFalsa, resultados: Resultados, pausa: float):
+    for passo in passos:
+        antes = zapi.quantidade(telefone)
+        payload = {
+            "phone": telefone,
+            "messageId": uuid.uuid4().hex.upper(),
+            "fromMe": False,
+            "type": "ReceivedCallback",
+            "text": {"message": passo.mensagem}
+        }
+        inicio = time.perf_counter()
+        try:
+            status = (await http.post(url, json=payload)).status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        resultados.registrar(f"{jornada}/{passo.rotulo}", status, time.perf_counter() - inicio)
+
+        resposta = zapi.ultima(telefone) if zapi.quantidade(telefone) > antes else None
+        if resposta is None:
+            resultados.sem_resposta += 1
+        elif passo.esperado in resposta:
+            resultados.corretas += 1
+        else:
+            resultados.erradas.append(f"{telefone} {jornada}/{passo.rotulo}: {resposta[:80]!r}")
+        if pausa:
+            await asyncio.sleep(pausa)
+
+
+async def gerar_carga(args, zapi: ZapiFalsa, url: str) -> Resultados:
+    nomes, pesos = zip(*((nome, float(peso)) for nome, peso in (item.split("=") for item in args.mix.split(","))))
+    rnd = random.Random(42)
+    fila: asyncio.Queue = asyncio.Queue()
+    for n in range(args.clientes):
+        fila.put_nowait((f"55119{n:08d}", rnd.choices(nomes, pesos)[0]))
+
+    resultados = Resultados()
+    limites = httpx.Limits(max_connections=args.concorrencia, max_keepalive_connections=args.concorrencia)
+    async with httpx.AsyncClient(timeout=60, limits=limites) as http:
+        async def trabalhador():
+            while not fila.empty():
+                telefone, jornada = fila.get_nowait()
+                await cliente(http, url, telefone, jornada, JORNADAS[jornada], zapi, resultados,
+                              args.pausa_ms / 1000)
+
+        await asyncio.gather(*(trabalhador() for _ in range(args.concorrencia)))
+    return resultados
+
+
+def relatar(args, resultados: Resultados, zapi: ZapiFalsa, duracao: float):
+    total = len(resultados.latencias)
+    ms = [t * 1000 for t in resultados.latencias]
+    print(f"\n{args.clientes} clientes, {args.concorrencia} simultâneos: {total} mensagens em {duracao:.1f} s "
+          f"-> {total / duracao:.0f} mensagens/s")
+    print(f"Latência do webhook (ms): p50 {statistics.median(ms):.1f}  p95 {percentil(ms, 0.95):.1f}  "
+          f"p99 {percentil(ms, 0.99):.1f}  máx {max(ms):.1f}")
+    print("Status HTTP: " + ", ".join(f"{s}: {n}" for s, n in sorted(resultados.status.items(), key=str)))
+    print(f"Respostas corretas: {resultados.corretas}/{total} ({resultados.corretas / total * 100:.1f}%), "
+          f"erradas: {len(resultados.erradas)}, sem resposta: {resultados.sem_resposta}")
+    print(f"Z-API falsa: {zapi.envios} envios, {zapi.erros_injetados} erros injetados")
+
+    print(f"\n  {'passo':<40} {'n':>6} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9}")
+    for passo, valores in resultados.por_passo.items():
+        valores = [t * 1000 for t in valores]
+        print(f"  {passo:<40} {len(valores):>6} {statistics.median(valores):>9.1f} "
+              f"{percentil(valores, 0.95):>9.1f} {percentil(valores, 0.99):>9.1f}")
+
+    for erro in resultados.erradas[:10]:
+        print(f"❌ {erro}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clientes", type=int, default=1000, help="telefones simulados")
+    parser.add_argument("--concorrencia", type=int, default=50, help="clientes conversando ao mesmo tempo")
+    parser.add_argument("--mix", default="orcamento=6,compras=2,posvenda=1,atendente=1", help="peso de cada jornada")
+    parser.add_argument("--pausa-ms", type=float, default=0.0, help="pausa do cliente entre mensagens")
+    parser.add_argument("--zapi-latencia-ms", type=float, default=50.0, help="latência do /send-text falso")
+    parser.add_argument("--zapi-taxa-erro", type=float, default=0.0, help="fração de envios com erro 500")
+    parser.add_argument("--porta", type=int, default=8800, help="porta da aplicação")
+    parser.add_argument("--porta-zapi", type=int, default=8899, help="porta da Z-API falsa")
+    parser.add_argument("--url", help="usa uma aplicação já no ar em vez de subir uma")
+    parser.add_argument("--log-app", default=os.path.join(tempfile.gettempdir(), "carga_webhook_app.log"),
+                        help="arquivo com a saída da aplicação")
+    args = parser.parse_args()
+
+    zapi = ZapiFalsa(args.porta_zapi, args.zapi_latencia_ms, args.zapi_taxa_erro)
+    zapi.iniciar()
+    processo = None
+    if args.url:
+        url = args.url.rstrip("/") + "/webhook/whatsapp"
+    else:
+        processo = iniciar_app(args.porta, zapi.porta, args.log_app)
+        url = f"http://127.0.0.1:{args.porta}/webhook/whatsapp"
+
+    try:
+        inicio = time.perf_counter()
+        resultados = asyncio.run(gerar_carga(args, zapi, url))
+        relatar(args, resultados, zapi, time.perf_counter() - inicio)
+    finally:
+        if processo is not None:
+            processo.terminate()
+            processo.wait(timeout=10)
+        zapi.parar()
+
+    if resultados.erradas:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Orçamento de operações no Firestore por mensagem nas conversas típicas.
+
+Percorre as jornadas (saudação, navegação, adicionar item, finalizar) no
+modo MOCK, que contabiliza o que o Firestore cobraria, e compara leituras,
+escritas e consultas de cada mensagem com o limite da tabela LIMITES. Sai
+com código 1 se alguma mensagem passar do limite, para que um N+1 novo
+(uma consulta por produto ao listar uma categoria, por exemplo) apareça
+antes do deploy.
+
+Cada jornada começa com o cache de páginas vazio e o catálogo em memória
+expirado: o worker o carrega na partida (lifespan de main.py), mas a
+recarga depois do TTL não pode cair na mensagem do cliente. Os limites valem para as configurações padrão (.env.example);
+ao reduzir o custo de uma etapa, reduza também o limite.
+
+Uso:
+    python -m benchmarks.custo_firestore [--verbose]
+"""
+import argparse
+import logging
+import sys
+from typing import List, NamedTuple, Tuple
+
+from app.handlers.message_handler import message_handler
+from app.services.catalogo_service import catalogo_service
+from app.services.contexto_requisicao import contexto_requisicao
+from app.services.firebase_service import firebase_service
+from app.services.page_cache import page_cache
+
+
+class Limite(NamedTuple):
+    leituras: int
+    escritas: int
+    consultas: int
+
+
+# Toda mensagem: ler a conversa (1 leitura), salvá-la e registrar o log (2 escritas)
+BASE = Limite(1, 2, 0)
+
+SAUDACAO = [
+    ("oi", Limite(1, 3, 0)),              # conversa nova é criada antes de salvar
+    ("Ana", BASE),
+]
+NAVEGACAO = SAUDACAO + [
+    ("1", Limite(6, 2, 1)),               # categorias: 1 consulta nos produtos ativos
+    ("3", Limite(8, 2, 2)),               # página de produtos + SKUs da página ("in")
+    ("1", BASE),                          # variações vêm do catálogo em memória
+    ("1", BASE),
+]
+ADICIONAR_ITEM = SAUDACAO + [
+    ("1", Limite(6, 2, 1)),
+    ("1", Limite(3, 2, 2)),
+    ("1", BASE),                          # produto com um SKU: pede a quantidade
+    ("2", Limite(4, 4, 1)),               # estoque do SKU + contador e reserva somados (e relidos)
+]
+FINALIZAR = ADICIONAR_ITEM + [
+    ("2", Limite(4, 5, 1)),               # revalidação em lote, sequência e orçamento
+]
+
+LIMITES: List[Tuple[str, List[Tuple[str, Limite]]]] = [
+    ("saudacao", SAUDACAO),
+    ("navegacao", NAVEGACAO),
+    ("adicionar_item", ADICIONAR_ITEM),
+    ("finalizar", FINALIZAR),
+]
+
+
+def executar(nome: str, passos: List[Tuple[str, Limite]], verbose: bool) -> int:
+    """Roda a jornada com um telefone novo e retorna quantas mensagens passaram do limite."""
+    page_cache.limpar()
+    catalogo_service.invalidar()
+    telefone = f"custo_{nome}"
+    excedidas = 0
+    print(f"\n{nome}")
+    print(f"  {'mensagem':<10} {'leituras':>10} {'escritas':>10} {'consultas':>10}")
+    for mensagem, limite in passos:
+        with contexto_requisicao() as contexto:
+            resposta = message_handler.process_message(telefone, mensagem)
+        medido = Limite(contexto.leituras, contexto.escritas, contexto.consultas)
+        acima = [campo for campo, m, l in zip(Limite._fields, medido, limite) if m > l]
+        colunas = " ".join(f"{f'{m}/{l}':>10}" for m, l in zip(medido, limite))
+        print(f"  {mensagem!r:<10} {colunas}  {'❌ acima: ' + ', '.join(acima) if acima else '✅'}")
+        if verbose:
+            print("    " + resposta.splitlines()[0])
+        excedidas += bool(acima)
+    return excedidas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verbose", action="store_true", help="mostra a primeira linha de cada resposta")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    # Nunca grava no banco real, mesmo com credenciais configuradas
+    firebase_service._mock_mode = True
+    # Partida do worker, como no lifespan de main.py
+    catalogo_service.get_catalogo()
+
+    excedidas = sum(executar(nome, passos, args.verbose) for nome, passos in LIMITES)
+    if excedidas:
+        print(f"\n❌ {excedidas} mensagens acima do limite de operações no Firestore")
+        sys.exit(1)
+    print("\n✅ Todas as mensagens dentro do limite")
+
+
+if __name__ == "__main__":
+    main()
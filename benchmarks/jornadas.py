@@ -0,0 +1,45 @@
+"""
+Conversas roteirizadas usadas pelos benchmarks.
+
+Cada jornada é uma lista de passos (mensagem do cliente, rótulo do passo,
+trecho esperado na resposta) que parte de um telefone novo. Os roteiros
+seguem os dados do modo MOCK (app.services.firebase_service).
+"""
+from typing import Dict, List, NamedTuple
+
+
+class Passo(NamedTuple):
+    mensagem: str
+    rotulo: str
+    esperado: str
+
+
+SAUDACAO = [
+    Passo("oi", "saudacao", "qual é o seu nome"),
+    Passo("Ana", "nome", "Escolha uma das opções"),
+]
+
+JORNADAS: Dict[str, List[Passo]] = {
+    # Novo cliente -> nome -> orçamento -> categoria -> produto -> variação -> quantidade -> finalizar
+    "orcamento": SAUDACAO + [
+        Passo("1", "categorias", "Categorias disponíveis"),
+        Passo("3", "produtos", "Produtos em Roupas"),
+        Passo("1", "variacao_cor", "Escolha *Cor*"),
+        Passo("1", "variacao_tamanho", "Escolha *Tamanho*"),
+        Passo("2", "sku_selecionado", "CAM-PRE-G"),
+        Passo("2", "quantidade", "Item adicionado"),
+        Passo("2", "finalizar", "Orçamento gerado"),
+    ],
+    "compras": SAUDACAO + [
+        Passo("2", "compras_confirmar_nome", "certo?"),
+        Passo("1", "compras_encaminhar", "encaminhar"),
+    ],
+    "posvenda": SAUDACAO + [
+        Passo("3", "posvenda_confirmar_nome", "certo?"),
+        Passo("1", "posvenda_pedido", "número do seu pedido"),
+        Passo("PED-2026-00001", "posvenda_encaminhar", "PED-2026-00001"),
+    ],
+    "atendente": SAUDACAO + [
+        Passo("4", "atendente", "atendente"),
+    ],
+}
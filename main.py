@@ -4,15 +4,29 @@ FastAPI backend com webhook para Z-API WhatsApp.
 """
 import logging
 import sys
+import time
 from contextlib import asynccontextmanager
-from typing import Optional
+from typing import Optional, Dict, Any
 
-from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Request, HTTPException, Header
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 
 from app.config import get_settings
+from app.handlers.comum import partes_da_resposta
 from app.handlers.message_handler import message_handler
+from app.services.campanha_service import campanha_service, STATUS_ENVIANDO, STATUS_PAUSADA, STATUS_CANCELADA
+from app.services.catalogo_service import catalogo_service
+from app.services.contexto_requisicao import contexto_requisicao
+from app.services.disjuntor import disjuntor_zapi, disjuntor_firestore
+from app.services.entregas import entregas, CALLBACKS_STATUS
+from app.services.metricas import metricas
+from app.services.outbox import outbox
+from app.services.perfilamento import perfilador
+from app.services.rastreamento import rastreador
+from app.services.page_cache import page_cache
+from app.services.prontidao import prontidao
+from app.services.reserva_service import reserva_service
 from app.services.zapi_service import zapi_service
 
 
@@ -34,8 +48,22 @@ async def lifespan(app: FastAPI):
     logger.info("🚀 Iniciando WhatsApp E-commerce Bot...")
     logger.info(f"📱 Empresa: {settings.company_name}")
     logger.info(f"📞 Z-API Instance: {settings.zapi_instance_id[:8]}..." if settings.zapi_instance_id else "📞 Z-API: não configurado")
+    # Catálogo carregado na partida: as mensagens só o recarregam em segundo plano
+    catalogo_service.get_catalogo()
+    if settings.reservar_estoque:
+        reserva_service.carregar()
+    outbox.carregar()
+    prontidao.iniciar()
+    campanha_service.iniciar()
+    outbox.iniciar()
+    entregas.iniciar()
     yield
     logger.info("👋 Encerrando aplicação...")
+    await outbox.parar()
+    await entregas.parar()
+    await campanha_service.parar()
+    await prontidao.parar()
+    zapi_service.fechar()
 
 
 app = FastAPI(
@@ -72,6 +100,15 @@ class TestMessage(BaseModel):
     message: str
 
 
+class NovaCampanha(BaseModel):
+    """Modelo para criação de campanha."""
+    nome: str
+    texto: str  # campos: {nome}, {primeiro_nome}, {telefone}
+    filtros: Dict[str, Any] = {}  # campo de conversas -> valor (igualdade)
+    ativos_desde: Optional[str] = None  # ISO: só conversas atualizadas a partir daí
+    mensagens_por_segundo: Optional[float] = None
+
+
 # ==================== ENDPOINTS ====================
 
 @app.get("/")
@@ -88,15 +125,27 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
+    """Health check endpoint (liveness: o processo está respondendo)."""
     return {"status": "healthy"}
 
 
+@app.get("/ready")
+async def ready():
+    """Prontidão: última verificação do Firestore e da Z-API (503 se alguma falhou)."""
+    pronto, estado = prontidao.estado()
+    return JSONResponse(content=estado, status_code=200 if pronto else 503)
+
+
 @app.get("/zapi/status")
 async def zapi_status():
-    """Verifica status da conexão Z-API."""
-    status = zapi_service.get_status()
-    return status
+    """Status da conexão Z-API na última verificação em segundo plano."""
+    return prontidao.zapi_status()
+
+
+@app.get("/metrics")
+async def metrics():
+    """Métricas do processo no formato texto do Prometheus."""
+    return PlainTextResponse(metricas.exportar(), media_type="text/plain; version=0.0.4")
 
 
 @app.post("/webhook/whatsapp")
@@ -113,22 +162,39 @@ async def whatsapp_webhook(request: Request):
         "text": {"message": "texto da mensagem"},
         "type": "ReceivedCallback"
     }
+    
+    Também recebe os callbacks de status das mensagens enviadas
+    (MessageStatusCallback, DeliveryCallback), usados para medir o tempo
+    até a entrega e a leitura (ver app.services.entregas).
     """
+    inicio = time.perf_counter()
+    resultado = "erro"
     try:
         data = await request.json()
         
+        # Status de entrega/leitura das mensagens enviadas: caminho rápido,
+        # sem log do payload (chegam até 3 por mensagem enviada)
+        callback_type = data.get("type", "")
+        if callback_type in CALLBACKS_STATUS:
+            entregas.registrar_callback(data)
+            resultado = "status"
+            return JSONResponse(content={"status": "ok"})
+        
         # Log para debug
         logger.info(f"📨 Webhook recebido: {data}")
         
         # Ignora mensagens enviadas pelo próprio bot
         if data.get("fromMe", False):
             logger.info("⏭️ Ignorando mensagem própria (fromMe=true)")
+            metricas.callbacks_ignorados.inc("fromMe")
+            resultado = "ignorado"
             return JSONResponse(content={"status": "ignored", "reason": "fromMe"})
         
-        # Ignora callbacks de status
-        callback_type = data.get("type", "")
-        if callback_type in ["MessageStatusCallback", "StatusCallback", "DeliveryCallback"]:
+        # Ignora callbacks de status da instância
+        if callback_type == "StatusCallback":
             logger.info(f"⏭️ Ignorando callback de status: {callback_type}")
+            metricas.callbacks_ignorados.inc("status_callback")
+            resultado = "ignorado"
             return JSONResponse(content={"status": "ignored", "reason": "status_callback"})
         
         # Extrai número do remetente
@@ -162,28 +228,49 @@ async def whatsapp_webhook(request: Request):
                 message = "[Localização recebida]"
             else:
                 logger.warning(f"⚠️ Tipo de mensagem não suportado: {data}")
+                metricas.callbacks_ignorados.inc("unsupported_type")
+                resultado = "ignorado"
                 return JSONResponse(content={"status": "ignored", "reason": "unsupported_type"})
         
         logger.info(f"📨 Mensagem de {phone}: {message}")
+        metricas.mensagens_recebidas.inc()
         
-        # Processa mensagem
-        response_text = message_handler.process_message(
-            phone=phone,
-            message=message
-        )
+        # Sem tarefas de fundo (ex.: Vercel), as respostas da outbox saem aqui,
+        # antes da resposta nova
+        await outbox.drenar_se_parada()
         
-        logger.info(f"📤 Resposta para {phone}: {response_text[:100]}...")
+        perfil = perfilador.perfilar("webhook.mensagem", _admin_autorizado(request.headers.get("x-admin-secret")),
+                                     phone=phone, message_id=data.get("messageId"))
+        with perfil, rastreador.trace("webhook.mensagem", id_externo=data.get("messageId")) as raiz:
+            # Processa mensagem (resposta já dividida nas mensagens a enviar)
+            partes = message_handler.process_message_partes(
+                phone=phone,
+                message=message
+            )
+            
+            logger.info(f"📤 Resposta para {phone} ({len(partes)} mensagens): {partes[0][:100]}...")
+            
+            # Envia resposta via Z-API, parte a parte em ordem; o que não sair
+            # (Z-API fora, circuito aberto) fica na outbox para reenvio
+            message_ids, enfileiradas = outbox.enviar(phone, partes)
+            raiz.definir(enviada=len(message_ids) == len(partes), partes=len(partes), enfileiradas=enfileiradas)
         
-        # Envia resposta via Z-API
-        message_id = zapi_service.send_message(phone, response_text)
-        
-        if message_id:
+        if len(message_ids) == len(partes):
+            resultado = "sucesso"
             return JSONResponse(content={
                 "status": "success",
-                "messageId": message_id
+                "messageId": message_ids[0],
+                "messageIds": message_ids
             })
+        elif enfileiradas:
+            resultado = "enfileirado"
+            return JSONResponse(content={
+                "status": "queued",
+                "messageIds": message_ids,
+                "enfileiradas": enfileiradas
+            }, status_code=202)
         else:
-            logger.error(f"❌ Falha ao enviar resposta para {phone}")
+            logger.error(f"❌ Falha ao enviar resposta para {phone} ({len(message_ids)}/{len(partes)} mensagens enviadas)")
             return JSONResponse(content={
                 "status": "error",
                 "reason": "send_failed"
@@ -195,10 +282,12 @@ async def whatsapp_webhook(request: Request):
             content={"status": "error", "reason": str(e)},
             status_code=500
         )
+    finally:
+        metricas.webhook_duracao.observar(time.perf_counter() - inicio, resultado)
 
 
 @app.post("/api/test/message")
-async def test_message(data: TestMessage):
+async def test_message(data: TestMessage, x_admin_secret: Optional[str] = Header(None)):
     """
     Endpoint para testar processamento de mensagens sem Z-API.
     Útil para desenvolvimento e debug.
@@ -206,16 +295,19 @@ async def test_message(data: TestMessage):
     logger.info(f"🧪 Teste - Phone: {data.phone}, Message: {data.message}")
     
     try:
-        response = message_handler.process_message(
-            phone=data.phone,
-            message=data.message
-        )
+        perfil = perfilador.perfilar("api.test_message", _admin_autorizado(x_admin_secret), phone=data.phone)
+        with perfil, rastreador.trace("api.test_message"), contexto_requisicao() as contexto:
+            response = message_handler.process_message(
+                phone=data.phone,
+                message=data.message
+            )
         
         return {
             "success": True,
             "phone": data.phone,
             "message_received": data.message,
-            "response": response
+            "response": response,
+            "leituras": contexto.resumo()
         }
         
     except Exception as e:
@@ -227,15 +319,155 @@ async def test_message(data: TestMessage):
 async def send_message(phone: str, message: str):
     """
     Endpoint para enviar mensagem manualmente via Z-API.
+    Textos maiores que MENSAGEM_LIMITE_CARACTERES são enviados em partes.
     """
-    message_id = zapi_service.send_message(phone, message)
+    partes = partes_da_resposta(message, settings.mensagem_limite_caracteres)
+    message_ids = zapi_service.send_messages(phone, partes)
     
-    if message_id:
-        return {"success": True, "message_id": message_id}
+    if len(message_ids) == len(partes):
+        return {"success": True, "message_id": message_ids[0], "message_ids": message_ids}
     else:
         raise HTTPException(status_code=500, detail="Falha ao enviar mensagem")
 
 
+# ==================== ADMIN ====================
+
+def _admin_autorizado(admin_secret: Optional[str]) -> bool:
+    """Indica se o header X-Admin-Secret confere com ADMIN_SECRET."""
+    return bool(settings.admin_secret) and admin_secret == settings.admin_secret
+
+
+def _verificar_admin(admin_secret: Optional[str]):
+    """Valida o header X-Admin-Secret contra ADMIN_SECRET."""
+    if not _admin_autorizado(admin_secret):
+        raise HTTPException(status_code=403, detail="Acesso negado")
+
+
+@app.post("/admin/flow/reload")
+async def reload_flow(x_admin_secret: Optional[str] = Header(None)):
+    """Recarrega a tabela de fluxo (app/handlers/flow_table.py) sem redeploy."""
+    _verificar_admin(x_admin_secret)
+    try:
+        rotas = message_handler.flow.recarregar()
+    except Exception as e:
+        logger.error(f"❌ Tabela de fluxo inválida, mantendo a atual: {e}", exc_info=True)
+        raise HTTPException(status_code=400, detail=f"Tabela de fluxo inválida: {e}")
+    return {"success": True, "rotas": rotas}
+
+
+@app.get("/admin/flow/tempos")
+async def flow_tempos(x_admin_secret: Optional[str] = Header(None)):
+    """Tempo de processamento por (fluxo, etapa) desde o início do processo."""
+    _verificar_admin(x_admin_secret)
+    return message_handler.flow.tempos()
+
+
+@app.get("/admin/cache/paginas")
+async def cache_paginas(x_admin_secret: Optional[str] = Header(None)):
+    """Ocupação e taxa de acerto do cache de páginas do catálogo."""
+    _verificar_admin(x_admin_secret)
+    return page_cache.estatisticas()
+
+
+@app.get("/admin/reservas")
+async def reservas(x_admin_secret: Optional[str] = Header(None)):
+    """Reservas de estoque ativas neste worker."""
+    _verificar_admin(x_admin_secret)
+    return reserva_service.estatisticas()
+
+
+@app.get("/admin/disjuntores")
+async def disjuntores(x_admin_secret: Optional[str] = Header(None)):
+    """Estado dos circuitos da Z-API e do Firestore e a outbox deste worker."""
+    _verificar_admin(x_admin_secret)
+    return {
+        "disjuntores": {d.nome: d.resumo() for d in (disjuntor_zapi, disjuntor_firestore)},
+        "outbox": outbox.resumo()
+    }
+
+
+@app.get("/admin/entregas")
+async def entregas_por_hora(horas: int = 24, x_admin_secret: Optional[str] = Header(None)):
+    """Envios e percentis do tempo até a entrega e a leitura, por hora de envio (todos os workers)."""
+    _verificar_admin(x_admin_secret)
+    if not 1 <= horas <= 24 * 31:
+        raise HTTPException(status_code=400, detail="horas deve estar entre 1 e 744")
+    return entregas.resumo_por_hora(horas)
+
+
+@app.get("/admin/perfis")
+async def perfis(x_admin_secret: Optional[str] = Header(None)):
+    """Últimos perfis de requisição guardados neste worker (mais recentes primeiro)."""
+    _verificar_admin(x_admin_secret)
+    return perfilador.listar()
+
+
+@app.get("/admin/perfis/{perfil_id}")
+async def perfil_collapsed(perfil_id: int, x_admin_secret: Optional[str] = Header(None)):
+    """Pilhas amostradas do perfil no formato collapsed (flamegraph.pl, speedscope)."""
+    _verificar_admin(x_admin_secret)
+    perfil = perfilador.obter(perfil_id)
+    if perfil is None:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado (já descartado do buffer?)")
+    return PlainTextResponse(perfil.collapsed())
+
+
+@app.post("/admin/perfis/amostragem")
+async def perfis_amostragem(fracao: float, x_admin_secret: Optional[str] = Header(None)):
+    """Altera a fração de requisições perfiladas neste worker (0 desliga)."""
+    _verificar_admin(x_admin_secret)
+    if not 0 <= fracao <= 1:
+        raise HTTPException(status_code=400, detail="fracao deve estar entre 0 e 1")
+    perfilador.definir_amostragem(fracao)
+    return {"success": True, "amostragem": fracao}
+
+
+@app.post("/admin/campanhas")
+async def criar_campanha(data: NovaCampanha, x_admin_secret: Optional[str] = Header(None)):
+    """Cria uma campanha e inicia o envio em segundo plano."""
+    _verificar_admin(x_admin_secret)
+    try:
+        return campanha_service.criar(data.nome, data.texto, data.filtros, data.ativos_desde,
+                                      data.mensagens_por_segundo)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/admin/campanhas")
+async def listar_campanhas(x_admin_secret: Optional[str] = Header(None)):
+    """Campanhas mais recentes com o progresso do envio."""
+    _verificar_admin(x_admin_secret)
+    return campanha_service.listar()
+
+
+@app.get("/admin/campanhas/{campanha_id}")
+async def obter_campanha(campanha_id: str, x_admin_secret: Optional[str] = Header(None)):
+    """Progresso do envio da campanha."""
+    _verificar_admin(x_admin_secret)
+    campanha = campanha_service.obter(campanha_id)
+    if campanha is None:
+        raise HTTPException(status_code=404, detail="Campanha não encontrada")
+    return campanha
+
+
+_ACOES_CAMPANHA = {"pausar": STATUS_PAUSADA, "retomar": STATUS_ENVIANDO, "cancelar": STATUS_CANCELADA}
+
+
+@app.post("/admin/campanhas/{campanha_id}/{acao}")
+async def controlar_campanha(campanha_id: str, acao: str, x_admin_secret: Optional[str] = Header(None)):
+    """Pausa, retoma ou cancela o envio da campanha."""
+    _verificar_admin(x_admin_secret)
+    if acao not in _ACOES_CAMPANHA:
+        raise HTTPException(status_code=404, detail="Ação inválida (pausar, retomar, cancelar)")
+    try:
+        campanha = campanha_service.alterar_status(campanha_id, _ACOES_CAMPANHA[acao])
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if campanha is None:
+        raise HTTPException(status_code=404, detail="Campanha não encontrada")
+    return campanha
+
+
 # ==================== MAIN ====================
 
 if __name__ == "__main__":
@@ -0,0 +1,34 @@
+"""
+Job de backfill: migra conversas paradas para o schema atual.
+
+Conversas ativas já são migradas ao serem carregadas; este job cobre os
+documentos que não recebem mensagens há tempo.
+
+Uso:
+    python -m scripts.backfill_conversas [--lote 200]
+"""
+import argparse
+import logging
+import sys
+
+from app.models.migrations import SCHEMA_VERSION_ATUAL
+from app.services.firebase_service import firebase_service
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lote", type=int, default=200, help="documentos por página/lote de escrita")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    logging.info(f"Migrando conversas para schema v{SCHEMA_VERSION_ATUAL}...")
+    
+    resultado = firebase_service.backfill_conversas(tamanho_lote=args.lote)
+    
+    logging.info(f"✅ Backfill concluído: {resultado}")
+    if resultado["erros"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
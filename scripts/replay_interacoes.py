@@ -0,0 +1,213 @@
+"""
+Replay de conversas reais a partir de logs_interacoes.
+
+Lê os logs (do Firestore, paginando por cursor, ou de um JSONL exportado),
+remonta a sequência de mensagens de cada telefone e reenvia as mensagens ao
+MessageHandler na ordem original, opcionalmente respeitando os intervalos
+entre elas acelerados N vezes. Compara a resposta e a etapa de cada
+mensagem com as registradas no log, e o tempo de processamento com o
+registrado (duracao_ms) ou com um replay anterior salvo.
+
+Por padrão o replay roda no modo MOCK (nada é gravado no Firestore). Para
+comparar respostas use uma sandbox com cópia do catálogo de produção
+(credenciais da sandbox + --usar-firestore); no MOCK o catálogo é outro e
+só o tempo de processamento é comparável.
+
+Só entram telefones cuja primeira mensagem no período iniciou a conversa
+(etapa aguardando_nome); conversas que começaram antes do período dependem
+de um estado que o replay não tem (--incluir-parciais inclui assim mesmo).
+
+Uso:
+    python -m scripts.replay_interacoes --desde 2026-03-01 --ate 2026-03-02 --exportar logs.jsonl
+    python -m scripts.replay_interacoes --arquivo logs.jsonl [--velocidade 10] [--salvar replay.json]
+    python -m scripts.replay_interacoes --arquivo logs.jsonl --comparar replay.json
+"""
+import argparse
+import json
+import logging
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Iterable, Any, Optional
+
+from app.handlers.message_handler import message_handler
+from app.models.conversation import Etapa
+from app.services.firebase_service import firebase_service
+
+# Divergências listadas no relatório
+MAX_DIVERGENCIAS_LISTADAS = 20
+
+
+def percentil(valores: List[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def carregar_logs(args) -> Iterable[Dict[str, Any]]:
+    """Logs de mensagens, do arquivo JSONL ou do Firestore, em ordem de timestamp."""
+    if args.arquivo:
+        with open(args.arquivo, encoding="utf-8") as f:
+            logs = [json.loads(linha) for linha in f if linha.strip()]
+        logs.sort(key=lambda log: log["timestamp"])
+        origem = (log for log in logs
+                  if (not args.desde or log["timestamp"] >= args.desde)
+                  and (not args.ate or log["timestamp"] < args.ate))
+    else:
+        origem = firebase_service.listar_logs_interacoes(args.desde, args.ate, args.lote)
+    return (log for log in origem if log.get("tipo", "mensagem") == "mensagem")
+
+
+def agrupar_por_telefone(logs: Iterable[Dict[str, Any]], incluir_parciais: bool,
+                         max_telefones: Optional[int]) -> Dict[str, List[Dict[str, Any]]]:
+    """Sequência de mensagens de cada telefone (só conversas iniciadas no período, por padrão)."""
+    conversas: Dict[str, List[Dict[str, Any]]] = {}
+    for log in logs:
+        conversas.setdefault(log["phone"], []).append(log)
+    if not incluir_parciais:
+        conversas = {phone: seq for phone, seq in conversas.items()
+                     if seq[0].get("etapa") == Etapa.AGUARDANDO_NOME.value}
+    if max_telefones:
+        conversas = dict(list(conversas.items())[:max_telefones])
+    return conversas
+
+
+def reproduzir(conversas: Dict[str, List[Dict[str, Any]]], velocidade: float,
+               pausa_maxima: float) -> List[Dict[str, Any]]:
+    """Reenvia as mensagens na ordem global dos timestamps; retorna um resultado por mensagem."""
+    linha_do_tempo = sorted(
+        ((log["timestamp"], phone, i) for phone, seq in conversas.items() for i, log in enumerate(seq)),
+        key=lambda item: item[0]
+    )
+    resultados = []
+    anterior: Optional[datetime] = None
+    for timestamp, phone, i in linha_do_tempo:
+        log = conversas[phone][i]
+        momento = datetime.fromisoformat(timestamp.rstrip("Z"))
+        if velocidade > 0 and anterior is not None:
+            time.sleep(min(max((momento - anterior).total_seconds(), 0) / velocidade, pausa_maxima))
+        anterior = momento
+        
+        telefone = f"replay_{phone}"
+        inicio = time.perf_counter()
+        resposta = message_handler.process_message(telefone, log.get("mensagem_recebida", ""))
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        state = firebase_service.get_conversation_state(telefone)
+        
+        resultados.append({
+            "phone": phone,
+            "mensagem": log.get("mensagem_recebida", ""),
+            "etapa_entrada": conversas[phone][i - 1].get("etapa") if i else Etapa.INICIO.value,
+            "etapa_esperada": log.get("etapa"),
+            "etapa": state.etapa.value if state else None,
+            "resposta_esperada": log.get("mensagem_enviada", ""),
+            "resposta": resposta[:500],
+            "duracao_ms": duracao_ms,
+            "duracao_original_ms": log.get("duracao_ms")
+        })
+    return resultados
+
+
+def resumir(resultados: List[Dict[str, Any]]) -> Dict[str, Any]:
+    tempos = [r["duracao_ms"] for r in resultados]
+    originais = [r["duracao_original_ms"] for r in resultados if r["duracao_original_ms"] is not None]
+    por_etapa: Dict[str, List[float]] = {}
+    for r in resultados:
+        por_etapa.setdefault(r["etapa_entrada"], []).append(r["duracao_ms"])
+    return {
+        "mensagens": len(resultados),
+        "telefones": len({r["phone"] for r in resultados}),
+        "respostas_iguais": sum(r["resposta"] == r["resposta_esperada"] for r in resultados),
+        "etapas_iguais": sum(r["etapa"] == r["etapa_esperada"] for r in resultados),
+        "p50_ms": statistics.median(tempos),
+        "p95_ms": percentil(tempos, 0.95),
+        "p99_ms": percentil(tempos, 0.99),
+        "original_p50_ms": statistics.median(originais) if originais else None,
+        "original_p95_ms": percentil(originais, 0.95) if originais else None,
+        "etapas": {etapa: {"n": len(v), "p50_ms": statistics.median(v)} for etapa, v in por_etapa.items()}
+    }
+
+
+def relatar(resultados: List[Dict[str, Any]], resumo: Dict[str, Any], base: Optional[Dict[str, Any]]):
+    n = resumo["mensagens"]
+    print(f"\n{n} mensagens de {resumo['telefones']} telefones")
+    print(f"Respostas iguais ao log: {resumo['respostas_iguais']}/{n} ({resumo['respostas_iguais'] / n * 100:.1f}%)")
+    print(f"Etapas iguais ao log:    {resumo['etapas_iguais']}/{n} ({resumo['etapas_iguais'] / n * 100:.1f}%)")
+    print(f"Tempo (ms): p50 {resumo['p50_ms']:.2f}  p95 {resumo['p95_ms']:.2f}  p99 {resumo['p99_ms']:.2f}")
+    if resumo["original_p50_ms"] is not None:
+        print(f"Tempo original (ms): p50 {resumo['original_p50_ms']:.2f}  p95 {resumo['original_p95_ms']:.2f}")
+    if base:
+        print(f"Replay salvo (ms):   p50 {base['p50_ms']:.2f}  p95 {base['p95_ms']:.2f}  p99 {base['p99_ms']:.2f}")
+    
+    print(f"\n  {'etapa de entrada':<36} {'n':>6} {'p50 (ms)':>9}" + (f" {'vs salvo':>9}" if base else ""))
+    for etapa, r in sorted(resumo["etapas"].items(), key=lambda item: -item[1]["n"]):
+        linha = f"  {etapa:<36} {r['n']:>6} {r['p50_ms']:>9.2f}"
+        anterior = base["etapas"].get(etapa) if base else None
+        if anterior:
+            linha += f" {(r['p50_ms'] / anterior['p50_ms'] - 1) * 100:>+8.0f}%"
+        print(linha)
+    
+    divergentes = [r for r in resultados if r["etapa"] != r["etapa_esperada"] or r["resposta"] != r["resposta_esperada"]]
+    for r in divergentes[:MAX_DIVERGENCIAS_LISTADAS]:
+        print(f"\n≠ [{r['phone']}] {r['mensagem']!r} ({r['etapa_entrada']}): "
+              f"etapa {r['etapa']} (log: {r['etapa_esperada']})")
+        if r["resposta"] != r["resposta_esperada"]:
+            print(f"  resposta: {r['resposta'].splitlines()[0] if r['resposta'] else ''!r}")
+            print(f"  log:      {r['resposta_esperada'].splitlines()[0] if r['resposta_esperada'] else ''!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--desde", help="timestamp ISO inicial (inclusivo)")
+    parser.add_argument("--ate", help="timestamp ISO final (exclusivo)")
+    parser.add_argument("--arquivo", help="lê os logs de um JSONL em vez do Firestore")
+    parser.add_argument("--exportar", help="só grava os logs lidos em JSONL")
+    parser.add_argument("--lote", type=int, default=500, help="documentos por página na leitura do Firestore")
+    parser.add_argument("--max-telefones", type=int, help="limita a quantidade de conversas")
+    parser.add_argument("--incluir-parciais", action="store_true", help="inclui conversas iniciadas antes do período")
+    parser.add_argument("--velocidade", type=float, default=0.0,
+                        help="respeita os intervalos originais acelerados N vezes (0 = sem pausas)")
+    parser.add_argument("--pausa-maxima", type=float, default=5.0, help="pausa máxima entre mensagens (s)")
+    parser.add_argument("--usar-firestore", action="store_true", help="reexecuta no Firestore configurado (sandbox)")
+    parser.add_argument("--salvar", help="grava o resumo do replay em JSON")
+    parser.add_argument("--comparar", help="compara com um resumo salvo")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+    logs = carregar_logs(args)
+    
+    if args.exportar:
+        total = 0
+        with open(args.exportar, "w", encoding="utf-8") as f:
+            for log in logs:
+                f.write(json.dumps(log, ensure_ascii=False, default=str) + "\n")
+                total += 1
+        print(f"✅ {total} logs exportados para {args.exportar}")
+        return
+    
+    conversas = agrupar_por_telefone(logs, args.incluir_parciais, args.max_telefones)
+    if not conversas:
+        print("Nenhuma conversa no período")
+        sys.exit(1)
+    
+    if not args.usar_firestore:
+        firebase_service._mock_mode = True
+    logging.disable(logging.CRITICAL)
+    
+    resultados = reproduzir(conversas, args.velocidade, args.pausa_maxima)
+    resumo = resumir(resultados)
+    
+    base = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+    relatar(resultados, resumo, base)
+    
+    if args.salvar:
+        with open(args.salvar, "w", encoding="utf-8") as f:
+            json.dump(resumo, f, indent=2, ensure_ascii=False)
+        print(f"\nResumo salvo em {args.salvar}")
+
+
+if __name__ == "__main__":
+    main()